@@ -17,6 +17,36 @@ class Settings(BaseSettings):
     default_region: str = os.getenv("DEFAULT_REGION", "la1")
     default_routing: str = os.getenv("DEFAULT_ROUTING", "americas")
     
+    # Trazas: Server-Timing siempre; trazas JSON y log de peticiones lentas opcionales
+    trace_debug: bool = os.getenv("TRACE_DEBUG", "false").lower() == "true"
+    slow_request_ms: float = float(os.getenv("SLOW_REQUEST_MS", "0"))
+    
+    # Grabación/reproducción del tráfico con Riot: "record", "replay" o vacío
+    riot_transport_mode: str = os.getenv("RIOT_TRANSPORT_MODE", "")
+    riot_archive_path: str = os.getenv("RIOT_ARCHIVE_PATH", "riot_traffic.jsonl.gz")
+    riot_replay_speed: float = float(os.getenv("RIOT_REPLAY_SPEED", "1.0"))
+    
+    # Pool de procesos para agregaciones grandes (0 = siempre en el event loop)
+    aggregation_workers: int = int(os.getenv("AGGREGATION_WORKERS", "1"))
+    aggregation_threshold: int = int(os.getenv("AGGREGATION_THRESHOLD", "100"))
+    
+    # Precarga en segundo plano del perfil tras una búsqueda
+    prefetch_enabled: bool = os.getenv("PREFETCH_ENABLED", "true").lower() == "true"
+    prefetch_concurrency: int = int(os.getenv("PREFETCH_CONCURRENCY", "2"))
+    
+    # Estadísticas por parche: partidas mínimas para sustituir la build estática
+    patch_stats_min_games: int = int(os.getenv("PATCH_STATS_MIN_GAMES", "30"))
+    
+    # Scouting de partidas en vivo: llamadas a Riot por vista y partidas recientes por jugador
+    scouting_call_budget: int = int(os.getenv("SCOUTING_CALL_BUDGET", "80"))
+    scouting_recent_matches: int = int(os.getenv("SCOUTING_RECENT_MATCHES", "8"))
+    
+    # Instantánea de Data Dragon para la precarga sin red (vacío = sin instantánea)
+    ddragon_snapshot_path: str = os.getenv("DDRAGON_SNAPSHOT_PATH", "")
+    
+    # Token para endpoints de administración (vacío = deshabilitados)
+    admin_token: str = os.getenv("ADMIN_TOKEN", "")
+    
     # API URLs
     riot_api_base: str = "api.riotgames.com"
     ddragon_base: str = "https://ddragon.leagueoflegends.com"
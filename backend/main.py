@@ -3,15 +3,15 @@ League of Legends Statistics App - Main Server
 ===============================================
 Servidor principal FastAPI para la aplicación de estadísticas de LoL
 """
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import APIRouter, FastAPI, HTTPException, Query, Request, Header, Depends
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from typing import Optional, List, Dict, Tuple
 from contextlib import asynccontextmanager
 import asyncio
 import os
-from collections import defaultdict
+import time
 from datetime import datetime, timezone
 
 from backend.riot_client import riot_client
@@ -20,52 +20,99 @@ from backend.services.recommendations import recommendation_service
 from backend.services.champion_builds import (
     get_champion_build, 
     get_default_build_for_class,
+    apply_patch_stats,
     get_keystone_info,
     get_secondary_tree_name
 )
+from backend.services.aggregation import aggregation_pool
 from backend.services.cache import cache, cached, CacheTTL
+from backend.services.autocomplete import autocomplete_index, LADDER_WEIGHT, SEARCH_WEIGHT
+from backend.services.identity import identity_cache
+from backend.services.ingest import stats_ingestor
+from backend.services.match_history import match_history
+from backend.services.match_store import match_store
+from backend.services.matchups import matchup_store
+from backend.services.patch_stats import normalize_role, patch_stats
+from backend.services.prefetch import prefetcher, warm_cache
+from backend.services.ranked_cache import ranked_cache
+from backend.services.tierlist import BRACKETS, tierlist_store
+from backend.services.rollups import rollup_store
+from backend.services.scouting import CallBudget, live_scouting, summarize_recent
+from backend.services.match_views import build_match_card, project_fields
+from backend.services.timeline_analytics import summarize_lane_phase
+from backend.services.tracing import TracingMiddleware, span, trace_buffer
+from backend.services.profiler import profiler, ProfilingMiddleware
+from backend.services.metrics import (
+    MetricsMiddleware,
+    MATCH_FETCHES,
+    MATCH_FETCH_LATENCY,
+    METRICS_CONTENT_TYPE,
+    render_metrics
+)
+from backend.services.responses import (
+    ORJSONResponse,
+    CompressionMiddleware,
+    cached_json_response,
+    encode_json
+)
 from backend.config import settings
 
 # Crear aplicación FastAPI con lifespan
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup: conectar Redis
+    # Startup: conectar Redis, arrancar el pool de agregación y el autocompletado
     await cache.connect()
+    aggregation_pool.start()
+    autocomplete_sync = asyncio.create_task(autocomplete_index.run_sync(list(settings.platform_regions)))
+    patch_sync = asyncio.create_task(patch_stats.run_sync())
+    matchup_sync = asyncio.create_task(matchup_store.run_sync())
+    tierlist_sync = asyncio.create_task(tierlist_store.run_sync(list(settings.platform_regions)))
+    stats_ingest = asyncio.create_task(stats_ingestor.run())
     yield
     # Shutdown: desconectar
+    autocomplete_sync.cancel()
+    patch_sync.cancel()
+    matchup_sync.cancel()
+    tierlist_sync.cancel()
+    stats_ingest.cancel()
+    prefetcher.cancel()
+    live_scouting.cancel()
+    await stats_ingestor.drain()
+    await autocomplete_index.flush()
+    await patch_stats.flush()
+    await matchup_store.flush()
+    await tierlist_store.sync()
     await cache.disconnect()
     await riot_client.aclose()
+    aggregation_pool.shutdown()
 
 
-app = FastAPI(
-    title="LoL Statistics App",
-    description="Aplicación para estadísticas de League of Legends con recomendaciones",
-    version="1.0.0",
-    lifespan=lifespan
-)
+# Las rutas se registran en un router; create_app() construye la aplicación
+router = APIRouter()
 
-# Configurar CORS
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Montar archivos estáticos
 frontend_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "frontend")
-if os.path.exists(frontend_path):
-    app.mount("/static", StaticFiles(directory=frontend_path), name="static")
 
 
-async def fetch_match_details(match_ids: List[str], routing: str, concurrency: int = 5) -> List[dict]:
-    """Obtiene detalles de partidas en paralelo con control de tasa"""
+async def fetch_match_details(
+    match_ids: List[str],
+    routing: str,
+    concurrency: int = 5,
+    budget: Optional[CallBudget] = None
+) -> List[dict]:
+    """
+    Obtiene detalles de partidas en paralelo con control de tasa. Con
+    `budget`, cada reintento ante 429 se descuenta de él y sin presupuesto
+    no se reintenta.
+    """
     if not match_ids:
         return []
     semaphore = asyncio.Semaphore(concurrency)
-    match_map: Dict[str, dict] = {}
+    start = time.perf_counter()
+    # Un solo MGET para todas las partidas ya almacenadas
+    match_map: Dict[str, dict] = await match_store.get_matches(list(dict.fromkeys(match_ids)))
+    if match_map:
+        MATCH_FETCHES.labels("store").inc(len(match_map))
 
     async def fetch_single(match_id: str) -> None:
         attempts = 0
@@ -75,42 +122,64 @@ async def fetch_match_details(match_ids: List[str], routing: str, concurrency: i
                 response = await riot_client.get_match_by_id(match_id, routing)
             if response.get("success"):
                 match_map[match_id] = response["data"]
+                MATCH_FETCHES.labels("riot").inc()
+                autocomplete_index.record_match(response["data"])
+                # Las estadísticas agregadas se suman en segundo plano
+                stats_ingestor.submit(response["data"])
+                await match_store.save_match(response["data"])
                 return
-            if response.get("status_code") == 429 and attempts < 2:
+            if response.get("status_code") == 429 and attempts < 2 and (budget is None or budget.take()):
+                MATCH_FETCHES.labels("retry").inc()
                 await asyncio.sleep(delay)
                 delay *= 2
                 attempts += 1
                 continue
+            MATCH_FETCHES.labels("failed").inc()
             return
 
-    await asyncio.gather(*(fetch_single(mid) for mid in match_ids))
+    with span("fetch_match_details", "fetch", matches=len(match_ids)):
+        missing = [mid for mid in dict.fromkeys(match_ids) if mid not in match_map]
+        await asyncio.gather(*(fetch_single(mid) for mid in missing))
+    MATCH_FETCH_LATENCY.observe(time.perf_counter() - start)
     return [match_map[mid] for mid in match_ids if mid in match_map]
 
 
-# Cache simple en memoria para ranked (TTL en segundos)
-RANKED_CACHE: Dict[tuple, dict] = {}
-RANKED_CACHE_TTL = 600
-
-
-def get_cached_ranked(puuid: str, region: str) -> Optional[List[dict]]:
-    key = (puuid, region)
-    entry = RANKED_CACHE.get(key)
-    if not entry:
-        return None
-    if (datetime.now(timezone.utc) - entry["ts"]).total_seconds() > RANKED_CACHE_TTL:
-        RANKED_CACHE.pop(key, None)
-        return None
-    return entry.get("data")
-
+async def fetch_timeline_analytics(
+    matches: List[dict],
+    routing: str,
+    concurrency: int = 5
+) -> List[dict]:
+    """
+    Obtiene la analítica de timeline de cada partida. Se calcula una sola vez
+    por partida (los timelines no cambian) y se reutiliza desde el store.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    match_ids = [m.get("metadata", {}).get("matchId") for m in matches]
+    stored_map = await match_store.get_timeline_analytics_many([mid for mid in match_ids if mid])
+
+    async def fetch_single(match: dict) -> Optional[dict]:
+        match_id = match.get("metadata", {}).get("matchId")
+        if not match_id:
+            return None
+        stored = stored_map.get(match_id)
+        if stored is not None:
+            return stored
+        async with semaphore:
+            result = await riot_client.get_match_timeline(match_id, routing)
+        if not result.get("success"):
+            return None
+        _, analytics = await match_store.save_timeline(match_id, result["data"], match)
+        return analytics
 
-def set_cached_ranked(puuid: str, region: str, data: List[dict]) -> None:
-    key = (puuid, region)
-    RANKED_CACHE[key] = {"data": data, "ts": datetime.now(timezone.utc)}
+    results = await asyncio.gather(*(fetch_single(m) for m in matches))
+    return [r for r in results if r is not None]
 
 
-async def fetch_ranked_entries(puuid: str, region: str) -> List[dict]:
-    """Obtiene las entradas de ranked para un jugador con reintentos ante 429"""
-    cached = get_cached_ranked(puuid, region)
+async def fetch_ranked_entries(puuid: str, region: str, budget: Optional[CallBudget] = None) -> List[dict]:
+    """
+    Obtiene las entradas de ranked para un jugador con reintentos ante 429.
+    Con `budget`, cada reintento se descuenta de él.
+    """
 
     async def with_retry(fn, *args, retries: int = 3, base_delay: float = 0.6):
         attempt = 0
@@ -119,7 +188,7 @@ async def fetch_ranked_entries(puuid: str, region: str) -> List[dict]:
             if result.get("success"):
                 return result
             status = result.get("status_code")
-            if status == 429 and attempt < retries - 1:
+            if status == 429 and attempt < retries - 1 and (budget is None or budget.take()):
                 await asyncio.sleep(base_delay * (2 ** attempt))
                 attempt += 1
                 continue
@@ -128,14 +197,52 @@ async def fetch_ranked_entries(puuid: str, region: str) -> List[dict]:
     # Usar el nuevo endpoint por PUUID directamente (no necesita summoner_id)
     league_result = await with_retry(riot_client.get_league_entries_by_puuid, puuid, region)
     if league_result.get("success"):
-        set_cached_ranked(puuid, region, league_result["data"])
+        await ranked_cache.set(puuid, region, league_result["data"])
         return league_result["data"]
-    # Si falló pero hay cache reciente, devolverla para no dejar al usuario sin elo
+    # Si falló pero hay cache reciente (de cualquier worker), devolverla para no dejar al usuario sin elo
+    cached = await ranked_cache.get(puuid, region)
     if cached:
         return cached
     return []
 
 
+async def warm_ranked_entries(puuid: str, region: str) -> List[dict]:
+    """fetch_ranked_entries a través de la caché de precarga (resultados vacíos no se guardan)"""
+    async def fetch() -> Optional[List[dict]]:
+        return await fetch_ranked_entries(puuid, region) or None
+
+    return await warm_cache.get_or_run(f"ranked:{region}:{puuid}", fetch, CacheTTL.WARM) or []
+
+
+async def fetch_mastery_top(puuid: str, region: str, count: int) -> Optional[List[dict]]:
+    async def fetch() -> Optional[List[dict]]:
+        result = await riot_client.get_champion_mastery_top(puuid, count, region)
+        return result["data"] if result.get("success") else None
+
+    return await warm_cache.get_or_run(f"mastery:{region}:{puuid}:{count}", fetch, CacheTTL.WARM)
+
+
+# Lo que pide frontend/js/app.js (loadProfile) justo después de encontrar la cuenta
+PREFETCH_MASTERY_COUNT = 10
+PREFETCH_MATCH_COUNT = 15
+
+
+def schedule_profile_prefetch(puuid: Optional[str], region: str) -> None:
+    """Precarga en segundo plano los datos del perfil que se pedirán a continuación"""
+    if not puuid:
+        return
+
+    async def job() -> None:
+        await asyncio.gather(
+            warm_ranked_entries(puuid, region),
+            fetch_mastery_top(puuid, region, PREFETCH_MASTERY_COUNT),
+            match_history.ids(puuid, region, 0, PREFETCH_MATCH_COUNT),
+        )
+        await compute_champion_stats_summary(puuid, region)
+
+    prefetcher.schedule(f"profile:{region}:{puuid}", job)
+
+
 TIER_ORDER = {
     "IRON": 1,
     "BRONZE": 2,
@@ -161,7 +268,7 @@ def resolve_rank_value(entry: dict) -> int:
 
 
 async def compute_ranked_summary(puuid: str, region: str) -> Dict[str, dict]:
-    entries = await fetch_ranked_entries(puuid, region)
+    entries = await warm_ranked_entries(puuid, region)
     total_wins = sum(e.get("wins", 0) for e in entries)
     total_losses = sum(e.get("losses", 0) for e in entries)
     best_entry = max(entries, key=resolve_rank_value, default=None)
@@ -179,115 +286,22 @@ async def compute_champion_stats_summary(
     puuid: str,
     region: str,
     match_limit: int = 500,
-    season_year: Optional[int] = None
+    season_year: Optional[int] = None,
+    days: Optional[int] = None,
+    queues: Optional[List[int]] = None
 ) -> Tuple[List[dict], List[str]]:
+    """
+    Estadísticas por campeón desde el inicio de la temporada (o de los
+    últimos `days` días), opcionalmente solo de ciertas colas. Se suman los
+    buckets diarios del jugador; solo las partidas aún no ingeridas llegan a
+    Riot.
+    """
     routing = riot_client.get_routing_for_region(region)
-    season_start_ts = get_season_start_timestamp(season_year)
-    match_ids = await collect_season_match_ids(
-        puuid,
-        routing,
-        match_limit,
-        season_start_ts
-    )
-    if not match_ids:
-        return [], []
-    matches = await fetch_match_details(match_ids, routing)
-    champ_stats: Dict[int, dict] = {}
-
-    for match in matches:
-        info = match.get("info", {})
-        participants = info.get("participants", [])
-        player = next((p for p in participants if p.get("puuid") == puuid), None)
-        if not player:
-            continue
-        champ_id = int(player.get("championId", 0))
-        stats = champ_stats.setdefault(
-            champ_id,
-            {
-                "games": 0,
-                "wins": 0,
-                "kills": 0,
-                "deaths": 0,
-                "assists": 0,
-                "cs": 0,
-                "duration": 0,
-                "damage": 0,
-                "gold": 0,
-                "vision": 0,
-                "items": defaultdict(int),
-                "spells": defaultdict(int),
-                "keystones": defaultdict(int)
-            }
-        )
-
-        stats["games"] += 1
-        if player.get("win"):
-            stats["wins"] += 1
-        stats["kills"] += player.get("kills", 0)
-        stats["deaths"] += player.get("deaths", 0)
-        stats["assists"] += player.get("assists", 0)
-        stats["cs"] += player.get("totalMinionsKilled", 0) + player.get("neutralMinionsKilled", 0)
-        stats["duration"] += info.get("gameDuration", 0)
-        stats["damage"] += player.get("totalDamageDealtToChampions", 0)
-        stats["gold"] += player.get("goldEarned", 0)
-        stats["vision"] += player.get("visionScore", 0)
-
-        built_items = [player.get(f"item{i}") for i in range(6)]
-        for item_id in built_items:
-            if item_id and item_id != 0:
-                stats["items"][int(item_id)] += 1
-
-        spells = [player.get("summoner1Id"), player.get("summoner2Id")]
-        if all(spells):
-            spells.sort()
-            key = f"{spells[0]}-{spells[1]}"
-            stats["spells"][key] += 1
-
-        keystone = (
-            player.get("perks", {})
-            .get("styles", [{}])[0]
-            .get("selections", [{}])[0]
-            .get("perk")
-        )
-        if keystone:
-            stats["keystones"][int(keystone)] += 1
-
-    summary = []
-    for champ_id, data in champ_stats.items():
-        summary.append({
-            "championId": champ_id,
-            "games": data["games"],
-            "wins": data["wins"],
-            "kills": data["kills"],
-            "deaths": data["deaths"],
-            "assists": data["assists"],
-            "cs": data["cs"],
-            "duration": data["duration"],
-            "damage": data["damage"],
-            "gold": data["gold"],
-            "vision": data["vision"],
-            "items": sorted(
-                ( {"id": item_id, "count": count} for item_id, count in data["items"].items() ),
-                key=lambda x: x["count"],
-                reverse=True
-            )[:6],
-            "spells": sorted(
-                (
-                    {"ids": [int(pair.split("-")[0]), int(pair.split("-")[1])], "count": count}
-                    for pair, count in data["spells"].items()
-                ),
-                key=lambda x: x["count"],
-                reverse=True
-            )[:2],
-            "keystones": sorted(
-                ( {"id": perk_id, "count": count} for perk_id, count in data["keystones"].items() ),
-                key=lambda x: x["count"],
-                reverse=True
-            )[:2]
-        })
-
-    summary.sort(key=lambda c: c["games"], reverse=True)
-    return summary, match_ids
+    since_ts = get_season_start_timestamp(season_year)
+    if days:
+        since_ts = max(since_ts, int(time.time()) - days * 86400)
+    rollup = await rollup_store.ensure(puuid, routing, since_ts, fetch_match_details, match_limit)
+    return rollup.champion_stats(since_ts, queues), rollup.match_ids(since_ts, queues)[:match_limit]
 
 
 async def fetch_leaderboard_profiles(entries: List[dict], region: str, concurrency: int = 10) -> Dict[str, dict]:
@@ -296,12 +310,23 @@ async def fetch_leaderboard_profiles(entries: List[dict], region: str, concurren
     Incluye nivel, icono y Riot ID real.
     """
     semaphore = asyncio.Semaphore(concurrency)
-    results: Dict[str, dict] = {}
     routing = riot_client.get_routing_for_region(region)
 
+    # Perfiles ya cacheados: un MGET en lugar de una consulta por jugador
+    def profile_key(summoner_id: str) -> str:
+        return f"leaderboard_profile:{region}:{summoner_id}"
+
+    summoner_ids = [e.get("summonerId") for e in entries if e.get("summonerId")]
+    cached_profiles = await cache.get_many([profile_key(sid) for sid in summoner_ids])
+    results: Dict[str, dict] = {
+        sid: cached_profiles[profile_key(sid)]
+        for sid in summoner_ids if profile_key(sid) in cached_profiles
+    }
+    fresh: Dict[str, dict] = {}
+
     async def fetch_single(entry: dict) -> None:
         summoner_id = entry.get("summonerId")
-        if not summoner_id:
+        if not summoner_id or summoner_id in results:
             return
         async with semaphore:
             # Obtener datos del summoner (incluye PUUID, nivel, icono)
@@ -311,17 +336,19 @@ async def fetch_leaderboard_profiles(entries: List[dict], region: str, concurren
             
             summoner_data = profile["data"]
             puuid = summoner_data.get("puuid")
+            await identity_cache.remember_summoner(summoner_data, region)
             
             # Obtener Riot ID real desde el PUUID
             riot_id_name = None
             riot_id_tag = None
             if puuid:
-                account = await riot_client.get_account_by_puuid(puuid, routing)
+                account = await identity_cache.get_account(puuid, routing)
                 if account.get("success"):
                     riot_id_name = account["data"].get("gameName")
                     riot_id_tag = account["data"].get("tagLine")
+                    autocomplete_index.record(region, riot_id_name, riot_id_tag, LADDER_WEIGHT)
             
-            results[summoner_id] = {
+            fresh[summoner_id] = {
                 "profileIconId": summoner_data.get("profileIconId"),
                 "summonerLevel": summoner_data.get("summonerLevel"),
                 "puuid": puuid,
@@ -331,6 +358,13 @@ async def fetch_leaderboard_profiles(entries: List[dict], region: str, concurren
             }
 
     await asyncio.gather(*(fetch_single(entry) for entry in entries))
+    if fresh:
+        await cache.set_many(
+            {profile_key(sid): profile for sid, profile in fresh.items()},
+            CacheTTL.LEADERBOARD_PROFILE,
+            tags=[f"leaderboard:{region}"]
+        )
+    results.update(fresh)
     return results
 
 
@@ -340,43 +374,9 @@ def get_season_start_timestamp(season_year: Optional[int] = None) -> int:
     return int(start.timestamp())
 
 
-async def collect_season_match_ids(
-    puuid: str,
-    routing: str,
-    match_limit: int,
-    start_timestamp: Optional[int]
-) -> List[str]:
-    if match_limit <= 0:
-        return []
-    match_ids: List[str] = []
-    batch_size = 100
-    start = 0
-
-    while len(match_ids) < match_limit:
-        count = min(batch_size, match_limit - len(match_ids))
-        result = await riot_client.get_match_ids_by_puuid(
-            puuid,
-            routing,
-            start,
-            count,
-            start_time=start_timestamp
-        )
-        if not result.get("success"):
-            break
-        ids = result.get("data", [])
-        if not ids:
-            break
-        match_ids.extend(ids)
-        if len(ids) < count:
-            break
-        start += count
-
-    return match_ids
-
-
 # ==================== RUTAS PRINCIPALES ====================
 
-@app.get("/")
+@router.get("/")
 async def root():
     """Sirve la página principal"""
     index_path = os.path.join(frontend_path, "index.html")
@@ -385,7 +385,22 @@ async def root():
     return {"message": "LoL Statistics API", "status": "running"}
 
 
-@app.get("/api/health")
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Métricas en formato Prometheus"""
+    return Response(content=render_metrics(), media_type=METRICS_CONTENT_TYPE)
+
+
+@router.get("/api/debug/traces/{trace_id}", include_in_schema=False)
+async def get_debug_trace(trace_id: str):
+    """Desglose JSON de una traza (solo con TRACE_DEBUG activo)"""
+    trace = trace_buffer.get(trace_id) if settings.trace_debug else None
+    if trace is None:
+        raise HTTPException(status_code=404, detail="Traza no encontrada")
+    return trace
+
+
+@router.get("/api/health")
 async def health_check():
     """Verificación de salud del servidor"""
     return {"status": "healthy", "api_key_configured": bool(settings.riot_api_key)}
@@ -393,7 +408,7 @@ async def health_check():
 
 # ==================== RUTAS DE CONFIGURACIÓN ====================
 
-@app.get("/api/regions")
+@router.get("/api/regions")
 async def get_regions():
     """Obtiene la lista de regiones disponibles"""
     return {
@@ -404,37 +419,34 @@ async def get_regions():
     }
 
 
-@app.get("/api/ddragon/version")
+@router.get("/api/ddragon/version")
 async def get_ddragon_version():
     """Obtiene la versión actual de Data Dragon"""
     version = await ddragon.get_latest_version()
     return {"version": version}
 
 
-@app.get("/api/ddragon/champions")
-async def get_champions():
+@router.get("/api/ddragon/champions")
+async def get_champions(request: Request):
     """Obtiene la lista de todos los campeones"""
-    champions = await ddragon.get_champions()
-    return champions
+    return await cached_json_response(request, CacheTTL.DDRAGON, ddragon.get_champions)
 
 
-@app.get("/api/ddragon/spells")
-async def get_summoner_spells():
+@router.get("/api/ddragon/spells")
+async def get_summoner_spells(request: Request):
     """Obtiene los hechizos de invocador"""
-    spells = await ddragon.get_summoner_spells()
-    return spells
+    return await cached_json_response(request, CacheTTL.DDRAGON, ddragon.get_summoner_spells)
 
 
-@app.get("/api/ddragon/items")
-async def get_items():
+@router.get("/api/ddragon/items")
+async def get_items(request: Request):
     """Obtiene los items del juego"""
-    items = await ddragon.get_items()
-    return items
+    return await cached_json_response(request, CacheTTL.DDRAGON, ddragon.get_items)
 
 
 # ==================== RUTAS DE CUENTA Y JUGADOR ====================
 
-@app.get("/api/account/{game_name}/{tag_line}")
+@router.get("/api/account/{game_name}/{tag_line}")
 async def get_account_by_riot_id(
     game_name: str,
     tag_line: str,
@@ -443,23 +455,26 @@ async def get_account_by_riot_id(
     """Busca una cuenta por Riot ID (gameName#tagLine)"""
     routing = riot_client.get_routing_for_region(region)
     
-    account_result = await riot_client.get_account_by_riot_id(game_name, tag_line, routing)
+    account_result = await identity_cache.resolve(game_name, tag_line, routing)
     if not account_result.get("success"):
         raise HTTPException(
             status_code=account_result.get("status_code", 404),
             detail=account_result.get("error", "Cuenta no encontrada")
         )
     
-    return account_result["data"]
+    account_data = account_result["data"]
+    autocomplete_index.record(region, account_data.get("gameName"), account_data.get("tagLine"), SEARCH_WEIGHT)
+    schedule_profile_prefetch(account_data.get("puuid"), region)
+    return account_data
 
 
-@app.get("/api/summoner/{puuid}")
+@router.get("/api/summoner/{puuid}")
 async def get_summoner_by_puuid(
     puuid: str,
     region: str = Query("la1", description="Región del servidor")
 ):
     """Obtiene datos del invocador por PUUID"""
-    summoner_result = await riot_client.get_summoner_by_puuid(puuid, region)
+    summoner_result = await identity_cache.get_summoner(puuid, region)
     if not summoner_result.get("success"):
         raise HTTPException(
             status_code=summoner_result.get("status_code", 404),
@@ -469,7 +484,7 @@ async def get_summoner_by_puuid(
     return summoner_result["data"]
 
 
-@app.get("/api/summoner/by-id/{summoner_id}")
+@router.get("/api/summoner/by-id/{summoner_id}")
 async def get_summoner_by_id_route(
     summoner_id: str,
     region: str = Query("la1", description="Región del servidor")
@@ -485,17 +500,18 @@ async def get_summoner_by_id_route(
     return summoner_result["data"]
 
 
-@app.get("/api/ranked/{puuid}")
+@router.get("/api/ranked/{puuid}")
 async def get_ranked_by_puuid(
     puuid: str,
     region: str = Query("la1", description="Región del servidor")
 ):
     """Obtiene información de ranked por PUUID"""
-    return await fetch_ranked_entries(puuid, region)
+    return await warm_ranked_entries(puuid, region)
 
 
-@app.get("/api/profile/summary/{puuid}")
+@router.get("/api/profile/summary/{puuid}")
 async def get_profile_summary(
+    request: Request,
     puuid: str,
     region: str = Query("la1", description="Región del servidor"),
     season_year: Optional[int] = Query(
@@ -503,54 +519,57 @@ async def get_profile_summary(
         description="Año de la temporada a consultar",
         ge=2014,
         le=2100
-    )
+    ),
+    days: Optional[int] = Query(None, ge=1, le=366, description="Solo los últimos N días (7, 30...)"),
+    queue: Optional[List[int]] = Query(None, description="Colas a incluir (420=Solo/Duo, 440=Flex, 450=ARAM)")
 ):
     """Combina resumen de ranked y estadísticas de campeones"""
-    ranked_summary = await compute_ranked_summary(puuid, region)
-    champion_stats, season_match_ids = await compute_champion_stats_summary(
-        puuid,
-        region,
-        season_year=season_year
-    )
-    return {
-        "ranked": ranked_summary,
-        "champions": champion_stats,
-        "matches": season_match_ids
-    }
+    async def build() -> dict:
+        ranked_summary = await compute_ranked_summary(puuid, region)
+        champion_stats, season_match_ids = await compute_champion_stats_summary(
+            puuid,
+            region,
+            season_year=season_year,
+            days=days,
+            queues=queue
+        )
+        return {
+            "ranked": ranked_summary,
+            "champions": champion_stats,
+            "matches": season_match_ids
+        }
+
+    return await cached_json_response(request, CacheTTL.SUMMONER, build)
 
 
-@app.get("/api/mastery/{puuid}")
+@router.get("/api/mastery/{puuid}")
 async def get_mastery_by_puuid(
     puuid: str,
     region: str = Query("la1", description="Región del servidor"),
     count: int = Query(10, description="Cantidad de maestrías")
 ):
     """Obtiene maestrías de campeones por PUUID"""
-    mastery_result = await riot_client.get_champion_mastery_top(puuid, count, region)
-    if not mastery_result.get("success"):
-        return []
-    
-    return mastery_result["data"]
+    return await fetch_mastery_top(puuid, region, count) or []
 
 
-@app.get("/api/matches/{puuid}")
+@router.get("/api/matches/{puuid}")
 async def get_matches_by_puuid(
     puuid: str,
     region: str = Query("la1", description="Región del servidor"),
     start: int = Query(0, description="Índice inicial"),
-    count: int = Query(20, description="Cantidad de partidas")
+    count: int = Query(20, description="Cantidad de partidas"),
+    after: Optional[str] = Query(None, description="Último matchId ya cargado (tiene prioridad sobre start)")
 ):
-    """Obtiene IDs de partidas por PUUID"""
-    routing = riot_client.get_routing_for_region(region)
-    
-    matches_result = await riot_client.get_match_ids_by_puuid(puuid, routing, start, count)
-    if not matches_result.get("success"):
-        return []
-    
-    return matches_result["data"]
+    """
+    Obtiene IDs de partidas por PUUID desde el índice de match_history, el
+    mismo que pagina /api/player/{puuid}/history. Esta ruta devuelve IDs
+    para los clientes que cargan cada partida completa; la de historial,
+    tarjetas compactas por cursor.
+    """
+    return await match_history.ids(puuid, region, start, count, after) or []
 
 
-@app.get("/api/live/{summoner_id}")
+@router.get("/api/live/{summoner_id}")
 async def get_live_game(
     summoner_id: str,
     region: str = Query("la1", description="Región del servidor")
@@ -563,7 +582,7 @@ async def get_live_game(
     return live_result["data"]
 
 
-@app.get("/api/recommendations/{puuid}")
+@router.get("/api/recommendations/{puuid}")
 async def get_recommendations(
     puuid: str,
     region: str = Query("la1", description="Región del servidor")
@@ -594,13 +613,13 @@ async def get_recommendations(
         }}
     
     # Generar recomendaciones
-    stats = recommendation_service.analyze_matches(matches_data, puuid)
+    stats = await aggregation_pool.run("analyze_matches", matches_data, puuid)
     recommendations = recommendation_service.generate_recommendations(stats)
     
     return {"recommendations": recommendations}
 
 
-@app.get("/api/leaderboard/{tier}")
+@router.get("/api/leaderboard/{tier}")
 async def get_leaderboard(
     tier: str,
     region: str = Query("la1", description="Región del servidor")
@@ -625,7 +644,7 @@ async def get_leaderboard(
 
 # ==================== RUTAS LEGACY (mantener compatibilidad) ====================
 
-@app.get("/api/player/search")
+@router.get("/api/player/search")
 async def search_player(
     game_name: str = Query(..., description="Nombre del jugador"),
     tag_line: str = Query(..., description="Tag del jugador (ej: LAN)"),
@@ -637,7 +656,7 @@ async def search_player(
     routing = riot_client.get_routing_for_region(region)
     
     # Obtener cuenta por Riot ID
-    account_result = await riot_client.get_account_by_riot_id(game_name, tag_line, routing)
+    account_result = await identity_cache.resolve(game_name, tag_line, routing)
     if not account_result.get("success"):
         raise HTTPException(
             status_code=account_result.get("status_code", 404),
@@ -646,9 +665,11 @@ async def search_player(
     
     account_data = account_result["data"]
     puuid = account_data.get("puuid")
+    autocomplete_index.record(region, account_data.get("gameName"), account_data.get("tagLine"), SEARCH_WEIGHT)
+    schedule_profile_prefetch(puuid, region)
     
     # Obtener datos del invocador
-    summoner_result = await riot_client.get_summoner_by_puuid(puuid, region)
+    summoner_result = await identity_cache.get_summoner(puuid, region)
     if not summoner_result.get("success"):
         raise HTTPException(
             status_code=summoner_result.get("status_code", 404),
@@ -669,14 +690,24 @@ async def search_player(
     }
 
 
-@app.get("/api/player/{puuid}/ranked")
+@router.get("/api/player/autocomplete")
+async def autocomplete_player(
+    q: str = Query(..., min_length=1, max_length=40, description="Inicio del Riot ID (ej: fak o faker#k)"),
+    region: str = Query("la1", description="Región del servidor"),
+    limit: int = Query(8, ge=1, le=20, description="Máximo de sugerencias")
+):
+    """Sugerencias de Riot ID entre los jugadores ya vistos, sin consultar a Riot"""
+    return {"query": q, "region": region, "results": autocomplete_index.complete(region, q, limit)}
+
+
+@router.get("/api/player/{puuid}/ranked")
 async def get_player_ranked(
     puuid: str,
     region: str = Query("la1", description="Región del servidor")
 ):
     """Obtiene la información de ranked de un jugador"""
     # Primero obtener el summoner ID
-    summoner_result = await riot_client.get_summoner_by_puuid(puuid, region)
+    summoner_result = await identity_cache.get_summoner(puuid, region)
     if not summoner_result.get("success"):
         raise HTTPException(status_code=404, detail="Invocador no encontrado")
     
@@ -690,7 +721,7 @@ async def get_player_ranked(
     return {"ranked": league_result["data"]}
 
 
-@app.get("/api/player/{puuid}/mastery")
+@router.get("/api/player/{puuid}/mastery")
 async def get_player_mastery(
     puuid: str,
     region: str = Query("la1", description="Región del servidor"),
@@ -725,28 +756,32 @@ async def get_player_mastery(
 
 # ==================== RUTAS DE PARTIDAS ====================
 
-@app.get("/api/player/{puuid}/matches")
+@router.get("/api/player/{puuid}/matches")
 async def get_player_matches(
     puuid: str,
     region: str = Query("la1", description="Región del servidor"),
     start: int = Query(0, description="Índice de inicio"),
     count: int = Query(20, description="Cantidad de partidas"),
-    queue: Optional[int] = Query(None, description="Tipo de cola (420=Solo/Duo, 440=Flex)")
+    queue: Optional[int] = Query(None, description="Tipo de cola (420=Solo/Duo, 440=Flex)"),
+    view: str = Query("full", pattern="^(card|full)$", description="card = tarjetas compactas")
 ):
     """Obtiene el historial de partidas de un jugador"""
     routing = riot_client.get_routing_for_region(region)
     
-    # Obtener IDs de partidas
-    match_ids_result = await riot_client.get_match_ids_by_puuid(
-        puuid, routing, start, count, queue
-    )
-    if not match_ids_result.get("success"):
-        return {"matches": [], "match_ids": []}
-    
-    match_ids = match_ids_result["data"]
+    # Obtener IDs de partidas (sin filtro de cola salen del índice local)
+    match_ids = await match_history.ids(puuid, region, start, count) if queue is None else None
+    if match_ids is None:
+        match_ids_result = await riot_client.get_match_ids_by_puuid(
+            puuid, routing, start, count, queue
+        )
+        if not match_ids_result.get("success"):
+            return {"matches": [], "match_ids": []}
+        match_ids = match_ids_result["data"]
     
     # Obtener detalles de cada partida
     matches = await fetch_match_details(match_ids[:10], routing)
+    if view == "card":
+        matches = [build_match_card(match) for match in matches]
     
     return {
         "matches": matches,
@@ -755,52 +790,96 @@ async def get_player_matches(
     }
 
 
-@app.get("/api/match/{match_id}")
+@router.get("/api/player/{puuid}/history")
+async def get_player_history(
+    puuid: str,
+    region: str = Query("la1", description="Región del servidor"),
+    cursor: Optional[str] = Query(None, description="next_cursor de la página anterior"),
+    count: int = Query(10, ge=1, le=50, description="Partidas por página"),
+    queue: Optional[int] = Query(None, description="Tipo de cola (420=Solo/Duo, 440=Flex)")
+):
+    """
+    Historial paginado por cursor en tarjetas compactas. Se sirve del índice
+    local del jugador; solo se consulta a Riot por partidas nuevas o al
+    pasar del final del índice, y la página siguiente se precarga.
+    """
+    try:
+        return await match_history.page(puuid, region, fetch_match_details, cursor, count, queue)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Cursor no válido")
+
+
+@router.get("/api/match/{match_id}")
 async def get_match_details(
+    request: Request,
     match_id: str,
-    region: str = Query("la1", description="Región del servidor")
+    region: str = Query("la1", description="Región del servidor"),
+    view: str = Query("full", pattern="^(card|full)$", description="card = tarjeta compacta"),
+    fields: Optional[str] = Query(None, description="Campos a incluir (ej: info.gameDuration,info.participants.kills)")
 ):
-    """Obtiene los detalles completos de una partida"""
+    """Obtiene los detalles de una partida (completa o como tarjeta compacta)"""
     routing = riot_client.get_routing_for_region(region)
-    
-    match_result = await riot_client.get_match_by_id(match_id, routing)
-    if not match_result.get("success"):
-        raise HTTPException(
-            status_code=match_result.get("status_code", 404),
-            detail=match_result.get("error", "Partida no encontrada")
-        )
-    
-    # Devolver directamente los datos de la partida (metadata + info)
-    return match_result["data"]
 
-
-@app.get("/api/match/{match_id}/timeline")
+    async def build() -> dict:
+        document = await match_store.get_card(match_id) if view == "card" else None
+        if document is None:
+            document = await match_store.get_match(match_id)
+            if document is None:
+                match_result = await riot_client.get_match_by_id(match_id, routing)
+                if not match_result.get("success"):
+                    raise HTTPException(
+                        status_code=match_result.get("status_code", 404),
+                        detail=match_result.get("error", "Partida no encontrada")
+                    )
+                document = match_result["data"]
+                await match_store.save_match(document)
+            if view == "card":
+                document = build_match_card(document)
+        # Sin `fields` se devuelven directamente los datos (metadata + info)
+        return project_fields(document, fields)
+
+    return await cached_json_response(request, CacheTTL.MATCH_DETAIL, build)
+
+
+@router.get("/api/match/{match_id}/timeline")
 async def get_match_timeline(
+    request: Request,
     match_id: str,
-    region: str = Query("la1", description="Región del servidor")
+    region: str = Query("la1", description="Región del servidor"),
+    view: str = Query("full", pattern="^(card|full)$", description="card = resumen compacto"),
+    fields: Optional[str] = Query(None, description="Campos a incluir del timeline")
 ):
-    """Obtiene la línea de tiempo de una partida"""
+    """Obtiene la línea de tiempo de una partida (completa o resumida)"""
     routing = riot_client.get_routing_for_region(region)
-    
-    timeline_result = await riot_client.get_match_timeline(match_id, routing)
-    if not timeline_result.get("success"):
-        raise HTTPException(
-            status_code=timeline_result.get("status_code", 404),
-            detail=timeline_result.get("error", "Timeline no encontrada")
-        )
-    
-    return {"timeline": timeline_result["data"]}
+
+    async def build() -> dict:
+        if view == "card":
+            summary = await match_store.get_timeline_summary(match_id)
+            if summary is not None:
+                return {"timeline": project_fields(summary, fields)}
+        timeline_result = await riot_client.get_match_timeline(match_id, routing)
+        if not timeline_result.get("success"):
+            raise HTTPException(
+                status_code=timeline_result.get("status_code", 404),
+                detail=timeline_result.get("error", "Timeline no encontrada")
+            )
+        timeline = timeline_result["data"]
+        summary, _ = await match_store.save_timeline(match_id, timeline)
+        document = summary if view == "card" else timeline
+        return {"timeline": project_fields(document, fields)}
+
+    return await cached_json_response(request, CacheTTL.MATCH_DETAIL, build)
 
 
 # ==================== RUTAS DE PARTIDA EN VIVO ====================
 
-@app.get("/api/player/{puuid}/live")
+@router.get("/api/player/{puuid}/live")
 async def get_live_game(
     puuid: str,
     region: str = Query("la1", description="Región del servidor")
 ):
     """Obtiene información de la partida en vivo si el jugador está en una"""
-    summoner_result = await riot_client.get_summoner_by_puuid(puuid, region)
+    summoner_result = await identity_cache.get_summoner(puuid, region)
     if not summoner_result.get("success"):
         raise HTTPException(status_code=404, detail="Invocador no encontrado")
     summoner_id = summoner_result["data"].get("id")
@@ -835,7 +914,104 @@ async def get_live_game(
     }
 
 
-@app.get("/api/featured-games")
+async def scout_participant(participant: dict, region: str, routing: str, budget: CallBudget) -> dict:
+    """
+    Tarjeta de scouting de un participante. Usa primero lo cacheado (ranked,
+    índice de historial y partidas almacenadas) y solo llama a Riot por lo
+    que falta y el presupuesto concede.
+    """
+    puuid = participant.get("puuid") or ""
+    champion_id = participant.get("championId", 0)
+    card = {
+        "puuid": puuid,
+        "teamId": participant.get("teamId"),
+        "championId": champion_id,
+        "championName": ddragon.champion_name(champion_id),
+        "riotId": participant.get("riotId"),
+        "ranked": None,
+        "recent": None,
+        "partial": False,
+    }
+    if not puuid:
+        return card
+
+    calls = 0
+    ranked = ranked_cache.peek(puuid, region)
+    if ranked is None:
+        ranked = await ranked_cache.get(puuid, region)
+    if ranked is None and budget.take():
+        calls += 1
+        ranked = await fetch_ranked_entries(puuid, region, budget)
+    card["ranked"] = ranked
+    card["partial"] = ranked is None
+
+    count = settings.scouting_recent_matches
+    match_ids = await match_history.cached_ids(puuid, region, 0, count)
+    if match_ids is None:
+        if not budget.take():
+            card["partial"] = True
+            return card
+        calls += 1
+        ids_result = await riot_client.get_match_ids_by_puuid(puuid, routing, 0, count)
+        match_ids = ids_result.get("data", []) if ids_result.get("success") else []
+    stored = await match_store.get_matches(match_ids)
+    missing = [mid for mid in match_ids if mid not in stored]
+    # Las partidas sin almacenar se piden hasta agotar la parte de este participante
+    granted = budget.take(min(len(missing), max(0, budget.share - calls)))
+    if granted:
+        for match in await fetch_match_details(missing[:granted], routing, budget=budget):
+            stored[match["metadata"]["matchId"]] = match
+    card["partial"] = card["partial"] or granted < len(missing)
+    card["recent"] = summarize_recent(
+        [stored[mid] for mid in match_ids if mid in stored], puuid, champion_id
+    )
+    return card
+
+
+@router.get("/api/player/{puuid}/live/scout")
+async def scout_live_game(
+    puuid: str,
+    region: str = Query("la1", description="Región del servidor")
+):
+    """
+    Scouting de la partida en vivo en NDJSON: una línea `game`, una línea
+    `participant` por jugador según se completa y una línea `done` con las
+    llamadas gastadas. Quienes miran la misma partida comparten la sesión.
+    """
+    summoner_result = await identity_cache.get_summoner(puuid, region)
+    if not summoner_result.get("success"):
+        raise HTTPException(status_code=404, detail="Invocador no encontrado")
+    live_result = await riot_client.get_current_game(summoner_result["data"].get("id"), region)
+    if not live_result.get("success"):
+        if live_result.get("status_code") == 404:
+            return {"in_game": False, "message": "El jugador no está en partida"}
+        raise HTTPException(
+            status_code=live_result.get("status_code", 500),
+            detail=live_result.get("error", "Error al obtener partida en vivo")
+        )
+
+    game_data = live_result["data"]
+    routing = riot_client.get_routing_for_region(region)
+    session = live_scouting.session(
+        region,
+        game_data,
+        lambda participant, budget: scout_participant(participant, region, routing, budget)
+    )
+
+    async def lines():
+        yield encode_json({"type": "game", "in_game": True, "game": game_data}) + b"\n"
+        async for card in session.stream():
+            yield encode_json({"type": "participant", "card": card}) + b"\n"
+        yield encode_json({
+            "type": "done",
+            "calls": session.budget.spent,
+            "budget": session.budget.limit,
+        }) + b"\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@router.get("/api/featured-games")
 async def get_featured_games(
     region: str = Query("la1", description="Región del servidor")
 ):
@@ -850,11 +1026,12 @@ async def get_featured_games(
 
 # ==================== RUTAS DE RECOMENDACIONES ====================
 
-@app.get("/api/player/{puuid}/stats")
+@router.get("/api/player/{puuid}/stats")
 async def get_player_stats(
     puuid: str,
     region: str = Query("la1", description="Región del servidor"),
-    count: int = Query(20, description="Cantidad de partidas a analizar")
+    count: int = Query(20, description="Cantidad de partidas a analizar"),
+    include_timeline: bool = Query(False, description="Incluir métricas de fase de líneas (oro/CS/XP a 10 y 15 min)")
 ):
     """Obtiene estadísticas analizadas del jugador"""
     routing = riot_client.get_routing_for_region(region)
@@ -872,7 +1049,10 @@ async def get_player_stats(
     matches = await fetch_match_details(match_ids[:15], routing)
     
     # Analizar partidas
-    stats = recommendation_service.analyze_matches(matches, puuid)
+    stats = await aggregation_pool.run("analyze_matches", matches, puuid)
+    if include_timeline and stats:
+        analytics = await fetch_timeline_analytics(matches, routing)
+        stats["lane_phase"] = summarize_lane_phase(analytics, puuid)
     
     # Generar recomendaciones
     recommendations = recommendation_service.generate_recommendations(stats)
@@ -883,14 +1063,14 @@ async def get_player_stats(
     }
 
 
-@app.get("/api/player/{puuid}/live-recommendations")
+@router.get("/api/player/{puuid}/live-recommendations")
 async def get_live_recommendations(
     puuid: str,
     region: str = Query("la1", description="Región del servidor")
 ):
     """Obtiene recomendaciones para la partida en curso"""
     # Obtener Summoner ID y verificar si está en partida
-    summoner_result = await riot_client.get_summoner_by_puuid(puuid, region)
+    summoner_result = await identity_cache.get_summoner(puuid, region)
     if not summoner_result.get("success"):
         return {
             "in_game": False,
@@ -918,8 +1098,8 @@ async def get_live_recommendations(
         matches = await fetch_match_details(match_ids_result["data"][:5], routing)
     
     # Analizar y generar recomendaciones
-    stats = recommendation_service.analyze_matches(matches, puuid)
-    recommendations = recommendation_service.generate_recommendations(stats, game_data)
+    stats = await aggregation_pool.run("analyze_matches", matches, puuid)
+    recommendations = recommendation_service.generate_recommendations(stats, game_data, puuid)
     
     return {
         "in_game": True,
@@ -930,7 +1110,7 @@ async def get_live_recommendations(
 
 # ==================== RUTAS DE ESTADO ====================
 
-@app.get("/api/status")
+@router.get("/api/status")
 async def get_platform_status(
     region: str = Query("la1", description="Región del servidor")
 ):
@@ -945,7 +1125,7 @@ async def get_platform_status(
 
 # ==================== RUTAS DE LEADERBOARDS ====================
 
-@app.get("/api/leaderboard/challenger")
+@router.get("/api/leaderboard/challenger")
 async def get_challenger_leaderboard(
     region: str = Query("la1", description="Región del servidor"),
     queue: str = Query("RANKED_SOLO_5x5", description="Tipo de cola")
@@ -959,7 +1139,7 @@ async def get_challenger_leaderboard(
     return {"league": result["data"]}
 
 
-@app.get("/api/leaderboard/grandmaster")
+@router.get("/api/leaderboard/grandmaster")
 async def get_grandmaster_leaderboard(
     region: str = Query("la1", description="Región del servidor"),
     queue: str = Query("RANKED_SOLO_5x5", description="Tipo de cola")
@@ -973,7 +1153,7 @@ async def get_grandmaster_leaderboard(
     return {"league": result["data"]}
 
 
-@app.get("/api/leaderboard/master")
+@router.get("/api/leaderboard/master")
 async def get_master_leaderboard(
     region: str = Query("la1", description="Región del servidor"),
     queue: str = Query("RANKED_SOLO_5x5", description="Tipo de cola")
@@ -989,7 +1169,7 @@ async def get_master_leaderboard(
 
 # ==================== RUTAS DE LEAGUE (para ranking section) ====================
 
-@app.get("/api/league/challenger")
+@router.get("/api/league/challenger")
 async def get_league_challenger(
     region: str = Query("la1", description="Región del servidor"),
     queue: str = Query("RANKED_SOLO_5x5", description="Tipo de cola")
@@ -1003,7 +1183,7 @@ async def get_league_challenger(
     return result["data"]
 
 
-@app.get("/api/league/grandmaster")
+@router.get("/api/league/grandmaster")
 async def get_league_grandmaster(
     region: str = Query("la1", description="Región del servidor"),
     queue: str = Query("RANKED_SOLO_5x5", description="Tipo de cola")
@@ -1017,7 +1197,7 @@ async def get_league_grandmaster(
     return result["data"]
 
 
-@app.get("/api/league/master")
+@router.get("/api/league/master")
 async def get_league_master(
     region: str = Query("la1", description="Región del servidor"),
     queue: str = Query("RANKED_SOLO_5x5", description="Tipo de cola")
@@ -1031,13 +1211,23 @@ async def get_league_master(
     return result["data"]
 
 
-@app.get("/api/ranking/top")
+@router.get("/api/ranking/top")
 async def get_ranking_top(
+    request: Request,
     region: str = Query("la1", description="Región del servidor"),
     queue: str = Query("RANKED_SOLO_5x5", description="Tipo de cola"),
     limit: int = Query(100, ge=1, le=200, description="Cantidad de jugadores a retornar")
 ):
     """Obtiene ranking enriquecido con información de perfil"""
+    return await cached_json_response(
+        request,
+        CacheTTL.RANKING,
+        lambda: compute_ranking_top(region, queue, limit)
+    )
+
+
+async def compute_ranking_top(region: str, queue: str, limit: int) -> dict:
+    """Construye el ranking Challenger + Grandmaster con perfiles enriquecidos"""
     challenger_result = await riot_client.get_challenger_league(queue, region)
     grandmaster_result = await riot_client.get_grandmaster_league(queue, region)
     version = await ddragon.get_latest_version()
@@ -1103,18 +1293,87 @@ async def get_ranking_top(
     }
 
 
+# ==================== RUTAS DE ADMINISTRACIÓN ====================
+
+def require_admin(x_admin_token: Optional[str] = Header(None)) -> None:
+    """Exige la cabecera X-Admin-Token; sin ADMIN_TOKEN configurado no hay acceso"""
+    if not settings.admin_token or x_admin_token != settings.admin_token:
+        raise HTTPException(status_code=403, detail="Acceso restringido")
+
+
+@router.get("/api/admin/profiling", dependencies=[Depends(require_admin)], include_in_schema=False)
+async def get_profiling_status():
+    """Estado del profiler por muestreo"""
+    return profiler.status()
+
+
+@router.post("/api/admin/profiling", dependencies=[Depends(require_admin)], include_in_schema=False)
+async def configure_profiling(
+    enabled: bool = Query(..., description="Activar o desactivar el muestreo"),
+    sample_rate: float = Query(0.0, ge=0.0, le=1.0, description="Fracción de peticiones a perfilar"),
+    routes: Optional[str] = Query(None, description="Prefijos de ruta a perfilar siempre, separados por coma"),
+    interval_ms: Optional[float] = Query(None, ge=1.0, le=1000.0, description="Intervalo de muestreo")
+):
+    """Configura el profiler sin necesidad de redeploy"""
+    profiler.configure(
+        enabled,
+        sample_rate,
+        (routes or "").split(","),
+        interval_ms
+    )
+    return profiler.status()
+
+
+@router.get("/api/admin/profiling/stacks", dependencies=[Depends(require_admin)], include_in_schema=False)
+async def download_profiling_stacks():
+    """Descarga las pilas colapsadas (compatibles con flamegraph.pl y speedscope)"""
+    return Response(
+        content=profiler.collapsed(),
+        media_type="text/plain",
+        headers={"Content-Disposition": 'attachment; filename="profile.folded"'}
+    )
+
+
+@router.delete("/api/admin/profiling/stacks", dependencies=[Depends(require_admin)], include_in_schema=False)
+async def reset_profiling_stacks():
+    """Descarta las muestras acumuladas"""
+    profiler.reset()
+    return profiler.status()
+
+
 # ==================== RUTAS DE RUNAS ====================
 
-@app.get("/api/ddragon/runes")
-async def get_runes():
+@router.get("/api/ddragon/runes")
+async def get_runes(request: Request):
     """Obtiene las runas del juego"""
-    runes = await ddragon.get_runes()
-    return runes
+    return await cached_json_response(request, CacheTTL.DDRAGON, ddragon.get_runes)
+
+
+# ==================== RUTAS DE TIER LIST ====================
+
+@router.get("/api/tierlist")
+async def get_tierlist(
+    request: Request,
+    region: str = Query("la1", description="Región del servidor"),
+    role: Optional[str] = Query(None, description="Rol (TOP, JUNGLE, MIDDLE, BOTTOM, UTILITY); vacío = todos"),
+    bracket: str = Query("all", description="Bracket de rango: " + ", ".join(BRACKETS)),
+    patch: Optional[str] = Query(None, description="Parche (p. ej. 15.1); por defecto el actual")
+):
+    """
+    Tier list materializada: winrate, pickrate, banrate y tier por campeón.
+    Se recalcula en segundo plano; la petición solo lee la vista (con ETag).
+    """
+    if bracket not in BRACKETS:
+        raise HTTPException(status_code=400, detail="Bracket no válido")
+    payload = tierlist_store.view(region.lower(), role, bracket, patch)
+    if payload is None:
+        raise HTTPException(status_code=404, detail="Tier list aún no disponible")
+    return payload.to_response(request)
 
 
 # ==================== RUTAS DE BUILDS ====================
 
-@app.get("/api/champion/build/{champion_name}")
+@router.get("/api/champion/build/{champion_name}")
 async def get_champion_build_data(
     champion_name: str,
     role: Optional[str] = Query(None, description="Rol del campeon (MID, TOP, JUNGLE, BOTTOM, UTILITY)")
@@ -1125,16 +1384,19 @@ async def get_champion_build_data(
     """
     # Intentar obtener build especifica
     build = get_champion_build(champion_name, role)
+    champions = await ddragon.get_champions()
+    champ_data = champions.get(champion_name)
     
-    if not build:
-        # Obtener datos del campeon para determinar su clase
-        champions = await ddragon.get_champions()
-        champ_data = champions.get(champion_name)
-        
-        if champ_data:
-            tags = champ_data.get("tags", ["Fighter"])
-            primary_class = tags[0] if tags else "Fighter"
-            build = get_default_build_for_class(primary_class, role)
+    if not build and champ_data:
+        # Build generica segun la clase del campeon
+        tags = champ_data.get("tags", ["Fighter"])
+        primary_class = tags[0] if tags else "Fighter"
+        build = get_default_build_for_class(primary_class, role)
+    
+    # Datos observados en el parche actual, si hay suficientes partidas
+    if champ_data:
+        observed = patch_stats.partition().champion(int(champ_data["key"]), role)
+        build = apply_patch_stats(build, observed, settings.patch_stats_min_games)
     
     if not build:
         raise HTTPException(status_code=404, detail="No se encontraron datos de build")
@@ -1155,13 +1417,109 @@ async def get_champion_build_data(
         "stats": {
             "winrate": build.get("winrate", 50.0),
             "pickrate": build.get("pickrate", 5.0),
-            "games": build.get("games", 10000)
+            "games": build.get("games", 10000),
+            "patch": build.get("patch")
         }
     }
 
 
+@router.get("/api/champion/stats/{champion_id}")
+async def get_champion_patch_stats(
+    champion_id: int,
+    role: Optional[str] = Query(None, description="Rol (TOP, JUNGLE, MIDDLE, BOTTOM, UTILITY)"),
+    patches: int = Query(1, ge=1, le=6, description="Parches recientes a combinar (1 = solo el actual)")
+):
+    """
+    Estadísticas del campeón observadas en las partidas descargadas,
+    particionadas por parche: por defecto solo el parche actual.
+    """
+    partition = patch_stats.recent(patches)
+    stats = partition.champion(champion_id, role)
+    if stats is None:
+        raise HTTPException(status_code=404, detail="Sin partidas de este campeón en los parches pedidos")
+    stats["roles"] = partition.roles(champion_id)
+    stats["patches"] = partition.patch.split("+")
+    return stats
+
+
+@router.get("/api/champion/matchups/{champion_id}")
+async def get_champion_matchups(
+    champion_id: int,
+    role: str = Query(..., description="Rol (TOP, JUNGLE, MIDDLE, BOTTOM, UTILITY)"),
+    k: int = Query(5, ge=1, le=20, description="Rivales a devolver por lista"),
+    min_games: int = Query(10, ge=1, description="Partidas mínimas del enfrentamiento"),
+    opponent: Optional[int] = Query(None, description="Rival concreto (consulta de un solo par)"),
+    patches: int = Query(1, ge=1, le=2, description="Parches recientes a combinar")
+):
+    """
+    Enfrentamientos de línea del campeón: mejores y peores rivales por
+    winrate, o un par concreto con `opponent`.
+    """
+    if opponent is not None:
+        return matchup_store.lookup(champion_id, opponent, role, patches)
+    return {
+        "championId": champion_id,
+        "role": normalize_role(role),
+        "patches": matchup_store.patches()[:patches],
+        "best": matchup_store.top(champion_id, role, k, min_games, patches=patches),
+        "worst": matchup_store.top(champion_id, role, k, min_games, worst=True, patches=patches),
+    }
+
+
 # ==================== INICIAR SERVIDOR ====================
 
+def create_app() -> FastAPI:
+    """
+    Construye la aplicación: middlewares, rutas y archivos estáticos.
+    Gunicorn la importa una vez en el proceso maestro (preload_app) y los
+    workers la heredan al hacer fork; ver gunicorn.conf.py.
+    """
+    application = FastAPI(
+        title="LoL Statistics App",
+        description="Aplicación para estadísticas de League of Legends con recomendaciones",
+        version="1.0.0",
+        lifespan=lifespan,
+        default_response_class=ORJSONResponse
+    )
+
+    # Configurar CORS
+    application.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    # Compresión brotli/gzip negociada para respuestas no cacheadas
+    application.add_middleware(CompressionMiddleware, minimum_size=1024)
+
+    # Profiler por muestreo (inactivo por defecto, se controla desde /api/admin/profiling)
+    application.add_middleware(ProfilingMiddleware)
+
+    # Trazas por petición: Server-Timing, trazas de depuración y log de peticiones lentas
+    application.add_middleware(
+        TracingMiddleware,
+        debug=settings.trace_debug,
+        slow_request_ms=settings.slow_request_ms
+    )
+
+    # Métricas Prometheus por ruta (el middleware más externo mide todo)
+    application.add_middleware(MetricsMiddleware)
+
+    application.include_router(router)
+
+    # Montar archivos estáticos
+    if os.path.exists(frontend_path):
+        application.mount("/static", StaticFiles(directory=frontend_path), name="static")
+
+    return application
+
+
+app = create_app()
+
+
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000, reload=True)
+    # Desarrollo: un proceso con recarga. Producción: gunicorn -c gunicorn.conf.py backend.main:app
+    uvicorn.run("backend.main:create_app", factory=True, host="0.0.0.0", port=8000, reload=True)
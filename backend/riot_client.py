@@ -1,24 +1,39 @@
 """
 Cliente HTTP para la API de Riot Games
 """
+import time
 import httpx
 from typing import Optional, Any
 from backend.config import settings
+from backend.services.metrics import observe_riot_request, riot_endpoint_label
+from backend.services.negative_cache import negative_cache
+from backend.services.riot_replay import build_transport
+from backend.services.tracing import span
 
 
 class RiotAPIClient:
     """Cliente para realizar peticiones a la API de Riot Games"""
     
-    def __init__(self):
+    def __init__(self, transport: Optional[httpx.AsyncBaseTransport] = None):
         self.api_key = settings.riot_api_key
         self.headers = {
             "X-Riot-Token": self.api_key,
             "Accept": "application/json"
         }
+        limits = httpx.Limits(max_connections=40, max_keepalive_connections=20)
+        if transport is None and settings.riot_transport_mode:
+            # Grabación o reproducción del tráfico (ver services/riot_replay.py)
+            transport = build_transport(
+                settings.riot_transport_mode,
+                settings.riot_archive_path,
+                settings.riot_replay_speed,
+                httpx.AsyncHTTPTransport(limits=limits)
+            )
         self._client = httpx.AsyncClient(
             headers=self.headers.copy(),
             timeout=httpx.Timeout(30.0),
-            limits=httpx.Limits(max_connections=40, max_keepalive_connections=20)
+            limits=limits,
+            transport=transport
         )
     
     def _get_platform_url(self, region: str) -> str:
@@ -35,11 +50,27 @@ class RiotAPIClient:
     
     async def _request(self, url: str, params: Optional[dict] = None) -> dict:
         """Realiza una petición GET a la API"""
+        endpoint = riot_endpoint_label(url)
+        # Resultados negativos recientes (no encontrado, fuera de partida, sin ranked)
+        negative = await negative_cache.get(endpoint, url)
+        if negative is not None:
+            return negative
+        start = time.perf_counter()
         try:
-            response = await self._client.get(url, params=params)
+            with span("riot", "riot", endpoint=endpoint) as current:
+                response = await self._client.get(url, params=params)
+                current.set("status", response.status_code)
+            observe_riot_request(endpoint, response.status_code, time.perf_counter() - start, response.headers)
             response.raise_for_status()
-            return {"success": True, "data": response.json()}
+            data = response.json()
+            result_class = negative_cache.classify(endpoint, response.status_code, data)
+            if result_class:
+                await negative_cache.remember(endpoint, url, result_class)
+            return {"success": True, "data": data}
         except httpx.HTTPStatusError as e:
+            result_class = negative_cache.classify(endpoint, e.response.status_code)
+            if result_class:
+                await negative_cache.remember(endpoint, url, result_class)
             error_messages = {
                 400: "Petición inválida",
                 401: "API Key no válida",
@@ -55,6 +86,7 @@ class RiotAPIClient:
                 "status_code": e.response.status_code
             }
         except httpx.RequestError as e:
+            observe_riot_request(endpoint, None, time.perf_counter() - start)
             return {"success": False, "error": f"Error de conexión: {str(e)}"}
 
     async def aclose(self) -> None:
@@ -0,0 +1,304 @@
+"""
+Agregación de partidas fuera del event loop: las agregaciones grandes
+(estadísticas por campeón, análisis de recomendaciones) se ejecutan en un
+pool de procesos con el estado ya cargado. A cada worker solo se le envía
+una versión compacta de cada partida: la duración y los campos usados del
+participante consultado, no el JSON completo de los diez jugadores.
+"""
+import asyncio
+import logging
+import multiprocessing
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, List, Optional
+
+from backend.config import settings
+from backend.services.recommendations import recommendation_service
+from backend.services.tracing import span, traced
+
+logger = logging.getLogger(__name__)
+
+
+# Campos del participante que leen las agregaciones
+PARTICIPANT_FIELDS = (
+    "puuid", "win", "championId", "championName", "teamPosition", "role", "lane",
+    "kills", "deaths", "assists", "totalMinionsKilled", "neutralMinionsKilled",
+    "visionScore", "totalDamageDealtToChampions", "goldEarned",
+    "item0", "item1", "item2", "item3", "item4", "item5", "item6",
+    "summoner1Id", "summoner2Id",
+)
+
+
+def new_champion_totals() -> dict:
+    """Acumulador vacío de un campeón (sumas y conteos de items, hechizos y keystones)"""
+    return {
+        "games": 0,
+        "wins": 0,
+        "kills": 0,
+        "deaths": 0,
+        "assists": 0,
+        "cs": 0,
+        "duration": 0,
+        "damage": 0,
+        "gold": 0,
+        "vision": 0,
+        "items": defaultdict(int),
+        "spells": defaultdict(int),
+        "keystones": defaultdict(int)
+    }
+
+
+# Campos numéricos que se suman al acumular o combinar totales
+TOTAL_FIELDS = ("games", "wins", "kills", "deaths", "assists", "cs", "duration", "damage", "gold", "vision")
+COUNTER_FIELDS = ("items", "spells", "keystones")
+
+
+def accumulate_champion(stats: dict, info: dict, player: dict) -> None:
+    """Suma una partida del participante `player` al acumulador `stats`"""
+    stats["games"] += 1
+    if player.get("win"):
+        stats["wins"] += 1
+    stats["kills"] += player.get("kills", 0)
+    stats["deaths"] += player.get("deaths", 0)
+    stats["assists"] += player.get("assists", 0)
+    stats["cs"] += player.get("totalMinionsKilled", 0) + player.get("neutralMinionsKilled", 0)
+    stats["duration"] += info.get("gameDuration", 0)
+    stats["damage"] += player.get("totalDamageDealtToChampions", 0)
+    stats["gold"] += player.get("goldEarned", 0)
+    stats["vision"] += player.get("visionScore", 0)
+
+    built_items = [player.get(f"item{i}") for i in range(6)]
+    for item_id in built_items:
+        if item_id and item_id != 0:
+            stats["items"][int(item_id)] += 1
+
+    spells = [player.get("summoner1Id"), player.get("summoner2Id")]
+    if all(spells):
+        spells.sort()
+        key = f"{spells[0]}-{spells[1]}"
+        stats["spells"][key] += 1
+
+    keystone = (
+        player.get("perks", {})
+        .get("styles", [{}])[0]
+        .get("selections", [{}])[0]
+        .get("perk")
+    )
+    if keystone:
+        stats["keystones"][int(keystone)] += 1
+
+
+def merge_champion_totals(target: dict, source: dict) -> None:
+    """Suma los totales `source` (p. ej. un bucket guardado) sobre `target`"""
+    for field in TOTAL_FIELDS:
+        target[field] += source.get(field, 0)
+    for field in COUNTER_FIELDS:
+        for key, count in source.get(field, {}).items():
+            target[field][key] += count
+
+
+def finalize_champion_stats(champ_stats: Dict[int, dict]) -> List[dict]:
+    """Lista por campeón, más jugados primero, con los items/hechizos/keystones más usados"""
+    summary = []
+    for champ_id, data in champ_stats.items():
+        summary.append({
+            "championId": champ_id,
+            "games": data["games"],
+            "wins": data["wins"],
+            "kills": data["kills"],
+            "deaths": data["deaths"],
+            "assists": data["assists"],
+            "cs": data["cs"],
+            "duration": data["duration"],
+            "damage": data["damage"],
+            "gold": data["gold"],
+            "vision": data["vision"],
+            "items": sorted(
+                ( {"id": int(item_id), "count": count} for item_id, count in data["items"].items() ),
+                key=lambda x: (-x["count"], x["id"])
+            )[:6],
+            "spells": sorted(
+                (
+                    {"ids": [int(pair.split("-")[0]), int(pair.split("-")[1])], "count": count}
+                    for pair, count in data["spells"].items()
+                ),
+                key=lambda x: (-x["count"], x["ids"])
+            )[:2],
+            "keystones": sorted(
+                ( {"id": int(perk_id), "count": count} for perk_id, count in data["keystones"].items() ),
+                key=lambda x: (-x["count"], x["id"])
+            )[:2]
+        })
+
+    # Empates por id: el resultado no depende del orden de las partidas
+    summary.sort(key=lambda c: (-c["games"], c["championId"]))
+    return summary
+
+
+@traced("champion_stats_summary")
+def summarize_champion_stats(matches: List[dict], puuid: str) -> List[dict]:
+    """Agrega estadísticas por campeón (partidas, KDA, items, hechizos, keystones)"""
+    champ_stats: Dict[int, dict] = {}
+
+    for match in matches:
+        info = match.get("info", {})
+        participants = info.get("participants", [])
+        player = next((p for p in participants if p.get("puuid") == puuid), None)
+        if not player:
+            continue
+        champ_id = int(player.get("championId", 0))
+        stats = champ_stats.get(champ_id)
+        if stats is None:
+            stats = champ_stats[champ_id] = new_champion_totals()
+        accumulate_champion(stats, info, player)
+
+    return finalize_champion_stats(champ_stats)
+
+
+# Rollups diarios: un bucket por (día UTC, queueId, championId)
+DAY_SECONDS = 86400
+
+
+def bucket_key(day: int, queue_id: int, champion_id: int) -> str:
+    return f"{day}:{queue_id}:{champion_id}"
+
+
+def summarize_daily_buckets(matches: List[dict], puuid: str) -> dict:
+    """
+    Totales por bucket diario de las partidas de `puuid` y las partidas
+    sumadas (matchId -> [gameCreation en ms, queueId]), para `PlayerRollup`.
+    """
+    buckets: Dict[str, dict] = {}
+    ingested: Dict[str, list] = {}
+    for match in matches:
+        match_id = match.get("metadata", {}).get("matchId")
+        info = match.get("info", {})
+        player = next((p for p in info.get("participants", []) if p.get("puuid") == puuid), None)
+        if not match_id or not player or match_id in ingested:
+            continue
+        creation = int(info.get("gameCreation", 0))
+        queue_id = int(info.get("queueId", 0))
+        key = bucket_key(creation // 1000 // DAY_SECONDS, queue_id, int(player.get("championId", 0)))
+        stats = buckets.get(key)
+        if stats is None:
+            stats = buckets[key] = new_champion_totals()
+        accumulate_champion(stats, info, player)
+        ingested[match_id] = [creation, queue_id]
+    for stats in buckets.values():
+        for field in COUNTER_FIELDS:
+            stats[field] = dict(stats[field])
+    return {"buckets": buckets, "matches": ingested}
+
+
+def _analyze_matches(matches: List[dict], puuid: str) -> dict:
+    stats = recommendation_service.analyze_matches(matches, puuid)
+    if stats:
+        # El defaultdict con lambda no se puede devolver desde otro proceso
+        stats["champion_stats"] = dict(stats["champion_stats"])
+    return stats
+
+
+# Agregaciones disponibles en el pool, por nombre (las funciones no viajan entre procesos)
+AGGREGATIONS: Dict[str, Callable[[List[dict], str], object]] = {
+    "champion_stats": summarize_champion_stats,
+    "analyze_matches": _analyze_matches,
+    "daily_buckets": summarize_daily_buckets,
+}
+
+
+def compact_match(match: dict, puuid: str) -> Optional[dict]:
+    """
+    Partida reducida a lo que necesitan las agregaciones, con la misma
+    forma que Match-V5; None si el jugador no participa.
+    """
+    info = match.get("info", {})
+    player = next((p for p in info.get("participants", []) if p.get("puuid") == puuid), None)
+    if player is None:
+        return None
+    compact = {field: player[field] for field in PARTICIPANT_FIELDS if field in player}
+    keystone = (
+        player.get("perks", {})
+        .get("styles", [{}])[0]
+        .get("selections", [{}])[0]
+        .get("perk")
+    )
+    if keystone:
+        compact["perks"] = {"styles": [{"selections": [{"perk": keystone}]}]}
+    return {
+        "metadata": {"matchId": match.get("metadata", {}).get("matchId")},
+        "info": {
+            "gameDuration": info.get("gameDuration", 0),
+            "gameCreation": info.get("gameCreation", 0),
+            "queueId": info.get("queueId", 0),
+            "participants": [compact],
+        },
+    }
+
+
+def _warm_worker() -> None:
+    """Inicializador de cada proceso: deja cargados los módulos de agregación"""
+    import backend.services.champion_builds  # noqa: F401
+
+
+def _run_aggregation(name: str, matches: List[dict], puuid: str):
+    return AGGREGATIONS[name](matches, puuid)
+
+
+class AggregationPool:
+    """
+    Ejecuta agregaciones en un ProcessPoolExecutor a partir de `threshold`
+    partidas; por debajo (o con `workers=0`) se ejecutan en línea, porque
+    el coste de enviar los datos superaría al de agregarlos.
+    """
+
+    def __init__(self, workers: int = 1, threshold: int = 100, start_method: str = "spawn"):
+        self.workers = workers
+        self.threshold = threshold
+        self.start_method = start_method
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.workers > 0
+
+    def start(self) -> None:
+        """
+        Crea el pool. Con gunicorn se llama desde el lifespan de cada worker;
+        "spawn" evita hacer fork de un proceso con hilos y event loop activos.
+        """
+        if not self.enabled or self._executor is not None:
+            return
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context(self.start_method),
+            initializer=_warm_worker,
+        )
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def run(self, name: str, matches: List[dict], puuid: str):
+        """Resultado de la agregación `name` sobre `matches` para `puuid`"""
+        if not self.enabled or len(matches) < self.threshold:
+            return AGGREGATIONS[name](matches, puuid)
+        self.start()
+        compact = [c for c in (compact_match(match, puuid) for match in matches) if c is not None]
+        with span("aggregation.pool", "aggregate", aggregation=name, matches=len(compact)):
+            loop = asyncio.get_running_loop()
+            try:
+                return await loop.run_in_executor(self._executor, _run_aggregation, name, compact, puuid)
+            except BrokenProcessPool:
+                # Un worker murió (p. ej. OOM): se recrea el pool en la próxima llamada
+                logger.warning("Pool de agregación roto; se agrega en línea")
+                self._executor = None
+                return AGGREGATIONS[name](compact, puuid)
+
+
+# Instancia global
+aggregation_pool = AggregationPool(
+    workers=settings.aggregation_workers,
+    threshold=settings.aggregation_threshold
+)
@@ -0,0 +1,224 @@
+"""
+Autocompletado de Riot ID sobre todos los jugadores que el backend ha visto:
+cuentas resueltas en búsquedas, jugadores del ranking y participantes de las
+partidas descargadas. Un array ordenado por región (búsqueda binaria del
+prefijo) responde en memoria, sin llamadas a Riot, ordenando por popularidad.
+Las puntuaciones se comparten entre workers mediante un sorted set de Redis.
+"""
+import asyncio
+import heapq
+import logging
+from bisect import bisect_left, insort
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from backend.services.cache import cache
+from backend.services.identity import normalize_name, normalize_riot_id
+
+logger = logging.getLogger(__name__)
+
+
+# Peso de cada fuente en la popularidad
+SEARCH_WEIGHT = 10.0
+LADDER_WEIGHT = 3.0
+MATCH_WEIGHT = 1.0
+
+
+class PrefixIndex:
+    """
+    Riot IDs normalizados de una región en un array ordenado. Los prefijos
+    cortos (muy frecuentes al teclear) guardan su top-K precalculado; los
+    largos recorren como mucho `max_scan` claves a partir de bisect.
+    """
+
+    def __init__(self, max_entries: int = 200000, top_k: int = 20, short_prefix: int = 2, max_scan: int = 2000):
+        self.max_entries = max_entries
+        self.top_k = top_k
+        self.short_prefix = short_prefix
+        self.max_scan = max_scan
+        self._keys: List[str] = []
+        # clave normalizada -> [gameName, tagLine, puntuación]
+        self._entries: Dict[str, list] = {}
+        # prefijo corto -> claves ordenadas por puntuación (como mucho top_k)
+        self._top: Dict[str, List[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, game_name: str, tag_line: str, score: float) -> None:
+        """Suma `score` a la popularidad del Riot ID; conserva la grafía ya guardada"""
+        key = normalize_riot_id(game_name, tag_line)
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = [game_name, tag_line, 0.0]
+            insort(self._keys, key)
+        entry[2] += score
+        self._update_top(key)
+        if len(self._entries) > self.max_entries:
+            self._prune()
+
+    def complete(self, prefix: str, limit: int = 8) -> List[dict]:
+        """Hasta `limit` Riot IDs que empiezan por `prefix` (ya normalizado), más populares primero"""
+        if not prefix or limit <= 0:
+            return []
+        if len(prefix) <= self.short_prefix and limit <= self.top_k:
+            keys = self._top.get(prefix, [])[:limit]
+        else:
+            start = bisect_left(self._keys, prefix)
+            candidates = []
+            for key in self._keys[start:start + self.max_scan]:
+                if not key.startswith(prefix):
+                    break
+                candidates.append(key)
+            keys = heapq.nlargest(limit, candidates, key=self._score)
+        return [
+            {"gameName": self._entries[k][0], "tagLine": self._entries[k][1], "score": self._entries[k][2]}
+            for k in keys
+        ]
+
+    def riot_id(self, key: str) -> Optional[str]:
+        """"gameName#tagLine" con la grafía guardada para una clave normalizada"""
+        entry = self._entries.get(key)
+        return f"{entry[0]}#{entry[1]}" if entry is not None else None
+
+    def add_many(self, rows: List[Tuple[str, str, float]]) -> None:
+        """Carga masiva (gameName, tagLine, puntuación): un solo sort al final"""
+        for game_name, tag_line, score in rows:
+            self._entries[normalize_riot_id(game_name, tag_line)] = [game_name, tag_line, score]
+        if len(self._entries) > self.max_entries:
+            self._prune()
+        else:
+            self._rebuild()
+
+    def _score(self, key: str) -> float:
+        return self._entries[key][2]
+
+    def _update_top(self, key: str) -> None:
+        score = self._entries[key][2]
+        for size in range(1, min(self.short_prefix, len(key)) + 1):
+            top = self._top.setdefault(key[:size], [])
+            if key not in top:
+                if len(top) >= self.top_k and score <= self._entries[top[-1]][2]:
+                    continue
+                top.append(key)
+            top.sort(key=self._score, reverse=True)
+            del top[self.top_k:]
+
+    def _prune(self) -> None:
+        """Descarta el 10% menos popular y reconstruye el array y los top-K"""
+        keep = heapq.nlargest(int(self.max_entries * 0.9), self._entries, key=self._score)
+        self._entries = {key: self._entries[key] for key in keep}
+        self._rebuild()
+
+    def _rebuild(self) -> None:
+        self._keys = sorted(self._entries)
+        self._top = {}
+        for key in sorted(self._entries, key=self._score, reverse=True):
+            for size in range(1, min(self.short_prefix, len(key)) + 1):
+                top = self._top.setdefault(key[:size], [])
+                if len(top) < self.top_k:
+                    top.append(key)
+
+
+class AutocompleteIndex:
+    """
+    Particiones por región. Los incrementos se acumulan en memoria y
+    `flush()` los envía a Redis; `load()` trae las puntuaciones compartidas
+    por todos los workers.
+    """
+
+    def __init__(self, max_entries: int = 200000, load_limit: int = 50000):
+        self.max_entries = max_entries
+        self.load_limit = load_limit
+        self._partitions: Dict[str, PrefixIndex] = {}
+        # región -> clave normalizada -> incremento pendiente de enviar
+        self._pending: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+
+    @staticmethod
+    def _redis_key(region: str) -> str:
+        return f"autocomplete:{region}"
+
+    def partition(self, region: str) -> PrefixIndex:
+        index = self._partitions.get(region)
+        if index is None:
+            index = self._partitions[region] = PrefixIndex(self.max_entries)
+        return index
+
+    def record(self, region: str, game_name: Optional[str], tag_line: Optional[str], weight: float) -> None:
+        """Registra un avistamiento de un Riot ID"""
+        if not game_name or not tag_line or not region:
+            return
+        region = region.lower()
+        self.partition(region).add(game_name, tag_line, weight)
+        self._pending[region][normalize_riot_id(game_name, tag_line)] += weight
+
+    def record_match(self, match: dict) -> None:
+        """Registra los diez participantes de una partida Match-V5"""
+        info = match.get("info", {})
+        region = info.get("platformId", "")
+        for participant in info.get("participants", []):
+            self.record(region, participant.get("riotIdGameName"), participant.get("riotIdTagline"), MATCH_WEIGHT)
+
+    def complete(self, region: str, query: str, limit: int = 8) -> List[dict]:
+        """Sugerencias para lo tecleado ("fak", "faker#k")"""
+        name, _, tag = query.partition("#")
+        prefix = normalize_name(name) + ("#" + normalize_name(tag) if "#" in query else "")
+        index = self._partitions.get(region.lower())
+        return index.complete(prefix, limit) if index is not None else []
+
+    async def flush(self) -> None:
+        """
+        Envía a Redis los incrementos acumulados; el set se recorta a
+        `max_entries`. El miembro es la grafía que tiene el índice local, que
+        tras `load()` es la más popular: los workers convergen en la misma.
+        """
+        pending, self._pending = self._pending, defaultdict(lambda: defaultdict(float))
+        for region, increments in pending.items():
+            index = self.partition(region)
+            members: Dict[str, float] = {}
+            for key, amount in increments.items():
+                riot_id = index.riot_id(key)
+                if riot_id is not None:
+                    members[riot_id] = amount
+            await cache.incr_scores(self._redis_key(region), members, self.max_entries)
+
+    async def load(self, regions: List[str]) -> int:
+        """
+        Sustituye las puntuaciones locales por las compartidas; devuelve las
+        entradas cargadas. Los miembros que solo difieren en mayúsculas o
+        forma Unicode suman sus puntuaciones y se muestran con la grafía más
+        popular (la primera, porque llegan ordenados).
+        """
+        loaded = 0
+        for region in regions:
+            rows: List[Tuple[str, float]] = await cache.top_scores(self._redis_key(region), self.load_limit)
+            merged: Dict[str, list] = {}
+            for member, score in rows:
+                game_name, _, tag_line = member.rpartition("#")
+                if not game_name:
+                    continue
+                key = normalize_riot_id(game_name, tag_line)
+                entry = merged.get(key)
+                if entry is None:
+                    merged[key] = [game_name, tag_line, score]
+                else:
+                    entry[2] += score
+            entries = [tuple(entry) for entry in merged.values()]
+            self.partition(region).add_many(entries)
+            loaded += len(entries)
+        return loaded
+
+    async def run_sync(self, regions: List[str], interval: float = 300.0) -> None:
+        """Tarea de fondo del lifespan: carga inicial y sincronización periódica"""
+        await self.load(regions)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.flush()
+                await self.load(regions)
+            except Exception as exc:
+                logger.warning("Sincronización del autocompletado fallida: %s", exc)
+
+
+# Instancia global
+autocomplete_index = AutocompleteIndex()
@@ -1,13 +1,28 @@
 """
 Servicio de caché con Redis
 """
-import json
 import os
-from typing import Any, Optional
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
 from functools import wraps
 import redis.asyncio as redis
 from datetime import timedelta
 
+from backend.services.codec import CacheCodec, load_dictionary
+from backend.services.metrics import observe_cache
+from backend.services.tracing import span
+
+
+# Alarga el TTL de una clave hasta al menos ARGV[1] segundos sin acortarlo
+# nunca; equivale a EXPIRE NX + EXPIRE GT, que solo existen desde Redis 7
+EXTEND_TTL_SCRIPT = """
+local ttl = redis.call('TTL', KEYS[1])
+if ttl >= 0 and ttl >= tonumber(ARGV[1]) then
+    return 0
+end
+return redis.call('EXPIRE', KEYS[1], ARGV[1])
+"""
+
 
 class RedisCache:
     """Cliente de caché Redis"""
@@ -16,15 +31,18 @@ class RedisCache:
         self.redis_url = os.getenv("REDIS_URL", "redis://localhost:6379")
         self._client: Optional[redis.Redis] = None
         self._enabled = True
+        # msgpack + zstd con byte de formato; diccionario opcional (CACHE_ZSTD_DICT)
+        dictionary_path = os.getenv("CACHE_ZSTD_DICT")
+        self.codec = CacheCodec(
+            threshold=int(os.getenv("CACHE_COMPRESS_THRESHOLD", "512")),
+            dictionary=load_dictionary(dictionary_path) if dictionary_path else None
+        )
     
     async def connect(self):
         """Conectar a Redis"""
         try:
-            self._client = redis.from_url(
-                self.redis_url,
-                encoding="utf-8",
-                decode_responses=True
-            )
+            # Valores binarios (ver codec.py): sin decode_responses
+            self._client = redis.from_url(self.redis_url)
             # Test connection
             await self._client.ping()
             print(f"Redis conectado: {self.redis_url}")
@@ -42,26 +60,97 @@ class RedisCache:
         """Obtener valor de caché"""
         if not self._enabled or not self._client:
             return None
+        start = time.perf_counter()
         try:
-            data = await self._client.get(key)
+            with span("redis.get", "cache"):
+                data = await self._client.get(key)
             if data:
-                return json.loads(data)
+                observe_cache("redis", "get", "hit", time.perf_counter() - start)
+                return self.codec.decode(data)
+            observe_cache("redis", "get", "miss", time.perf_counter() - start)
             return None
         except Exception:
+            observe_cache("redis", "get", "error")
             return None
     
-    async def set(self, key: str, value: Any, ttl_seconds: int = 300):
-        """Guardar valor en caché"""
+    async def set(self, key: str, value: Any, ttl_seconds: int = 300, tags: Sequence[str] = ()):
+        """Guardar valor en caché (opcionalmente asociado a etiquetas de invalidación)"""
         if not self._enabled or not self._client:
             return
+        if tags:
+            await self.set_many({key: value}, ttl_seconds, tags)
+            return
+        start = time.perf_counter()
         try:
-            await self._client.setex(
-                key,
-                timedelta(seconds=ttl_seconds),
-                json.dumps(value)
-            )
+            with span("redis.set", "cache"):
+                await self._client.setex(
+                    key,
+                    timedelta(seconds=ttl_seconds),
+                    self.codec.encode(value)
+                )
+            observe_cache("redis", "set", "ok", time.perf_counter() - start)
         except Exception:
-            pass
+            observe_cache("redis", "set", "error")
+    
+    async def get_many(self, keys: Sequence[str]) -> Dict[str, Any]:
+        """Obtener varias claves en un solo viaje (MGET); omite las ausentes"""
+        if not self._enabled or not self._client or not keys:
+            return {}
+        start = time.perf_counter()
+        try:
+            with span("redis.mget", "cache", keys=len(keys)):
+                values = await self._client.mget(keys)
+        except Exception:
+            observe_cache("redis", "get_many", "error")
+            return {}
+        found = {}
+        for key, data in zip(keys, values):
+            if data:
+                try:
+                    found[key] = self.codec.decode(data)
+                except ValueError:
+                    observe_cache("redis", "get", "error")
+        # Aciertos y fallos por clave, para que la tasa de aciertos de "get" siga siendo comparable
+        observe_cache("redis", "get", "hit", count=len(found))
+        observe_cache("redis", "get", "miss", count=len(keys) - len(found))
+        observe_cache("redis", "get_many", "ok", time.perf_counter() - start)
+        return found
+    
+    async def set_many(
+        self,
+        items: Union[Dict[str, Any], Iterable[Tuple[str, Any, int]]],
+        ttl_seconds: int = 300,
+        tags: Sequence[str] = ()
+    ):
+        """
+        Guardar varias claves en un solo viaje (pipeline sin transacción).
+        `items` es un dict (todas con `ttl_seconds`) o tuplas (clave, valor, ttl)
+        para TTL por clave. Las claves se añaden a los conjuntos de `tags`.
+        """
+        if not self._enabled or not self._client:
+            return
+        entries = (
+            [(key, value, ttl_seconds) for key, value in items.items()]
+            if isinstance(items, dict) else list(items)
+        )
+        if not entries:
+            return
+        start = time.perf_counter()
+        try:
+            with span("redis.pipeline_set", "cache", keys=len(entries)):
+                pipe = self._client.pipeline(transaction=False)
+                for key, value, ttl in entries:
+                    pipe.setex(key, timedelta(seconds=ttl), self.codec.encode(value))
+                longest = max(ttl for _, _, ttl in entries)
+                for tag in tags:
+                    tag_key = self._tag_key(tag)
+                    pipe.sadd(tag_key, *(key for key, _, _ in entries))
+                    # El conjunto vive al menos tanto como su entrada más longeva
+                    pipe.eval(EXTEND_TTL_SCRIPT, 1, tag_key, longest)
+                await pipe.execute()
+            observe_cache("redis", "set_many", "ok", time.perf_counter() - start)
+        except Exception:
+            observe_cache("redis", "set_many", "error")
     
     async def delete(self, key: str):
         """Eliminar valor de caché"""
@@ -72,16 +161,135 @@ class RedisCache:
         except Exception:
             pass
     
-    async def clear_pattern(self, pattern: str):
-        """Eliminar claves que coincidan con patrón"""
+    async def delete_many(self, keys: Sequence[str], batch_size: int = 500) -> int:
+        """Eliminar claves con UNLINK por lotes (la memoria se libera en segundo plano)"""
+        if not self._enabled or not self._client or not keys:
+            return 0
+        removed = 0
+        try:
+            for i in range(0, len(keys), batch_size):
+                removed += await self._client.unlink(*keys[i:i + batch_size])
+        except Exception:
+            pass
+        return removed
+    
+    async def clear_pattern(self, pattern: str, batch_size: int = 500) -> int:
+        """
+        Eliminar claves que coincidan con patrón. Usa SCAN incremental y
+        UNLINK por lotes en lugar de KEYS, que bloquea Redis en keyspaces grandes.
+        """
         if not self._enabled or not self._client:
+            return 0
+        removed = 0
+        batch: List[str] = []
+        try:
+            async for key in self._client.scan_iter(match=pattern, count=batch_size):
+                batch.append(key)
+                if len(batch) >= batch_size:
+                    removed += await self._client.unlink(*batch)
+                    batch = []
+            if batch:
+                removed += await self._client.unlink(*batch)
+        except Exception:
+            pass
+        return removed
+    
+    async def incr_scores(self, key: str, increments: Dict[str, float], max_members: Optional[int] = None) -> None:
+        """
+        Suma puntuaciones a miembros de un sorted set (ZINCRBY en un pipeline).
+        Con `max_members` descarta después los de menor puntuación para que
+        el set no crezca sin límite.
+        """
+        if not self._enabled or not self._client or not increments:
             return
         try:
-            keys = await self._client.keys(pattern)
-            if keys:
-                await self._client.delete(*keys)
+            pipe = self._client.pipeline(transaction=False)
+            for member, amount in increments.items():
+                pipe.zincrby(key, amount, member)
+            if max_members is not None:
+                pipe.zremrangebyrank(key, 0, -(max_members + 1))
+            await pipe.execute()
+        except Exception:
+            observe_cache("redis", "incr_scores", "error")
+    
+    async def top_scores(self, key: str, limit: int) -> List[Tuple[str, float]]:
+        """Los `limit` miembros con mayor puntuación de un sorted set"""
+        if not self._enabled or not self._client or limit <= 0:
+            return []
+        try:
+            rows = await self._client.zrevrange(key, 0, limit - 1, withscores=True)
+        except Exception:
+            observe_cache("redis", "top_scores", "error")
+            return []
+        return [(member.decode("utf-8"), score) for member, score in rows]
+    
+    async def incr_hash(self, key: str, increments: Dict[str, int], ttl_seconds: int) -> None:
+        """Suma contadores a campos de un hash (HINCRBY en un pipeline) y renueva su TTL"""
+        if not self._enabled or not self._client or not increments:
+            return
+        try:
+            pipe = self._client.pipeline(transaction=False)
+            for field, amount in increments.items():
+                pipe.hincrby(key, field, amount)
+            pipe.expire(key, ttl_seconds)
+            await pipe.execute()
+        except Exception:
+            observe_cache("redis", "incr_hash", "error")
+
+    async def claim(self, key: str, member: str, ttl_seconds: int) -> bool:
+        """
+        Reclama `member` una sola vez entre todos los workers añadiéndolo al
+        conjunto `key` (SADD; el conjunto renueva su TTL). False si otro ya lo
+        reclamó; sin Redis siempre True (solo queda la deduplicación local de
+        quien llama).
+        """
+        if not self._enabled or not self._client:
+            return True
+        try:
+            pipe = self._client.pipeline(transaction=False)
+            pipe.sadd(key, member)
+            pipe.expire(key, ttl_seconds)
+            added, _ = await pipe.execute()
+            return bool(added)
+        except Exception:
+            observe_cache("redis", "claim", "error")
+            return True
+
+    async def get_hash(self, key: str) -> Dict[str, int]:
+        """Todos los contadores de un hash (HGETALL)"""
+        if not self._enabled or not self._client:
+            return {}
+        try:
+            rows = await self._client.hgetall(key)
+        except Exception:
+            observe_cache("redis", "get_hash", "error")
+            return {}
+        return {field.decode("utf-8"): int(value) for field, value in rows.items()}
+
+    @staticmethod
+    def _tag_key(tag: str) -> str:
+        return f"tag:{tag}"
+    
+    async def invalidate_tags(self, *tags: str, batch_size: int = 500) -> int:
+        """Eliminar todas las claves asociadas a las etiquetas y los propios conjuntos"""
+        if not self._enabled or not self._client:
+            return 0
+        removed = 0
+        try:
+            for tag in tags:
+                tag_key = self._tag_key(tag)
+                batch: List[str] = []
+                async for key in self._client.sscan_iter(tag_key, count=batch_size):
+                    batch.append(key)
+                    if len(batch) >= batch_size:
+                        removed += await self._client.unlink(*batch)
+                        batch = []
+                if batch:
+                    removed += await self._client.unlink(*batch)
+                await self._client.unlink(tag_key)
         except Exception:
             pass
+        return removed
 
 
 # Instancia global
@@ -93,10 +301,21 @@ class CacheTTL:
     SUMMONER = 300          # 5 minutos
     MATCHES = 300           # 5 minutos
     LIVE_GAME = 30          # 30 segundos
+    WARM = 120              # 2 minutos (resultados precargados tras una búsqueda)
+    NOT_IN_GAME = 20        # 20 segundos (caché negativa de partida en vivo)
+    NOT_FOUND = 300         # 5 minutos (Riot ID / invocador inexistente)
+    UNRANKED = 300          # 5 minutos (sin entradas de liga)
     CHAMPIONS = 86400       # 24 horas
     DDRAGON = 86400         # 24 horas
     TIERLIST = 1800         # 30 minutos
     RANKING = 300           # 5 minutos
+    RIOT_ID = 86400         # 24 horas (Riot ID normalizado <-> PUUID)
+    SUMMONER_PROFILE = 86400  # 24 horas (se refresca en segundo plano a los 15 min)
+    LEADERBOARD_PROFILE = 3600  # 1 hora (icono, nivel y Riot ID de jugadores del ranking)
+    MATCH_DETAIL = 604800   # 7 días (partidas terminadas y timelines son inmutables)
+    MATCH_HISTORY = 604800  # 7 días (índice de partidas por jugador; la cabecera se resincroniza)
+    ROLLUP = 2592000        # 30 días (buckets diarios por jugador, cola y campeón)
+    PATCH_STATS = 5184000   # 60 días (contadores por parche; se renuevan al escribir)
 
 
 def cached(prefix: str, ttl: int = 300):
@@ -1,6 +1,8 @@
 """
 Datos de builds populares para campeones.
-Basado en estadisticas agregadas del parche actual.
+Los datos estaticos son la base; `apply_patch_stats` los sustituye por lo
+observado en el parche actual (ver services/patch_stats.py) cuando hay
+partidas suficientes.
 """
 
 # Estructura: championKey -> { role -> build_data }
@@ -258,3 +260,33 @@ def get_keystone_info(keystone_id: int) -> dict:
 def get_secondary_tree_name(tree_id: int) -> str:
     """Obtiene el nombre del arbol secundario"""
     return RUNE_TREES.get(tree_id, "Unknown")
+
+
+# Botas (se muestran aparte de los items principales)
+BOOTS = {3006, 3009, 3020, 3047, 3111, 3117, 3158}
+
+
+def apply_patch_stats(build: dict, observed: dict, min_games: int = 30) -> dict:
+    """
+    Build con los datos observados del parche: items mas comprados, keystone
+    mas usada y tasas reales. Con menos de `min_games` partidas se deja la
+    build estatica.
+    """
+    if not observed or observed.get("games", 0) < min_games:
+        return build
+    build = dict(build or {})
+    items = [item["id"] for item in observed.get("items", [])]
+    core = [item_id for item_id in items if item_id not in BOOTS]
+    boots = next((item_id for item_id in items if item_id in BOOTS), None)
+    if core:
+        build["core_items"] = core[:3]
+        build["situational"] = core[3:6]
+    if boots:
+        build["boots"] = boots
+    if observed.get("keystones"):
+        build["keystone"] = observed["keystones"][0]["id"]
+    build["winrate"] = observed["winrate"]
+    build["pickrate"] = observed["pickrate"]
+    build["games"] = observed["games"]
+    build["patch"] = observed["patch"]
+    return build
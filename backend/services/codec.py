@@ -0,0 +1,141 @@
+"""
+Serialización binaria de los valores guardados en Redis: msgpack, con
+compresión zstd por encima de un umbral de tamaño y diccionario opcional
+entrenado con partidas Match-V5. El primer byte identifica el formato, lo
+que permite migrar sin invalidar la caché: los valores JSON antiguos se
+siguen leyendo.
+
+    python -m backend.services.codec train corpus.jsonl.gz --out match.zdict
+"""
+import argparse
+import gzip
+import json
+import sys
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import msgpack
+import zstandard as zstd
+
+
+# Byte de versión/formato al inicio de cada valor
+FORMAT_MSGPACK = 0x01
+FORMAT_MSGPACK_ZSTD = 0x02
+FORMAT_MSGPACK_ZSTD_DICT = 0x03
+
+
+class CodecError(ValueError):
+    """Valor con un formato desconocido o un diccionario no cargado"""
+
+
+class CacheCodec:
+    """
+    Codifica valores JSON-compatibles para Redis.
+    Por debajo de `threshold` bytes el msgpack se guarda sin comprimir.
+    """
+
+    def __init__(self, threshold: int = 512, level: int = 3, dictionary: Optional[bytes] = None):
+        self.threshold = threshold
+        self.level = level
+        self._compressor = zstd.ZstdCompressor(level=level)
+        self._decompressor = zstd.ZstdDecompressor()
+        self._dict_compressor: Optional[zstd.ZstdCompressor] = None
+        self._dict_decompressors: Dict[int, zstd.ZstdDecompressor] = {}
+        if dictionary:
+            self.use_dictionary(dictionary)
+
+    def use_dictionary(self, data: bytes) -> int:
+        """
+        Comprime los valores nuevos con este diccionario. Los diccionarios
+        anteriores se conservan para poder leer lo ya escrito; devuelve su id.
+        """
+        dictionary = zstd.ZstdCompressionDict(data)
+        dict_id = dictionary.dict_id()
+        self._dict_compressor = zstd.ZstdCompressor(level=self.level, dict_data=dictionary)
+        self._dict_decompressors[dict_id] = zstd.ZstdDecompressor(dict_data=dictionary)
+        return dict_id
+
+    def encode(self, value: Any) -> bytes:
+        packed = msgpack.packb(value, use_bin_type=True)
+        if len(packed) < self.threshold:
+            return bytes((FORMAT_MSGPACK,)) + packed
+        if self._dict_compressor is not None:
+            return bytes((FORMAT_MSGPACK_ZSTD_DICT,)) + self._dict_compressor.compress(packed)
+        return bytes((FORMAT_MSGPACK_ZSTD,)) + self._compressor.compress(packed)
+
+    def decode(self, data: bytes) -> Any:
+        if not data:
+            raise CodecError("Valor vacío")
+        marker, body = data[0], data[1:]
+        if marker == FORMAT_MSGPACK:
+            return self._unpack(body)
+        if marker == FORMAT_MSGPACK_ZSTD:
+            return self._unpack(self._decompressor.decompress(body))
+        if marker == FORMAT_MSGPACK_ZSTD_DICT:
+            dict_id = zstd.get_frame_parameters(body).dict_id
+            decompressor = self._dict_decompressors.get(dict_id)
+            if decompressor is None:
+                raise CodecError(f"Diccionario zstd {dict_id} no cargado")
+            return self._unpack(decompressor.decompress(body))
+        # Formato anterior: JSON en texto
+        try:
+            return json.loads(data)
+        except ValueError as exc:
+            raise CodecError(f"Formato desconocido 0x{marker:02x}") from exc
+
+    @staticmethod
+    def _unpack(packed: bytes) -> Any:
+        return msgpack.unpackb(packed, raw=False, strict_map_key=False)
+
+
+def train_dictionary(samples: Iterable[Any], size: int = 112_640) -> bytes:
+    """Entrena un diccionario zstd con valores de ejemplo (p. ej. partidas Match-V5)"""
+    packed = [msgpack.packb(sample, use_bin_type=True) for sample in samples]
+    if not packed:
+        raise ValueError("Sin muestras para entrenar")
+    return zstd.train_dictionary(size, packed).as_bytes()
+
+
+def load_dictionary(path: str) -> bytes:
+    with open(path, "rb") as handle:
+        return handle.read()
+
+
+def _read_samples(path: str, limit: int) -> Iterator[Any]:
+    """Documentos de un JSONL (admite el formato {"kind", "data"} del corpus sintético)"""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as handle:
+        for count, line in enumerate(handle):
+            if count >= limit:
+                return
+            record = json.loads(line)
+            yield record["data"] if isinstance(record, dict) and "kind" in record and "data" in record else record
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Herramientas del codec de caché")
+    sub = parser.add_subparsers(dest="command", required=True)
+    train = sub.add_parser("train", help="Entrenar un diccionario zstd con documentos JSONL")
+    train.add_argument("samples", help="JSONL (o .jsonl.gz) con documentos de ejemplo")
+    train.add_argument("--out", required=True)
+    train.add_argument("--limit", type=int, default=5000)
+    train.add_argument("--size", type=int, default=112_640)
+    args = parser.parse_args(argv)
+
+    samples = list(_read_samples(args.samples, args.limit))
+    dictionary = train_dictionary(samples, args.size)
+    with open(args.out, "wb") as handle:
+        handle.write(dictionary)
+
+    plain, with_dict = CacheCodec(), CacheCodec(dictionary=dictionary)
+    raw = sum(len(json.dumps(s)) for s in samples)
+    print(
+        f"{len(samples)} muestras: JSON {raw / 1e6:.1f} MB, "
+        f"msgpack+zstd {sum(len(plain.encode(s)) for s in samples) / 1e6:.1f} MB, "
+        f"con diccionario {sum(len(with_dict.encode(s)) for s in samples) / 1e6:.1f} MB",
+        file=sys.stderr
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
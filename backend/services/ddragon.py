@@ -1,8 +1,10 @@
 """
 Servicio de Data Dragon para obtener datos estáticos del juego
 """
+import json
+import os
 import httpx
-from typing import Optional
+from typing import Dict, Optional
 from backend.config import settings
 
 
@@ -16,6 +18,8 @@ class DataDragonService:
         self._items: Optional[dict] = None
         self._summoner_spells: Optional[dict] = None
         self._runes: Optional[dict] = None
+        # Índice clave numérica -> campeón, construido una vez por conjunto de datos
+        self._champions_by_key: Optional[Dict[int, dict]] = None
     
     async def get_latest_version(self) -> str:
         """Obtiene la versión más reciente del juego"""
@@ -28,6 +32,14 @@ class DataDragonService:
             self._version = versions[0]
             return self._version
     
+    async def refresh_version(self) -> str:
+        """Vuelve a consultar la versión más reciente (detecta un parche nuevo sin reiniciar)"""
+        async with httpx.AsyncClient() as client:
+            response = await client.get(f"{self.base_url}/api/versions.json")
+            response.raise_for_status()
+            self._version = response.json()[0]
+            return self._version
+
     async def get_champions(self, lang: str = "es_ES") -> dict:
         """Obtiene datos de todos los campeones"""
         if self._champions:
@@ -40,15 +52,26 @@ class DataDragonService:
             )
             data = response.json()
             self._champions = data.get("data", {})
+            self._champions_by_key = None
             return self._champions
     
     async def get_champion_by_id(self, champion_id: int, lang: str = "es_ES") -> Optional[dict]:
         """Obtiene datos de un campeón por su ID numérico"""
         champions = await self.get_champions(lang)
-        for champion in champions.values():
-            if int(champion.get("key", 0)) == champion_id:
-                return champion
-        return None
+        if self._champions_by_key is None:
+            self._champions_by_key = {
+                int(champion.get("key", 0)): champion for champion in champions.values()
+            }
+        return self._champions_by_key.get(champion_id)
+    
+    def champion_name(self, champion_id: int) -> str:
+        """Nombre de un campeón ya cargado en memoria (sin red); el ID si no se conoce"""
+        if self._champions_by_key is None and self._champions:
+            self._champions_by_key = {
+                int(champion.get("key", 0)): champion for champion in self._champions.values()
+            }
+        champion = (self._champions_by_key or {}).get(champion_id)
+        return champion.get("name", str(champion_id)) if champion else str(champion_id)
     
     async def get_items(self, lang: str = "es_ES") -> dict:
         """Obtiene datos de todos los items"""
@@ -91,6 +114,53 @@ class DataDragonService:
             self._runes = response.json()
             return self._runes
     
+    async def preload(self) -> Dict[str, int]:
+        """
+        Carga todos los conjuntos de datos y el índice de campeones. Se llama
+        en el proceso maestro antes del fork para que los workers los compartan.
+        """
+        await self.get_champions()
+        await self.get_champion_by_id(0)
+        await self.get_items()
+        await self.get_summoner_spells()
+        await self.get_runes()
+        return self.loaded_counts()
+    
+    def loaded_counts(self) -> Dict[str, int]:
+        """Tamaño de cada conjunto de datos cargado en memoria"""
+        return {
+            "champions": len(self._champions or {}),
+            "items": len(self._items or {}),
+            "summoner_spells": len(self._summoner_spells or {}),
+            "runes": len(self._runes or []),
+        }
+    
+    def save_snapshot(self, path: str) -> None:
+        """Guarda los datos cargados para arrancar sin acceso a Data Dragon"""
+        snapshot = {
+            "version": self._version,
+            "champions": self._champions,
+            "items": self._items,
+            "summoner_spells": self._summoner_spells,
+            "runes": self._runes,
+        }
+        with open(path, "w", encoding="utf-8") as handle:
+            json.dump(snapshot, handle, ensure_ascii=False)
+    
+    def load_snapshot(self, path: str) -> bool:
+        """Carga una instantánea de save_snapshot; False si no existe"""
+        if not path or not os.path.exists(path):
+            return False
+        with open(path, encoding="utf-8") as handle:
+            snapshot = json.load(handle)
+        self._version = snapshot.get("version")
+        self._champions = snapshot.get("champions")
+        self._items = snapshot.get("items")
+        self._summoner_spells = snapshot.get("summoner_spells")
+        self._runes = snapshot.get("runes")
+        self._champions_by_key = None
+        return True
+    
     def _resolve_version(self, version: Optional[str] = None) -> str:
         """Obtiene la versión a utilizar para recursos estáticos"""
         return version or self._version or "latest"
@@ -0,0 +1,189 @@
+"""
+Caché de identidades: Riot ID normalizado -> PUUID -> perfil de invocador,
+con índice inverso PUUID -> Riot ID. Las búsquedas repetidas del mismo
+nombre no llegan a Riot; los perfiles (icono, nivel) se sirven al instante
+y se refrescan en segundo plano cuando envejecen.
+"""
+import asyncio
+import logging
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from backend.riot_client import riot_client
+from backend.services.cache import cache, CacheTTL
+from backend.services.metrics import observe_cache
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_name(value: str) -> str:
+    """Unicode NFKC, sin distinguir mayúsculas y sin espacios"""
+    value = unicodedata.normalize("NFKC", value or "").casefold()
+    return "".join(value.split())
+
+
+def normalize_riot_id(game_name: str, tag_line: str) -> str:
+    """
+    Forma canónica de un Riot ID ("Faker #KR1 " y "faker#kr1" son el mismo
+    jugador).
+    """
+    return f"{normalize_name(game_name)}#{normalize_name(tag_line)}"
+
+
+class IdentityCache:
+    """
+    Tres índices en memoria (LRU) y en Redis:
+    - riotid:{routing}:{riot id normalizado} -> puuid
+    - account:{puuid} -> cuenta de Riot (gameName, tagLine)
+    - summoner:{region}:{puuid} -> {"data": invocador, "fetched_at": ts}
+    """
+
+    def __init__(self, max_entries: int = 100000, refresh_after: int = 900, local_ttl: int = 300):
+        self.max_entries = max_entries
+        # Segundos tras los que un perfil se refresca en segundo plano
+        self.refresh_after = refresh_after
+        # Vigencia en memoria de lo leído de Redis (otro worker pudo actualizarlo)
+        self.local_ttl = local_ttl
+        # clave -> (expira_en, valor)
+        self._local: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._refreshing: Dict[str, asyncio.Task] = {}
+
+    @staticmethod
+    def _riot_id_key(routing: str, game_name: str, tag_line: str) -> str:
+        return f"identity:riotid:{routing}:{normalize_riot_id(game_name, tag_line)}"
+
+    @staticmethod
+    def _account_key(puuid: str) -> str:
+        return f"identity:account:{puuid}"
+
+    @staticmethod
+    def _summoner_key(region: str, puuid: str) -> str:
+        return f"identity:summoner:{region}:{puuid}"
+
+    async def resolve(self, game_name: str, tag_line: str, routing: str) -> dict:
+        """Cuenta por Riot ID, con la forma de respuesta de RiotAPIClient"""
+        puuid = await self._get(self._riot_id_key(routing, game_name, tag_line))
+        if puuid:
+            account = await self._get(self._account_key(puuid))
+            if account:
+                observe_cache("identity", "resolve", "hit")
+                return {"success": True, "data": account}
+        observe_cache("identity", "resolve", "miss")
+        result = await riot_client.get_account_by_riot_id(game_name, tag_line, routing)
+        if result.get("success"):
+            await self.remember_account(result["data"], routing)
+        return result
+
+    async def get_account(self, puuid: str, routing: str) -> dict:
+        """Cuenta por PUUID (índice inverso hacia el Riot ID)"""
+        account = await self._get(self._account_key(puuid))
+        if account:
+            observe_cache("identity", "account", "hit")
+            return {"success": True, "data": account}
+        observe_cache("identity", "account", "miss")
+        result = await riot_client.get_account_by_puuid(puuid, routing)
+        if result.get("success"):
+            await self.remember_account(result["data"], routing)
+        return result
+
+    async def get_summoner(self, puuid: str, region: str) -> dict:
+        """
+        Invocador por PUUID. Un perfil con más de `refresh_after` segundos se
+        devuelve igualmente y se actualiza en segundo plano (icono, nivel).
+        """
+        entry = await self._get(self._summoner_key(region, puuid))
+        if entry:
+            if time.time() - entry["fetched_at"] > self.refresh_after:
+                self._schedule_refresh(puuid, region)
+                observe_cache("identity", "summoner", "stale")
+            else:
+                observe_cache("identity", "summoner", "hit")
+            return {"success": True, "data": entry["data"]}
+        observe_cache("identity", "summoner", "miss")
+        return await self._fetch_summoner(puuid, region)
+
+    async def remember_account(self, account: dict, routing: str) -> None:
+        """Guarda la cuenta y ambos sentidos del índice; olvida el Riot ID anterior si cambió"""
+        puuid = account.get("puuid")
+        if not puuid or not account.get("gameName"):
+            return
+        account = {key: account.get(key) for key in ("puuid", "gameName", "tagLine")}
+        previous = await self._get(self._account_key(puuid))
+        if previous and previous.get("gameName") is not None:
+            old_key = self._riot_id_key(routing, previous["gameName"], previous.get("tagLine") or "")
+            new_key = self._riot_id_key(routing, account["gameName"], account.get("tagLine") or "")
+            if old_key != new_key:
+                self._local.pop(old_key, None)
+                await cache.delete(old_key)
+        await self._set(
+            {
+                self._riot_id_key(routing, account["gameName"], account.get("tagLine") or ""): puuid,
+                self._account_key(puuid): account,
+            },
+            CacheTTL.RIOT_ID
+        )
+
+    async def remember_summoner(self, summoner: dict, region: str) -> None:
+        """Guarda un invocador obtenido por otra vía (p. ej. ladder por summonerId)"""
+        if summoner.get("puuid"):
+            await self._set(
+                {self._summoner_key(region, summoner["puuid"]): {"data": summoner, "fetched_at": time.time()}},
+                CacheTTL.SUMMONER_PROFILE
+            )
+
+    async def find_account(self, puuid: str) -> Optional[dict]:
+        """Cuenta ya conocida para un PUUID, sin consultar a Riot"""
+        return await self._get(self._account_key(puuid))
+
+    def clear(self) -> None:
+        self._local.clear()
+
+    async def _fetch_summoner(self, puuid: str, region: str) -> dict:
+        result = await riot_client.get_summoner_by_puuid(puuid, region)
+        if result.get("success"):
+            await self.remember_summoner(result["data"], region)
+        return result
+
+    def _schedule_refresh(self, puuid: str, region: str) -> None:
+        key = self._summoner_key(region, puuid)
+        if key in self._refreshing:
+            return
+
+        async def refresh() -> None:
+            try:
+                await self._fetch_summoner(puuid, region)
+            except Exception as exc:
+                logger.warning("Refresco de perfil fallido para %s: %s", puuid, exc)
+            finally:
+                self._refreshing.pop(key, None)
+
+        self._refreshing[key] = asyncio.get_running_loop().create_task(refresh())
+
+    async def _get(self, key: str) -> Any:
+        entry = self._local.get(key)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                self._local.move_to_end(key)
+                return entry[1]
+            self._local.pop(key, None)
+        value = await cache.get(key)
+        if value is not None:
+            self._store_local(key, value, self.local_ttl)
+        return value
+
+    async def _set(self, items: dict, ttl: int) -> None:
+        for key, value in items.items():
+            self._store_local(key, value, ttl)
+        await cache.set_many(items, ttl)
+
+    def _store_local(self, key: str, value: Any, ttl: int) -> None:
+        self._local[key] = (time.monotonic() + ttl, value)
+        self._local.move_to_end(key)
+        while len(self._local) > self.max_entries:
+            self._local.popitem(last=False)
+
+
+# Instancia global
+identity_cache = IdentityCache()
@@ -0,0 +1,72 @@
+"""
+Ingesta en segundo plano de las partidas descargadas en las estadísticas
+agregadas (patch_stats, matchups y tier list). Cada tabla reclama la
+partida en Redis antes de sumarla, lo que son varias idas y vueltas por
+partida: se hacen fuera de la petición, en una cola acotada que vacía una
+tarea del lifespan.
+"""
+import asyncio
+import logging
+from typing import Optional
+
+from backend.services.matchups import matchup_store
+from backend.services.metrics import observe_cache
+from backend.services.patch_stats import patch_stats
+from backend.services.tierlist import tierlist_store
+
+logger = logging.getLogger(__name__)
+
+
+class StatsIngestor:
+    """
+    Cola de partidas pendientes de sumar. Si se llena (Redis lento o una
+    ráfaga de descargas) las nuevas se descartan: las estadísticas son
+    muestrales y la petición nunca espera por ellas.
+    """
+
+    def __init__(self, max_queue: int = 5000):
+        self._queue: "asyncio.Queue[dict]" = asyncio.Queue(maxsize=max_queue)
+
+    def submit(self, match: dict) -> bool:
+        """Encola una partida; devuelve si se aceptó"""
+        try:
+            self._queue.put_nowait(match)
+        except asyncio.QueueFull:
+            observe_cache("ingest", "submit", "dropped")
+            return False
+        observe_cache("ingest", "submit", "queued")
+        return True
+
+    def __len__(self) -> int:
+        return self._queue.qsize()
+
+    async def ingest(self, match: dict) -> None:
+        """Suma una partida en todas las tablas"""
+        await patch_stats.ingest(match)
+        await matchup_store.ingest(match)
+        await tierlist_store.ingest(match)
+
+    async def drain(self) -> int:
+        """Suma lo que haya en la cola sin esperar más (tests y apagado); devuelve cuántas"""
+        done = 0
+        while not self._queue.empty():
+            await self._ingest_safely(self._queue.get_nowait())
+            done += 1
+        return done
+
+    async def run(self) -> None:
+        """Tarea de fondo del lifespan: vacía la cola según llegan partidas"""
+        while True:
+            match = await self._queue.get()
+            await self._ingest_safely(match)
+
+    async def _ingest_safely(self, match: dict) -> None:
+        try:
+            await self.ingest(match)
+        except Exception as exc:
+            match_id: Optional[str] = match.get("metadata", {}).get("matchId")
+            logger.warning("Ingesta de %s en las estadísticas fallida: %s", match_id, exc)
+
+
+# Instancia global
+stats_ingestor = StatsIngestor()
@@ -0,0 +1,356 @@
+"""
+Historial de partidas por jugador con paginación por cursor. Cada jugador
+tiene un índice local que refleja la lista de IDs de Riot posición a
+posición (de más reciente a más antigua) y es siempre un prefijo contiguo
+de ella: solo se pide a Riot el hueco de la cabecera (partidas nuevas) y,
+al paginar, el siguiente tramo de la cola. gameCreation y queueId se
+resuelven aparte desde el match_store o el detalle de la partida; si el
+detalle falla la fila se queda sin resolver y se reintenta en la siguiente
+página, sin desplazar las demás. Las páginas devuelven tarjetas compactas.
+"""
+import asyncio
+import base64
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from backend.riot_client import riot_client
+from backend.services.cache import cache, CacheTTL
+from backend.services.match_store import match_store
+from backend.services.match_views import build_match_card
+from backend.services.metrics import observe_cache
+from backend.services.prefetch import prefetcher
+
+# (gameCreation, matchId, queueId); gameCreation y queueId son None hasta resolver el detalle
+HistoryEntry = Tuple[Optional[int], str, Optional[int]]
+FetchDetails = Callable[[List[str], str], Awaitable[List[dict]]]
+
+
+def encode_cursor(entry: HistoryEntry) -> str:
+    """Cursor opaco: la última fila entregada (gameCreation, matchId)"""
+    raw = f"{entry[0] or 0}:{entry[1]}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[int, str]:
+    """Inverso de encode_cursor; ValueError si el cursor no es válido"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        creation, match_id = raw.split(":", 1)
+        return int(creation), match_id
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise ValueError("Cursor no válido") from exc
+
+
+class PlayerHistory:
+    """Índice de un jugador; `entries[i]` es la posición i de la lista de IDs de Riot"""
+
+    __slots__ = ("entries", "synced_at", "complete")
+
+    def __init__(self, entries: Optional[List[HistoryEntry]] = None, synced_at: float = 0.0, complete: bool = False):
+        self.entries: List[HistoryEntry] = entries or []
+        self.synced_at = synced_at
+        # True cuando la cola llegó a la primera partida del jugador
+        self.complete = complete
+
+    def known(self) -> set:
+        return {entry[1] for entry in self.entries}
+
+    def prepend(self, match_ids: List[str]) -> None:
+        known = self.known()
+        self.entries[:0] = [(None, match_id, None) for match_id in dict.fromkeys(match_ids) if match_id not in known]
+
+    def append(self, match_ids: List[str]) -> None:
+        known = self.known()
+        self.entries.extend((None, match_id, None) for match_id in dict.fromkeys(match_ids) if match_id not in known)
+
+    def resolve(self, cards: Dict[str, dict]) -> bool:
+        """Completa gameCreation y queueId de las filas pendientes con sus tarjetas"""
+        changed = False
+        for index, (creation, match_id, _) in enumerate(self.entries):
+            card = cards.get(match_id)
+            if creation is None and card is not None:
+                self.entries[index] = (int(card.get("gameCreation") or 0), match_id, int(card.get("queueId") or 0))
+                changed = True
+        return changed
+
+    def index_of(self, match_id: str) -> Optional[int]:
+        return next((index for index, entry in enumerate(self.entries) if entry[1] == match_id), None)
+
+    def position_after(self, cursor: Tuple[int, str]) -> int:
+        """
+        Índice de la fila siguiente a la del cursor. Si el cursor ya no está
+        en el índice (se reinició), la primera fila resuelta estrictamente
+        más antigua que él (keyset).
+        """
+        index = self.index_of(cursor[1])
+        if index is not None:
+            return index + 1
+        return next(
+            (i for i, entry in enumerate(self.entries) if entry[0] is not None and entry[:2] < cursor),
+            len(self.entries)
+        )
+
+    def to_dict(self) -> dict:
+        return {"entries": [list(e) for e in self.entries], "synced_at": self.synced_at, "complete": self.complete}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "PlayerHistory":
+        return cls([tuple(e) for e in data.get("entries", [])], data.get("synced_at", 0.0), data.get("complete", False))
+
+
+class MatchHistory:
+    """
+    Paginación sobre el índice local, por cursor (`page`) o por
+    desplazamiento (`ids`). La cabecera se sincroniza con Riot como mucho
+    cada `head_ttl` segundos; si el hueco supera `max_head_batches` lotes
+    el índice se reinicia para seguir siendo contiguo.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = 20,
+        head_ttl: int = 60,
+        max_head_batches: int = 5,
+        max_tail_batches: int = 3,
+        max_players: int = 5000,
+        local_ttl: int = 30
+    ):
+        self.batch_size = batch_size
+        self.head_ttl = head_ttl
+        self.max_head_batches = max_head_batches
+        self.max_tail_batches = max_tail_batches
+        self.max_players = max_players
+        self.local_ttl = local_ttl
+        # clave -> (expira_en, historial)
+        self._local: "OrderedDict[str, Tuple[float, PlayerHistory]]" = OrderedDict()
+        # "{clave}:head" / "{clave}:tail" -> sincronización en curso con Riot
+        self._syncing: Dict[str, asyncio.Task] = {}
+
+    @staticmethod
+    def _key(region: str, puuid: str) -> str:
+        return f"history:{region}:{puuid}"
+
+    async def page(
+        self,
+        puuid: str,
+        region: str,
+        fetch_details: FetchDetails,
+        cursor: Optional[str] = None,
+        count: int = 10,
+        queue: Optional[int] = None,
+        prefetch_next: bool = True
+    ) -> dict:
+        """
+        Página de tarjetas de partida posteriores a `cursor` (la primera si
+        es None). Devuelve {"matches", "next_cursor", "has_more"} y precarga
+        en segundo plano la página siguiente.
+        """
+        position_cursor = decode_cursor(cursor) if cursor else None
+        routing = riot_client.get_routing_for_region(region)
+        history = await self._load(region, puuid)
+        fetched = resolved_any = False
+        if position_cursor is None and time.time() - history.synced_at > self.head_ttl:
+            fetched = await self._refresh_head(region, puuid, routing)
+            history = await self._load(region, puuid)
+
+        cards: Dict[str, dict] = {}
+        batches = 0
+        while True:
+            # La posición se recalcula: otra petición puede haber añadido partidas a la cabecera
+            start = history.position_after(position_cursor) if position_cursor else 0
+            # Sin filtro basta con la ventana de la página; con filtro hace falta el queueId de todo el resto
+            window = history.entries[start:start + count + 1] if queue is None else history.entries[start:]
+            pending = [entry for entry in window if entry[0] is None]
+            if pending:
+                resolved, updated = await self._resolve(history, pending, routing, fetch_details)
+                cards.update(resolved)
+                resolved_any = resolved_any or updated
+            rows = [e for e in history.entries[start:] if e[2] == queue] if queue is not None else history.entries[start:]
+            if len(rows) > count or history.complete or batches >= self.max_tail_batches:
+                break
+            if not await self._grow_tail(region, puuid, routing):
+                break
+            history = await self._load(region, puuid)
+            fetched = True
+            batches += 1
+
+        page_rows = rows[:count]
+        # Las filas sin resolver ya se intentaron en esta petición
+        rest = [row for row in page_rows if row[1] not in cards and row[0] is not None]
+        if rest:
+            resolved, _ = await self._resolve(history, rest, routing, fetch_details)
+            cards.update(resolved)
+        if resolved_any:
+            await self._save(region, puuid, history)
+
+        has_more = len(rows) > count or not history.complete
+        next_cursor = encode_cursor(page_rows[-1]) if has_more and page_rows else None
+        if prefetch_next and next_cursor:
+            prefetcher.schedule(
+                f"history:{region}:{puuid}:{queue}:{next_cursor}",
+                lambda: self.page(puuid, region, fetch_details, next_cursor, count, queue, prefetch_next=False)
+            )
+        observe_cache("history", "page", "riot" if fetched or resolved_any else "local")
+        return {
+            "matches": [cards[row[1]] for row in page_rows if row[1] in cards],
+            "next_cursor": next_cursor,
+            "has_more": has_more,
+        }
+
+    async def ids(self, puuid: str, region: str, start: int, count: int, after: Optional[str] = None) -> Optional[List[str]]:
+        """
+        IDs por desplazamiento, como el endpoint de Riot, servidos desde el
+        índice. Con `after` (un matchId ya entregado) la página empieza en la
+        partida siguiente, así que las partidas nuevas no la desplazan.
+        Devuelve None si Riot falla y el índice no cubre el tramo.
+        """
+        routing = riot_client.get_routing_for_region(region)
+        history = await self._load(region, puuid)
+        if time.time() - history.synced_at > self.head_ttl:
+            await self._refresh_head(region, puuid, routing)
+            history = await self._load(region, puuid)
+
+        def position() -> int:
+            index = history.index_of(after) if after is not None else None
+            return index + 1 if index is not None else start
+
+        batches = 0
+        while position() + count > len(history.entries) and not history.complete and batches < self.max_tail_batches:
+            if not await self._grow_tail(region, puuid, routing):
+                break
+            history = await self._load(region, puuid)
+            batches += 1
+        first = position()
+        if first + count > len(history.entries) and not history.complete:
+            # Demasiado lejos de la cola del índice: se pide el tramo directamente
+            result = await riot_client.get_match_ids_by_puuid(puuid, routing, first, count)
+            return result["data"] if result.get("success") else None
+        return [entry[1] for entry in history.entries[first:first + count]]
+
+    async def cached_ids(self, puuid: str, region: str, start: int, count: int) -> Optional[List[str]]:
+        """IDs por desplazamiento desde el índice si la cabecera está al día y lo cubre; si no, None"""
+        history = await self._load(region, puuid)
+        if time.time() - history.synced_at > self.head_ttl:
+            return None
+        if start + count > len(history.entries) and not history.complete:
+            return None
+        return [entry[1] for entry in history.entries[start:start + count]]
+
+    async def _coalesced(self, key: str, job: Callable[[], Awaitable[bool]]) -> bool:
+        """Ejecuta `job` una sola vez por clave; las peticiones concurrentes esperan a la misma tarea"""
+        task = self._syncing.get(key)
+        if task is None:
+            task = asyncio.get_running_loop().create_task(job())
+            self._syncing[key] = task
+            task.add_done_callback(lambda _: self._syncing.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _refresh_head(self, region: str, puuid: str, routing: str) -> bool:
+        """Sincroniza la cabecera y guarda el índice; True si se consultó a Riot"""
+        async def job() -> bool:
+            history = await self._load(region, puuid)
+            if time.time() - history.synced_at <= self.head_ttl:
+                return False
+            if not await self._sync_head(history, puuid, routing):
+                return False
+            await self._save(region, puuid, history)
+            return True
+
+        return await self._coalesced(f"{self._key(region, puuid)}:head", job)
+
+    async def _grow_tail(self, region: str, puuid: str, routing: str) -> bool:
+        """Extiende la cola un lote y guarda el índice; False si no se pudo"""
+        async def job() -> bool:
+            history = await self._load(region, puuid)
+            if history.complete or not await self._extend_tail(history, puuid, routing):
+                return False
+            await self._save(region, puuid, history)
+            return True
+
+        return await self._coalesced(f"{self._key(region, puuid)}:tail", job)
+
+    async def _sync_head(self, history: PlayerHistory, puuid: str, routing: str) -> bool:
+        """Añade las partidas nuevas hasta enlazar con el índice existente"""
+        known = history.known()
+        new_ids: List[str] = []
+        closed = False
+        batches = self.max_head_batches if known else 1
+        for batch in range(batches):
+            result = await riot_client.get_match_ids_by_puuid(puuid, routing, batch * self.batch_size, self.batch_size)
+            if not result.get("success"):
+                return False
+            ids = result.get("data", [])
+            for match_id in ids:
+                if match_id in known:
+                    closed = True
+                    break
+                new_ids.append(match_id)
+            if closed or len(ids) < self.batch_size:
+                closed = True
+                if not known and len(ids) < self.batch_size:
+                    history.complete = True
+                break
+        if not closed and known:
+            # Hueco demasiado grande: se descarta el índice anterior para no dejar huecos
+            history.entries, history.complete = [], False
+        history.prepend(new_ids)
+        history.synced_at = time.time()
+        return True
+
+    async def _extend_tail(self, history: PlayerHistory, puuid: str, routing: str) -> bool:
+        """Pide a Riot el siguiente lote tras la partida más antigua del índice"""
+        result = await riot_client.get_match_ids_by_puuid(puuid, routing, len(history.entries), self.batch_size)
+        if not result.get("success"):
+            return False
+        ids = result.get("data", [])
+        # Si entraron partidas nuevas desde la última sincronización el lote empieza por IDs ya conocidos
+        history.append(ids)
+        if len(ids) < self.batch_size:
+            history.complete = True
+        if not history.synced_at:
+            history.synced_at = time.time()
+        return True
+
+    async def _resolve(
+        self,
+        history: PlayerHistory,
+        rows: List[HistoryEntry],
+        routing: str,
+        fetch_details: FetchDetails
+    ) -> Tuple[Dict[str, dict], bool]:
+        """Tarjetas de `rows` (del match_store o del detalle) y si se resolvió alguna fila pendiente"""
+        match_ids = [row[1] for row in rows]
+        cards = await match_store.get_cards(match_ids)
+        missing = [match_id for match_id in match_ids if match_id not in cards]
+        if missing:
+            for match in await fetch_details(missing, routing):
+                card = build_match_card(match)
+                cards[card["matchId"]] = card
+        return cards, history.resolve(cards)
+
+    async def _load(self, region: str, puuid: str) -> PlayerHistory:
+        key = self._key(region, puuid)
+        entry = self._local.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self._local.move_to_end(key)
+            return entry[1]
+        shared = await cache.get(key)
+        history = PlayerHistory.from_dict(shared) if shared else (entry[1] if entry else PlayerHistory())
+        self._store_local(key, history)
+        return history
+
+    async def _save(self, region: str, puuid: str, history: PlayerHistory) -> None:
+        key = self._key(region, puuid)
+        self._store_local(key, history)
+        await cache.set(key, history.to_dict(), CacheTTL.MATCH_HISTORY)
+
+    def _store_local(self, key: str, history: PlayerHistory) -> None:
+        self._local[key] = (time.monotonic() + self.local_ttl, history)
+        self._local.move_to_end(key)
+        while len(self._local) > self.max_players:
+            self._local.popitem(last=False)
+
+
+# Instancia global
+match_history = MatchHistory()
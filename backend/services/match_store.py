@@ -0,0 +1,94 @@
+"""
+Almacén de partidas: guarda cada partida junto con sus documentos
+precalculados (tarjeta compacta, resumen y analítica de timeline) en la
+caché compartida
+"""
+from typing import Dict, List, Optional, Tuple
+
+from backend.services.cache import cache, CacheTTL
+from backend.services.match_views import build_match_card, build_timeline_summary
+from backend.services.timeline_analytics import compute_timeline_analytics
+
+
+class MatchStore:
+    """
+    Persistencia de partidas y sus vistas derivadas.
+    Las partidas terminadas son inmutables: los documentos derivados se
+    calculan una sola vez al obtener la partida y se guardan a su lado.
+    """
+
+    def __init__(self, ttl_seconds: int = CacheTTL.MATCH_DETAIL):
+        self.ttl_seconds = ttl_seconds
+
+    @staticmethod
+    def _key(kind: str, match_id: str) -> str:
+        return f"{kind}:{match_id}"
+
+    async def get_match(self, match_id: str) -> Optional[dict]:
+        """Partida completa (Match-V5) si está almacenada"""
+        return await cache.get(self._key("match", match_id))
+
+    async def _get_many(self, kind: str, match_ids: List[str]) -> Dict[str, dict]:
+        """Documentos de un tipo para varias partidas en un solo MGET"""
+        found = await cache.get_many([self._key(kind, match_id) for match_id in match_ids])
+        prefix = len(kind) + 1
+        return {key[prefix:]: value for key, value in found.items()}
+
+    async def get_matches(self, match_ids: List[str]) -> Dict[str, dict]:
+        """Partidas almacenadas, por matchId (las ausentes se omiten)"""
+        return await self._get_many("match", match_ids)
+
+    async def get_cards(self, match_ids: List[str]) -> Dict[str, dict]:
+        """Tarjetas compactas almacenadas, por matchId"""
+        return await self._get_many("match_card", match_ids)
+
+    async def get_card(self, match_id: str) -> Optional[dict]:
+        """Tarjeta compacta de la partida si está almacenada"""
+        return await cache.get(self._key("match_card", match_id))
+
+    async def save_match(self, match: dict) -> dict:
+        """Guarda la partida y su tarjeta compacta; devuelve la tarjeta"""
+        match_id = match.get("metadata", {}).get("matchId")
+        card = build_match_card(match)
+        if match_id:
+            await cache.set_many({
+                self._key("match", match_id): match,
+                self._key("match_card", match_id): card,
+            }, self.ttl_seconds)
+        return card
+
+    async def get_timeline_summary(self, match_id: str) -> Optional[dict]:
+        """Resumen compacto del timeline si está almacenado"""
+        return await cache.get(self._key("timeline_summary", match_id))
+
+    async def get_timeline_analytics(self, match_id: str) -> Optional[dict]:
+        """Métricas de fase de líneas precalculadas si están almacenadas"""
+        return await cache.get(self._key("timeline_analytics", match_id))
+
+    async def get_timeline_analytics_many(self, match_ids: List[str]) -> Dict[str, dict]:
+        """Analítica de timeline almacenada para varias partidas, por matchId"""
+        return await self._get_many("timeline_analytics", match_ids)
+
+    async def save_timeline(
+        self,
+        match_id: str,
+        timeline: dict,
+        match: Optional[dict] = None
+    ) -> Tuple[dict, dict]:
+        """
+        Calcula y guarda el resumen compacto y la analítica del timeline.
+        Devuelve (resumen, analítica). `match` permite emparejar rivales por posición.
+        """
+        summary = build_timeline_summary(timeline)
+        if match is None:
+            match = await self.get_match(match_id)
+        analytics = compute_timeline_analytics(timeline, match)
+        await cache.set_many({
+            self._key("timeline_summary", match_id): summary,
+            self._key("timeline_analytics", match_id): analytics,
+        }, self.ttl_seconds)
+        return summary, analytics
+
+
+# Instancia global
+match_store = MatchStore()
@@ -0,0 +1,152 @@
+"""
+Vistas compactas de partidas y timelines (DTOs) y proyección de campos
+"""
+from typing import Any, Dict, List, Optional
+
+
+# Eventos del timeline que se conservan en el resumen
+SUMMARY_EVENT_FIELDS = {
+    "CHAMPION_KILL": ("killerId", "victimId", "assistingParticipantIds", "position", "bounty"),
+    "CHAMPION_SPECIAL_KILL": ("killerId", "killType", "multiKillLength"),
+    "ELITE_MONSTER_KILL": ("killerId", "killerTeamId", "monsterType", "monsterSubType"),
+    "BUILDING_KILL": ("killerId", "teamId", "buildingType", "laneType", "towerType"),
+    "DRAGON_SOUL_GIVEN": ("teamId", "name"),
+    "GAME_END": ("winningTeam",),
+}
+
+
+def _keystone(participant: dict) -> Optional[int]:
+    styles = participant.get("perks", {}).get("styles") or [{}]
+    selections = styles[0].get("selections") or [{}]
+    return selections[0].get("perk")
+
+
+def build_participant_card(participant: dict) -> dict:
+    """Fila compacta de un participante con lo que muestra una tarjeta de partida"""
+    return {
+        "puuid": participant.get("puuid"),
+        "riotIdGameName": participant.get("riotIdGameName"),
+        "riotIdTagline": participant.get("riotIdTagline"),
+        "championId": participant.get("championId"),
+        "championName": participant.get("championName"),
+        "teamId": participant.get("teamId"),
+        "teamPosition": participant.get("teamPosition"),
+        "win": participant.get("win", False),
+        "kills": participant.get("kills", 0),
+        "deaths": participant.get("deaths", 0),
+        "assists": participant.get("assists", 0),
+        "cs": participant.get("totalMinionsKilled", 0) + participant.get("neutralMinionsKilled", 0),
+        "visionScore": participant.get("visionScore", 0),
+        "damage": participant.get("totalDamageDealtToChampions", 0),
+        "gold": participant.get("goldEarned", 0),
+        "champLevel": participant.get("champLevel"),
+        "items": [participant.get(f"item{i}", 0) for i in range(7)],
+        "spells": [participant.get("summoner1Id"), participant.get("summoner2Id")],
+        "keystone": _keystone(participant),
+    }
+
+
+def build_match_card(match: dict) -> dict:
+    """
+    Documento compacto de una partida para vistas de lista (MatchCard).
+    Conserva metadatos de la partida y una fila resumida por participante.
+    """
+    metadata = match.get("metadata", {})
+    info = match.get("info", {})
+    return {
+        "matchId": metadata.get("matchId"),
+        "gameCreation": info.get("gameCreation"),
+        "gameEndTimestamp": info.get("gameEndTimestamp"),
+        "gameDuration": info.get("gameDuration", 0),
+        "gameVersion": info.get("gameVersion"),
+        "queueId": info.get("queueId"),
+        "platformId": info.get("platformId"),
+        "participants": [build_participant_card(p) for p in info.get("participants", [])],
+        "teams": [
+            {"teamId": team.get("teamId"), "win": team.get("win", False)}
+            for team in info.get("teams", [])
+        ],
+    }
+
+
+def build_timeline_summary(timeline: dict) -> dict:
+    """
+    Resumen compacto de un timeline: curvas por minuto (oro, xp, cs, nivel)
+    por participante y solo los eventos relevantes con campos mínimos.
+    """
+    metadata = timeline.get("metadata", {})
+    info = timeline.get("info", {})
+    frames = info.get("frames", [])
+
+    timestamps: List[int] = []
+    curves: Dict[str, Dict[str, List[int]]] = {"gold": {}, "xp": {}, "cs": {}, "level": {}}
+    events: List[dict] = []
+
+    for frame in frames:
+        timestamps.append(frame.get("timestamp", 0))
+        for pid, pframe in frame.get("participantFrames", {}).items():
+            curves["gold"].setdefault(pid, []).append(pframe.get("totalGold", 0))
+            curves["xp"].setdefault(pid, []).append(pframe.get("xp", 0))
+            curves["cs"].setdefault(pid, []).append(
+                pframe.get("minionsKilled", 0) + pframe.get("jungleMinionsKilled", 0)
+            )
+            curves["level"].setdefault(pid, []).append(pframe.get("level", 0))
+        for event in frame.get("events", []):
+            fields = SUMMARY_EVENT_FIELDS.get(event.get("type"))
+            if fields is None:
+                continue
+            compact = {"type": event["type"], "timestamp": event.get("timestamp", 0)}
+            for field in fields:
+                if field in event:
+                    compact[field] = event[field]
+            events.append(compact)
+
+    return {
+        "matchId": metadata.get("matchId"),
+        "frameInterval": info.get("frameInterval", 60000),
+        "participants": [
+            {"participantId": p.get("participantId"), "puuid": p.get("puuid")}
+            for p in info.get("participants", [])
+        ],
+        "timestamps": timestamps,
+        "curves": curves,
+        "events": events,
+    }
+
+
+def parse_fields(fields: Optional[str]) -> Optional[dict]:
+    """
+    Convierte "metadata.matchId,info.participants.kills" en un árbol de
+    proyección {"metadata": {"matchId": {}}, "info": {"participants": {"kills": {}}}}
+    """
+    if not fields:
+        return None
+    tree: dict = {}
+    for path in fields.split(","):
+        node = tree
+        for part in (p for p in path.strip().split(".") if p):
+            node = node.setdefault(part, {})
+    return tree or None
+
+
+def project(document: Any, tree: Optional[dict]) -> Any:
+    """
+    Aplica un árbol de proyección a un documento. Las listas se proyectan
+    elemento a elemento; un nodo vacío conserva el valor completo.
+    """
+    if not tree:
+        return document
+    if isinstance(document, list):
+        return [project(item, tree) for item in document]
+    if not isinstance(document, dict):
+        return document
+    return {
+        key: project(document[key], subtree)
+        for key, subtree in tree.items()
+        if key in document
+    }
+
+
+def project_fields(document: Any, fields: Optional[str]) -> Any:
+    """Proyecta un documento según el parámetro de consulta `fields`"""
+    return project(document, parse_fields(fields))
@@ -0,0 +1,332 @@
+"""
+Matriz de enfrentamientos de línea: partidas y victorias del campeón A
+contra el campeón B en la misma teamPosition, por parche. Las matrices son
+arrays NumPy (rol x campeón x campeón) sobre un índice compacto de
+championId, de modo que un par se consulta en O(1) y los mejores/peores
+rivales de un campeón son una fila con argpartition.
+"""
+import asyncio
+import logging
+from collections import Counter, OrderedDict
+from itertools import permutations
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from backend.services.cache import cache, CacheTTL
+from backend.services.ddragon import ddragon
+from backend.services.patch_stats import ROLES, normalize_role, patch_of, patch_sort_key
+
+logger = logging.getLogger(__name__)
+
+ROLE_INDEX = {role: index for index, role in enumerate(ROLES)}
+
+
+class MatchupMatrix:
+    """
+    Contadores de un parche. `games[r, a, b]` son las partidas de A contra B
+    en el rol r y `wins[r, a, b]` las que ganó A; `role_games[r, a]` las
+    partidas de A en el rol r (para inferir roles en partidas en vivo).
+    """
+
+    __slots__ = ("games", "wins", "role_games")
+
+    def __init__(self, capacity: int):
+        shape = (len(ROLES), capacity, capacity)
+        self.games = np.zeros(shape, dtype=np.uint32)
+        self.wins = np.zeros(shape, dtype=np.uint32)
+        self.role_games = np.zeros((len(ROLES), capacity), dtype=np.uint32)
+
+    @property
+    def capacity(self) -> int:
+        return self.games.shape[1]
+
+    def grow(self, capacity: int) -> None:
+        pad = capacity - self.capacity
+        if pad <= 0:
+            return
+        self.games = np.pad(self.games, ((0, 0), (0, pad), (0, pad)))
+        self.wins = np.pad(self.wins, ((0, 0), (0, pad), (0, pad)))
+        self.role_games = np.pad(self.role_games, ((0, 0), (0, pad)))
+
+    def add(self, roles: np.ndarray, first: np.ndarray, second: np.ndarray, games: np.ndarray, first_wins: np.ndarray) -> None:
+        """Suma enfrentamientos (en ambos sentidos) de forma vectorizada"""
+        np.add.at(self.games, (roles, first, second), games)
+        np.add.at(self.games, (roles, second, first), games)
+        np.add.at(self.wins, (roles, first, second), first_wins)
+        np.add.at(self.wins, (roles, second, first), games - first_wins)
+
+    @classmethod
+    def merge(cls, matrices: Iterable["MatchupMatrix"], capacity: int) -> "MatchupMatrix":
+        merged = cls(capacity)
+        for matrix in matrices:
+            merged.games += matrix.games
+            merged.wins += matrix.wins
+            merged.role_games += matrix.role_games
+        return merged
+
+
+class MatchupStore:
+    """
+    Matrices de los `max_patches` parches más recientes, con un índice
+    championId -> fila común a todas (se pueden sumar directamente). Se
+    comparten entre workers como `patch_stats`: incrementos pendientes que
+    `flush()` envía a un hash de Redis por parche y `load()` recarga.
+    """
+
+    def __init__(self, max_patches: int = 2, initial_capacity: int = 192, max_seen: int = 200000):
+        self.max_patches = max_patches
+        self.max_seen = max_seen
+        self.current_patch: Optional[str] = None
+        self._capacity = initial_capacity
+        self._index: Dict[int, int] = {}
+        self._ids: List[int] = []
+        self._matrices: Dict[str, MatchupMatrix] = {}
+        # parche -> "ROL:a:b" / "ROL:a:b:w" / "ROL:a" -> incremento (a < b por championId)
+        self._pending: Dict[str, Counter] = {}
+        self._seen: "OrderedDict[str, None]" = OrderedDict()
+
+    @staticmethod
+    def _redis_key(patch: str) -> str:
+        return f"matchups:{patch}"
+
+    @staticmethod
+    def _seen_key(patch: str) -> str:
+        return f"matchups:seen:{patch}"
+
+    def patches(self) -> List[str]:
+        patches = set(self._matrices) | ({self.current_patch} if self.current_patch else set())
+        return sorted(patches, key=patch_sort_key, reverse=True)[:self.max_patches]
+
+    async def ingest(self, match: dict) -> bool:
+        """
+        Suma los cinco enfrentamientos de línea de una partida, reclamándola
+        antes en Redis para que solo la cuente un worker
+        """
+        info = match.get("info", {})
+        match_id = match.get("metadata", {}).get("matchId")
+        patch = patch_of(info.get("gameVersion"))
+        if not match_id or not patch or match_id in self._seen:
+            return False
+        kept = self.patches()
+        if len(kept) >= self.max_patches and patch_sort_key(patch) < patch_sort_key(kept[-1]):
+            return False
+        lanes: Dict[str, Dict[int, dict]] = {}
+        for participant in info.get("participants", []):
+            role = participant.get("teamPosition")
+            if role in ROLE_INDEX:
+                lanes.setdefault(role, {})[participant.get("teamId")] = participant
+        deltas: Counter = Counter()
+        for role, teams in lanes.items():
+            if len(teams) != 2:
+                continue
+            first, second = sorted(teams.values(), key=lambda p: p.get("championId", 0))
+            a, b = int(first.get("championId", 0)), int(second.get("championId", 0))
+            if a == b:
+                continue
+            deltas[f"{role}:{a}:{b}"] += 1
+            deltas[f"{role}:{a}:{b}:w"] += 1 if first.get("win") else 0
+            deltas[f"{role}:{a}"] += 1
+            deltas[f"{role}:{b}"] += 1
+        if not deltas:
+            return False
+        self._seen[match_id] = None
+        while len(self._seen) > self.max_seen:
+            self._seen.popitem(last=False)
+        if not await cache.claim(self._seen_key(patch), match_id, CacheTTL.PATCH_STATS):
+            return False
+        self._apply(self._matrix(patch), deltas)
+        self._pending.setdefault(patch, Counter()).update(deltas)
+        return True
+
+    def matrix(self, patches: int = 1) -> Optional[MatchupMatrix]:
+        """Matriz del parche actual, o la suma de los `patches` más recientes"""
+        available = [self._matrices[p] for p in self.patches()[:patches] if p in self._matrices]
+        if not available:
+            return None
+        if len(available) == 1:
+            return available[0]
+        return MatchupMatrix.merge(available, self._capacity)
+
+    def lookup(self, champion_id: int, opponent_id: int, role: str, patches: int = 1) -> dict:
+        """Partidas y winrate de `champion_id` contra `opponent_id` en el rol (O(1))"""
+        role = normalize_role(role)
+        matrix = self.matrix(patches)
+        games = wins = 0
+        if matrix is not None and role in ROLE_INDEX and champion_id in self._index and opponent_id in self._index:
+            r, a, b = ROLE_INDEX[role], self._index[champion_id], self._index[opponent_id]
+            games, wins = int(matrix.games[r, a, b]), int(matrix.wins[r, a, b])
+        return {
+            "championId": champion_id,
+            "opponentId": opponent_id,
+            "role": role,
+            "games": games,
+            "wins": wins,
+            "winrate": round(wins / games * 100, 2) if games else None,
+        }
+
+    def top(
+        self,
+        champion_id: int,
+        role: str,
+        k: int = 5,
+        min_games: int = 10,
+        worst: bool = False,
+        patches: int = 1
+    ) -> List[dict]:
+        """Los `k` rivales contra los que `champion_id` tiene mejor (o peor) winrate"""
+        role = normalize_role(role)
+        matrix = self.matrix(patches)
+        if matrix is None or role not in ROLE_INDEX or champion_id not in self._index or k <= 0:
+            return []
+        r, a = ROLE_INDEX[role], self._index[champion_id]
+        games = matrix.games[r, a].astype(np.float64)
+        candidates = np.flatnonzero(games >= max(min_games, 1))
+        if not candidates.size:
+            return []
+        rates = matrix.wins[r, a, candidates] / games[candidates]
+        order = -rates if not worst else rates
+        k = min(k, candidates.size)
+        selected = np.argpartition(order, k - 1)[:k]
+        champion_ids = np.asarray(self._ids)[candidates[selected]]
+        selected = selected[np.lexsort((champion_ids, order[selected]))]
+        return [
+            {
+                "opponentId": self._ids[candidates[i]],
+                "games": int(games[candidates[i]]),
+                "winrate": round(float(rates[i]) * 100, 2),
+            }
+            for i in selected
+        ]
+
+    def assign_roles(self, champion_ids: List[int], fixed: Optional[Dict[int, str]] = None) -> Dict[int, str]:
+        """
+        Rol más probable de cada campeón de un equipo (partidas en vivo, sin
+        teamPosition): la asignación que maximiza la frecuencia de cada
+        campeón en su rol. `fixed` fuerza roles conocidos.
+        """
+        fixed = {cid: role for cid, role in (fixed or {}).items() if role in ROLE_INDEX}
+        matrix = self.matrix(self.max_patches)
+        free_ids = [cid for cid in champion_ids if cid not in fixed][:len(ROLES)]
+        free_roles = [role for role in ROLES if role not in fixed.values()]
+        if len(free_ids) > len(free_roles):
+            free_ids = free_ids[:len(free_roles)]
+        shares = np.full((len(free_ids), len(ROLES)), 1e-3)
+        if matrix is not None:
+            for row, cid in enumerate(free_ids):
+                index = self._index.get(cid)
+                if index is not None:
+                    counts = matrix.role_games[:, index].astype(np.float64)
+                    if counts.sum():
+                        shares[row] += counts / counts.sum()
+        logs = np.log(shares)
+        best, best_score = None, -np.inf
+        for roles in permutations(free_roles, len(free_ids)):
+            score = sum(logs[row, ROLE_INDEX[role]] for row, role in enumerate(roles))
+            if score > best_score:
+                best, best_score = roles, score
+        assigned = dict(fixed)
+        assigned.update(zip(free_ids, best or ()))
+        return assigned
+
+    def rollover(self, version: Optional[str]) -> bool:
+        patch = patch_of(version)
+        if not patch or patch == self.current_patch:
+            return False
+        self.current_patch = patch
+        self._retain()
+        return True
+
+    async def flush(self) -> None:
+        pending, self._pending = self._pending, {}
+        for patch, deltas in pending.items():
+            await cache.incr_hash(self._redis_key(patch), dict(deltas), CacheTTL.PATCH_STATS)
+
+    async def load(self) -> int:
+        """Sustituye las matrices conservadas por los totales compartidos"""
+        loaded = 0
+        for patch in self.patches():
+            flat = await cache.get_hash(self._redis_key(patch))
+            if not flat:
+                continue
+            matrix = MatchupMatrix(self._capacity)
+            self._matrices[patch] = matrix
+            self._apply(matrix, flat)
+            self._apply(matrix, self._pending.get(patch, {}))
+            loaded += 1
+        return loaded
+
+    async def run_sync(self, interval: float = 300.0) -> None:
+        """
+        Tarea de fondo del lifespan: rotación de parche y sincronización entre
+        workers. La versión se vuelve a consultar como en `patch_stats`, para
+        que ambos roten a la vez.
+        """
+        while True:
+            try:
+                self.rollover(await ddragon.refresh_version())
+                await self.flush()
+                await self.load()
+            except Exception as exc:
+                logger.warning("Sincronización de matchups fallida: %s", exc)
+            await asyncio.sleep(interval)
+
+    def clear(self) -> None:
+        self._matrices.clear()
+        self._pending.clear()
+        self._seen.clear()
+        self.current_patch = None
+
+    def _slot(self, champion_id: int) -> int:
+        index = self._index.get(champion_id)
+        if index is None:
+            index = self._index[champion_id] = len(self._ids)
+            self._ids.append(champion_id)
+            if index >= self._capacity:
+                self._capacity *= 2
+                for matrix in self._matrices.values():
+                    matrix.grow(self._capacity)
+        return index
+
+    def _matrix(self, patch: str) -> MatchupMatrix:
+        matrix = self._matrices.get(patch)
+        if matrix is None:
+            matrix = self._matrices[patch] = MatchupMatrix(self._capacity)
+            self._retain()
+        return matrix
+
+    def _apply(self, matrix: MatchupMatrix, deltas: Dict[str, int]) -> None:
+        """Vuelca contadores planos ("ROL:a:b", "ROL:a:b:w", "ROL:a") en la matriz"""
+        pairs: Dict[Tuple[int, int, int], List[int]] = {}
+        role_rows, role_cols, role_counts = [], [], []
+        for field, value in deltas.items():
+            parts = field.split(":")
+            role = ROLE_INDEX.get(parts[0])
+            if role is None:
+                continue
+            if len(parts) == 2:
+                role_rows.append(role)
+                role_cols.append(self._slot(int(parts[1])))
+                role_counts.append(value)
+                continue
+            key = (role, self._slot(int(parts[1])), self._slot(int(parts[2])))
+            entry = pairs.setdefault(key, [0, 0])
+            entry[1 if len(parts) == 4 else 0] += value
+        # _slot puede haber ampliado la capacidad
+        matrix.grow(self._capacity)
+        if pairs:
+            keys = np.array(list(pairs), dtype=np.intp)
+            values = np.array(list(pairs.values()), dtype=np.uint32)
+            matrix.add(keys[:, 0], keys[:, 1], keys[:, 2], values[:, 0], values[:, 1])
+        if role_rows:
+            np.add.at(matrix.role_games, (np.array(role_rows), np.array(role_cols)), np.array(role_counts, dtype=np.uint32))
+
+    def _retain(self) -> None:
+        kept = set(self.patches())
+        for patch in [p for p in self._matrices if p not in kept]:
+            del self._matrices[patch]
+            self._pending.pop(patch, None)
+
+
+# Instancia global
+matchup_store = MatchupStore()
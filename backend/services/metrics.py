@@ -0,0 +1,234 @@
+"""
+Métricas Prometheus: latencia por ruta, llamadas a Riot por endpoint,
+aciertos/fallos de cachés y margen de los rate limits de la API key
+"""
+import os
+import re
+import time
+from typing import Optional
+
+from prometheus_client import (
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    CONTENT_TYPE_LATEST,
+    multiprocess,
+)
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+REGISTRY = CollectorRegistry()
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+HTTP_REQUESTS = Counter(
+    "lol_http_requests_total",
+    "Peticiones HTTP atendidas",
+    ["method", "route", "status"],
+    registry=REGISTRY,
+)
+HTTP_LATENCY = Histogram(
+    "lol_http_request_duration_seconds",
+    "Latencia de las peticiones HTTP por ruta",
+    ["method", "route"],
+    buckets=LATENCY_BUCKETS,
+    registry=REGISTRY,
+)
+
+RIOT_REQUESTS = Counter(
+    "lol_riot_requests_total",
+    "Llamadas a la API de Riot por endpoint y código de estado",
+    ["endpoint", "status"],
+    registry=REGISTRY,
+)
+RIOT_LATENCY = Histogram(
+    "lol_riot_request_duration_seconds",
+    "Latencia de las llamadas a la API de Riot",
+    ["endpoint"],
+    buckets=LATENCY_BUCKETS,
+    registry=REGISTRY,
+)
+RIOT_RATE_LIMIT_USAGE = Gauge(
+    "lol_riot_rate_limit_usage_ratio",
+    "Fracción consumida de cada ventana de rate limit (1.0 = límite alcanzado)",
+    ["scope", "endpoint", "window"],
+    registry=REGISTRY,
+)
+RIOT_RATE_LIMIT_REMAINING = Gauge(
+    "lol_riot_rate_limit_remaining",
+    "Peticiones restantes en cada ventana de rate limit",
+    ["scope", "endpoint", "window"],
+    registry=REGISTRY,
+)
+
+CACHE_OPERATIONS = Counter(
+    "lol_cache_operations_total",
+    "Operaciones de caché por resultado",
+    ["cache", "operation", "result"],
+    registry=REGISTRY,
+)
+CACHE_LATENCY = Histogram(
+    "lol_cache_operation_duration_seconds",
+    "Latencia de las operaciones de caché",
+    ["cache", "operation"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5),
+    registry=REGISTRY,
+)
+CACHE_ENTRIES = Gauge(
+    "lol_cache_entries",
+    "Entradas en las cachés en memoria del proceso",
+    ["cache"],
+    registry=REGISTRY,
+)
+CACHE_BYTES = Gauge(
+    "lol_cache_bytes",
+    "Bytes estimados en las cachés en memoria del proceso",
+    ["cache"],
+    registry=REGISTRY,
+)
+
+MATCH_FETCHES = Counter(
+    "lol_match_fetch_total",
+    "Partidas solicitadas en fetch_match_details por origen",
+    ["source"],
+    registry=REGISTRY,
+)
+MATCH_FETCH_LATENCY = Histogram(
+    "lol_match_fetch_batch_duration_seconds",
+    "Duración de cada lote de fetch_match_details",
+    buckets=LATENCY_BUCKETS,
+    registry=REGISTRY,
+)
+
+
+# Patrones de URL de Riot -> etiqueta de endpoint (cardinalidad acotada)
+RIOT_ENDPOINT_PATTERNS = [
+    (re.compile(r"/riot/account/v1/accounts/by-riot-id/"), "account.by-riot-id"),
+    (re.compile(r"/riot/account/v1/accounts/by-puuid/"), "account.by-puuid"),
+    (re.compile(r"/lol/summoner/v4/summoners/by-puuid/"), "summoner.by-puuid"),
+    (re.compile(r"/lol/summoner/v4/summoners/"), "summoner.by-id"),
+    (re.compile(r"/lol/match/v5/matches/by-puuid/[^/]+/ids"), "match.ids"),
+    (re.compile(r"/lol/match/v5/matches/[^/]+/timeline"), "match.timeline"),
+    (re.compile(r"/lol/match/v5/matches/"), "match.detail"),
+    (re.compile(r"/lol/spectator/v5/active-games/"), "spectator.active-game"),
+    (re.compile(r"/lol/spectator/v5/featured-games"), "spectator.featured"),
+    (re.compile(r"/lol/league/v4/entries/by-summoner/"), "league.entries-by-summoner"),
+    (re.compile(r"/lol/league/v4/entries/by-puuid/"), "league.entries-by-puuid"),
+    (re.compile(r"/lol/league/v4/(challenger|grandmaster|master)leagues/"), "league.apex"),
+    (re.compile(r"/lol/champion-mastery/v4/champion-masteries/by-puuid/[^/]+/top"), "mastery.top"),
+    (re.compile(r"/lol/champion-mastery/v4/champion-masteries/"), "mastery.all"),
+    (re.compile(r"/lol/champion-mastery/v4/scores/"), "mastery.score"),
+    (re.compile(r"/lol/challenges/v1/"), "challenges.player"),
+    (re.compile(r"/lol/status/v4/"), "status.platform"),
+]
+
+
+def riot_endpoint_label(url: str) -> str:
+    """Etiqueta de endpoint para una URL de Riot (sin IDs, para no disparar la cardinalidad)"""
+    for pattern, label in RIOT_ENDPOINT_PATTERNS:
+        if pattern.search(url):
+            return label
+    return "other"
+
+
+def status_class(status_code: Optional[int]) -> str:
+    """Agrupa códigos HTTP (429 se conserva aparte por su relevancia)"""
+    if status_code is None:
+        return "error"
+    if status_code == 429:
+        return "429"
+    return f"{status_code // 100}xx"
+
+
+def _parse_rate_limit(header: str) -> dict:
+    """Convierte "20:1,100:120" en {"1": 20, "120": 100} (ventana en segundos -> valor)"""
+    values = {}
+    for part in header.split(","):
+        value, _, window = part.strip().partition(":")
+        if value.isdigit() and window.isdigit():
+            values[window] = int(value)
+    return values
+
+
+def record_rate_limits(endpoint: str, headers) -> None:
+    """Actualiza los gauges de margen a partir de las cabeceras X-*-Rate-Limit de Riot"""
+    for scope, prefix, label in (("app", "X-App-Rate-Limit", "*"), ("method", "X-Method-Rate-Limit", endpoint)):
+        limits = _parse_rate_limit(headers.get(prefix, ""))
+        counts = _parse_rate_limit(headers.get(f"{prefix}-Count", ""))
+        for window, limit in limits.items():
+            used = counts.get(window, 0)
+            RIOT_RATE_LIMIT_USAGE.labels(scope, label, window).set(used / limit if limit else 0)
+            RIOT_RATE_LIMIT_REMAINING.labels(scope, label, window).set(max(limit - used, 0))
+
+
+def observe_riot_request(endpoint: str, status_code: Optional[int], elapsed: float, headers=None) -> None:
+    """Registra una llamada a Riot (conteo, latencia y margen de rate limit)"""
+    RIOT_REQUESTS.labels(endpoint, status_class(status_code)).inc()
+    RIOT_LATENCY.labels(endpoint).observe(elapsed)
+    if headers is not None:
+        record_rate_limits(endpoint, headers)
+
+
+def observe_cache(
+    cache_name: str,
+    operation: str,
+    result: str,
+    elapsed: Optional[float] = None,
+    count: int = 1
+) -> None:
+    """Registra `count` operaciones de caché y, opcionalmente, la latencia de la llamada"""
+    if count:
+        CACHE_OPERATIONS.labels(cache_name, operation, result).inc(count)
+    if elapsed is not None:
+        CACHE_LATENCY.labels(cache_name, operation).observe(elapsed)
+
+
+def render_metrics() -> bytes:
+    """
+    Exposición en formato de texto de Prometheus. Con varios workers y
+    PROMETHEUS_MULTIPROC_DIR definido, agrega los valores de todos los procesos.
+    """
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+METRICS_CONTENT_TYPE = CONTENT_TYPE_LATEST
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI que mide la latencia y el estado de cada petición.
+    La ruta se etiqueta con la plantilla (p. ej. /api/match/{match_id}),
+    nunca con la URL concreta, para mantener acotada la cardinalidad.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            route_label = getattr(route, "path", None) or "unmatched"
+            method = scope.get("method", "GET")
+            HTTP_REQUESTS.labels(method, route_label, status_class(status_code)).inc()
+            HTTP_LATENCY.labels(method, route_label).observe(time.perf_counter() - start)
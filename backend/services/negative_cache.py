@@ -0,0 +1,106 @@
+"""
+Caché negativa de la API de Riot: recuerda durante poco tiempo los
+resultados "vacíos" (Riot ID inexistente, jugador fuera de partida, sin
+clasificatorias) para no repetir la consulta en cada petición. Vive en
+memoria del proceso y, si hay Redis, en la caché compartida.
+"""
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from backend.services.cache import cache, CacheTTL
+from backend.services.metrics import observe_cache
+
+
+# endpoint -> (clase de resultado, TTL). Solo estos endpoints se cachean en negativo
+NEGATIVE_POLICIES: Dict[str, Tuple[str, int]] = {
+    "account.by-riot-id": ("not_found", CacheTTL.NOT_FOUND),
+    "account.by-puuid": ("not_found", CacheTTL.NOT_FOUND),
+    "summoner.by-puuid": ("not_found", CacheTTL.NOT_FOUND),
+    "summoner.by-id": ("not_found", CacheTTL.NOT_FOUND),
+    "spectator.active-game": ("not_in_game", CacheTTL.NOT_IN_GAME),
+    "league.entries-by-puuid": ("unranked", CacheTTL.UNRANKED),
+    "league.entries-by-summoner": ("unranked", CacheTTL.UNRANKED),
+}
+
+
+class NegativeCache:
+    """Resultados negativos por URL con TTL según la clase de resultado"""
+
+    def __init__(self, max_entries: int = 20000):
+        self.max_entries = max_entries
+        self._local: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+
+    @staticmethod
+    def _key(endpoint: str, url: str) -> str:
+        # Los Riot ID no distinguen mayúsculas
+        return f"neg:{url.lower() if endpoint == 'account.by-riot-id' else url}"
+
+    @staticmethod
+    def classify(endpoint: str, status_code: int, data=None) -> Optional[str]:
+        """Clase negativa de una respuesta, o None si no debe cachearse"""
+        policy = NEGATIVE_POLICIES.get(endpoint)
+        if policy is None:
+            return None
+        result_class = policy[0]
+        if result_class == "unranked":
+            return result_class if status_code == 200 and data == [] else None
+        return result_class if status_code == 404 else None
+
+    async def get(self, endpoint: str, url: str) -> Optional[dict]:
+        """Resultado negativo vigente (con la forma de RiotAPIClient._request) o None"""
+        if endpoint not in NEGATIVE_POLICIES:
+            return None
+        key = self._key(endpoint, url)
+        entry = self._local.get(key)
+        if entry is not None:
+            expires_at, result = entry
+            if expires_at > time.monotonic():
+                observe_cache("negative", "get", "hit")
+                return dict(result)
+            self._local.pop(key, None)
+        shared = await cache.get(key)
+        if shared is not None:
+            # La copia local vive solo lo que le queda a la de Redis
+            remaining = shared.pop("expires_at", time.time() + NEGATIVE_POLICIES[endpoint][1]) - time.time()
+            if remaining > 0:
+                self._store_local(key, shared, remaining)
+                observe_cache("negative", "get", "hit")
+                return dict(shared)
+        observe_cache("negative", "get", "miss")
+        return None
+
+    async def remember(self, endpoint: str, url: str, result_class: str) -> None:
+        """Guarda el resultado negativo de una URL durante el TTL de su clase"""
+        ttl = NEGATIVE_POLICIES[endpoint][1]
+        if result_class == "unranked":
+            result = {"success": True, "data": [], "negative_cache": result_class}
+        else:
+            result = {
+                "success": False,
+                "error": "No encontrado",
+                "status_code": 404,
+                "negative_cache": result_class
+            }
+        key = self._key(endpoint, url)
+        self._store_local(key, result, ttl)
+        await cache.set(key, {**result, "expires_at": time.time() + ttl}, ttl)
+        observe_cache("negative", "set", result_class)
+
+    async def forget(self, endpoint: str, url: str) -> None:
+        key = self._key(endpoint, url)
+        self._local.pop(key, None)
+        await cache.delete(key)
+
+    def clear(self) -> None:
+        self._local.clear()
+
+    def _store_local(self, key: str, result: dict, ttl: float) -> None:
+        self._local[key] = (time.monotonic() + ttl, result)
+        self._local.move_to_end(key)
+        while len(self._local) > self.max_entries:
+            self._local.popitem(last=False)
+
+
+# Instancia global
+negative_cache = NegativeCache()
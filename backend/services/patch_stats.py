@@ -0,0 +1,344 @@
+"""
+Estadísticas de campeones particionadas por parche (major.minor de
+`info.gameVersion`). Cada partida descargada de Riot suma los contadores de
+sus diez participantes en la partición de su parche. Las consultas del
+parche actual solo leen esa partición, y las vistas de varios parches suman
+particiones. Al cambiar la versión de Data Dragon se rota: los parches
+antiguos se compactan (sin items ni runas) y los más viejos se descartan.
+"""
+import asyncio
+import logging
+from collections import Counter, OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from backend.services.cache import cache, CacheTTL
+from backend.services.ddragon import ddragon
+
+logger = logging.getLogger(__name__)
+
+
+# Roles de teamPosition y los alias que usan las builds y el frontend
+ROLES = ("TOP", "JUNGLE", "MIDDLE", "BOTTOM", "UTILITY")
+ROLE_ALIASES = {"MID": "MIDDLE", "ADC": "BOTTOM", "BOT": "BOTTOM", "SUPPORT": "UTILITY", "SUP": "UTILITY"}
+# Contadores que se suman por (campeón, rol)
+TOTAL_FIELDS = ("games", "wins", "kills", "deaths", "assists", "cs", "damage", "gold", "duration")
+# Prefijos de los contadores de detalle, que se descartan al compactar
+DETAIL_PREFIXES = ("item:", "keystone:")
+
+
+def patch_of(version: Optional[str]) -> Optional[str]:
+    """"15.1.640.1234" (gameVersion) o "15.1.1" (Data Dragon) -> "15.1" """
+    parts = (version or "").split(".")
+    if len(parts) < 2 or not parts[0].isdigit() or not parts[1].isdigit():
+        return None
+    return f"{int(parts[0])}.{int(parts[1])}"
+
+
+def patch_sort_key(patch: str) -> Tuple[int, int]:
+    major, minor = patch.split(".")
+    return int(major), int(minor)
+
+
+def normalize_role(role: Optional[str]) -> Optional[str]:
+    if not role:
+        return None
+    role = role.upper()
+    return ROLE_ALIASES.get(role, role)
+
+
+def match_deltas(match: dict) -> Dict[str, int]:
+    """
+    Contadores planos de una partida: "games", "{campeón}:ban" y
+    "{campeón}:{rol}:{campo}". Solo cuentan los participantes con
+    teamPosition (Grieta del Invocador).
+    """
+    info = match.get("info", {})
+    deltas: Counter = Counter()
+    for participant in info.get("participants", []):
+        role = participant.get("teamPosition")
+        if role not in ROLES:
+            continue
+        prefix = f"{int(participant.get('championId', 0))}:{role}:"
+        deltas[prefix + "games"] += 1
+        deltas[prefix + "wins"] += 1 if participant.get("win") else 0
+        deltas[prefix + "kills"] += participant.get("kills", 0)
+        deltas[prefix + "deaths"] += participant.get("deaths", 0)
+        deltas[prefix + "assists"] += participant.get("assists", 0)
+        deltas[prefix + "cs"] += participant.get("totalMinionsKilled", 0) + participant.get("neutralMinionsKilled", 0)
+        deltas[prefix + "damage"] += participant.get("totalDamageDealtToChampions", 0)
+        deltas[prefix + "gold"] += participant.get("goldEarned", 0)
+        deltas[prefix + "duration"] += info.get("gameDuration", 0)
+        for slot in range(6):
+            item_id = participant.get(f"item{slot}")
+            if item_id:
+                deltas[f"{prefix}item:{item_id}"] += 1
+        styles = participant.get("perks", {}).get("styles") or [{}]
+        keystone = (styles[0].get("selections") or [{}])[0].get("perk")
+        if keystone:
+            deltas[f"{prefix}keystone:{keystone}"] += 1
+    if not deltas:
+        return {}
+    deltas["games"] += 1
+    for team in info.get("teams", []):
+        for ban in team.get("bans", []):
+            if ban.get("championId", -1) > 0:
+                deltas[f"{ban['championId']}:ban"] += 1
+    return {field: value for field, value in deltas.items() if value}
+
+
+class PatchPartition:
+    """
+    Contadores de un parche: partidas, bans por campeón y, por (campeón,
+    rol), los totales de TOTAL_FIELDS más los conteos de items y keystones.
+    """
+
+    __slots__ = ("patch", "games", "bans", "rows", "compacted")
+
+    def __init__(self, patch: str):
+        self.patch = patch
+        self.games = 0
+        self.bans: Counter = Counter()
+        self.rows: Dict[Tuple[int, str], Counter] = {}
+        self.compacted = False
+
+    def add(self, deltas: Dict[str, int]) -> None:
+        """Suma contadores planos (de `match_deltas` o de Redis)"""
+        for field, value in deltas.items():
+            parts = field.split(":", 2)
+            if len(parts) == 1:
+                self.games += value
+            elif len(parts) == 2:
+                self.bans[int(parts[0])] += value
+            else:
+                name = parts[2]
+                if self.compacted and name.startswith(DETAIL_PREFIXES):
+                    continue
+                key = (int(parts[0]), parts[1])
+                row = self.rows.get(key)
+                if row is None:
+                    row = self.rows[key] = Counter()
+                row[name] += value
+
+    def flatten(self) -> Dict[str, int]:
+        flat: Dict[str, int] = {"games": self.games} if self.games else {}
+        for champion_id, count in self.bans.items():
+            flat[f"{champion_id}:ban"] = count
+        for (champion_id, role), row in self.rows.items():
+            for name, value in row.items():
+                flat[f"{champion_id}:{role}:{name}"] = value
+        return flat
+
+    def compact(self) -> None:
+        """Descarta los conteos de items y keystones (los parches antiguos solo guardan totales)"""
+        self.compacted = True
+        for row in self.rows.values():
+            for name in [name for name in row if name.startswith(DETAIL_PREFIXES)]:
+                del row[name]
+
+    @classmethod
+    def merge(cls, partitions: Iterable["PatchPartition"]) -> "PatchPartition":
+        """Suma de varias particiones (vista multi-parche)"""
+        partitions = list(partitions)
+        merged = cls("+".join(p.patch for p in partitions))
+        for partition in partitions:
+            merged.games += partition.games
+            merged.bans.update(partition.bans)
+            for key, row in partition.rows.items():
+                target = merged.rows.get(key)
+                if target is None:
+                    target = merged.rows[key] = Counter()
+                target.update(row)
+        merged.compacted = any(p.compacted for p in partitions)
+        return merged
+
+    def roles(self, champion_id: int) -> Dict[str, int]:
+        """Partidas del campeón por rol"""
+        return {role: row["games"] for (cid, role), row in self.rows.items() if cid == champion_id}
+
+    def champion(self, champion_id: int, role: Optional[str] = None, top: int = 6) -> Optional[dict]:
+        """Totales, tasas e items/keystones más usados del campeón (en un rol o en todos)"""
+        role = normalize_role(role)
+        rows = [
+            row for (cid, row_role), row in self.rows.items()
+            if cid == champion_id and (role is None or row_role == role)
+        ]
+        if not rows:
+            return None
+        total: Counter = Counter()
+        for row in rows:
+            total.update(row)
+        games = total["games"]
+        items = Counter({int(n[5:]): v for n, v in total.items() if n.startswith("item:")})
+        keystones = Counter({int(n[9:]): v for n, v in total.items() if n.startswith("keystone:")})
+        return {
+            "championId": champion_id,
+            "role": role,
+            "patch": self.patch,
+            **{field: total[field] for field in TOTAL_FIELDS},
+            "winrate": round(total["wins"] / games * 100, 2) if games else 0.0,
+            "pickrate": round(games / self.games * 100, 2) if self.games else 0.0,
+            "banrate": round(self.bans[champion_id] / self.games * 100, 2) if self.games else 0.0,
+            "items": [{"id": item_id, "count": count} for item_id, count in items.most_common(top)],
+            "keystones": [{"id": perk_id, "count": count} for perk_id, count in keystones.most_common(2)],
+        }
+
+
+class PatchStatsStore:
+    """
+    Particiones por parche en memoria, compartidas entre workers con un hash
+    de Redis por parche (`patch_stats:{parche}`): los incrementos se
+    acumulan y `flush()` los envía; `load()` trae los totales de todos.
+    Conserva `max_patches` parches, de los que solo los `full_patches` más
+    recientes guardan items y keystones.
+    """
+
+    def __init__(self, full_patches: int = 2, max_patches: int = 6, max_seen: int = 200000, namespace: str = ""):
+        # Prefijo de las claves de Redis para tablas derivadas (p. ej. tier list por región)
+        self.namespace = namespace
+        self.full_patches = full_patches
+        self.max_patches = max_patches
+        self.max_seen = max_seen
+        self.current_patch: Optional[str] = None
+        self.partitions: Dict[str, PatchPartition] = {}
+        self._pending: Dict[str, Counter] = {}
+        # matchIds ya sumados por este worker
+        self._seen: "OrderedDict[str, None]" = OrderedDict()
+
+    def _redis_key(self, patch: str) -> str:
+        return f"patch_stats:{self.namespace}:{patch}" if self.namespace else f"patch_stats:{patch}"
+
+    def _seen_key(self, patch: str) -> str:
+        prefix = f"patch_stats:{self.namespace}" if self.namespace else "patch_stats"
+        return f"{prefix}:seen:{patch}"
+
+    def patches(self) -> List[str]:
+        """Parches con partición, del más reciente al más antiguo"""
+        return sorted(self.partitions, key=patch_sort_key, reverse=True)
+
+    async def ingest(self, match: dict) -> bool:
+        """
+        Suma una partida a la partición de su parche; False si se ignora. La
+        partida se reclama en Redis antes de sumarla, de modo que solo un
+        worker la cuenta (aunque la descarguen varios o se vuelva a descargar).
+        """
+        match_id = match.get("metadata", {}).get("matchId")
+        patch = patch_of(match.get("info", {}).get("gameVersion"))
+        if not match_id or not patch or match_id in self._seen or self._expired(patch):
+            return False
+        return await self.ingest_deltas(match_id, patch, match_deltas(match))
+
+    async def ingest_deltas(self, match_id: str, patch: str, deltas: Counter) -> bool:
+        """Como `ingest`, con los contadores de la partida ya extraídos (`match_deltas`)"""
+        if not deltas or match_id in self._seen or self._expired(patch):
+            return False
+        self._seen[match_id] = None
+        while len(self._seen) > self.max_seen:
+            self._seen.popitem(last=False)
+        # Un conjunto de matchIds por parche, que caduca con los contadores del parche
+        if not await cache.claim(self._seen_key(patch), match_id, CacheTTL.PATCH_STATS):
+            return False
+        new_patch = patch not in self.partitions
+        self._partition(patch).add(deltas)
+        self._pending.setdefault(patch, Counter()).update(deltas)
+        if new_patch:
+            self._retain()
+        return True
+
+    def partition(self, patch: Optional[str] = None) -> PatchPartition:
+        """Partición de un parche (por defecto el actual); vacía si no hay datos"""
+        patch = patch or next(iter(self._kept()), None)
+        if patch is None:
+            return PatchPartition("")
+        return self.partitions.get(patch) or PatchPartition(patch)
+
+    def recent(self, count: int = 1) -> PatchPartition:
+        """
+        Suma de los `count` parches más recientes (1 = solo el actual). El
+        actual es el de Data Dragon, o uno posterior si ya hay partidas suyas
+        (Data Dragon se publica con algo de retraso).
+        """
+        if count <= 1:
+            return self.partition()
+        return PatchPartition.merge(self.partitions[p] for p in self._kept()[:count] if p in self.partitions)
+
+    def rollover(self, version: Optional[str]) -> bool:
+        """Fija el parche actual desde la versión de Data Dragon; devuelve si cambió"""
+        patch = patch_of(version)
+        if not patch or patch == self.current_patch:
+            return False
+        logger.info("Rotación de estadísticas al parche %s (antes %s)", patch, self.current_patch)
+        self.current_patch = patch
+        self._retain()
+        return True
+
+    async def flush(self) -> None:
+        """Envía a Redis los incrementos acumulados"""
+        pending, self._pending = self._pending, {}
+        for patch, deltas in pending.items():
+            await cache.incr_hash(self._redis_key(patch), dict(deltas), CacheTTL.PATCH_STATS)
+
+    async def load(self) -> int:
+        """Sustituye las particiones conservadas por los totales compartidos; devuelve cuántas"""
+        loaded = 0
+        patches = set(self.partitions) | ({self.current_patch} if self.current_patch else set())
+        for patch in patches:
+            flat = await cache.get_hash(self._redis_key(patch))
+            if not flat:
+                continue
+            partition = PatchPartition(patch)
+            partition.compacted = patch in self.partitions and self.partitions[patch].compacted
+            partition.add(flat)
+            # Lo ingerido mientras se esperaba a Redis aún no se ha enviado
+            partition.add(self._pending.get(patch, {}))
+            self.partitions[patch] = partition
+            loaded += 1
+        self._retain()
+        return loaded
+
+    async def run_sync(self, interval: float = 300.0) -> None:
+        """Tarea de fondo del lifespan: rotación por versión de Data Dragon y sincronización"""
+        while True:
+            try:
+                self.rollover(await ddragon.refresh_version())
+                await self.flush()
+                await self.load()
+            except Exception as exc:
+                logger.warning("Sincronización de estadísticas por parche fallida: %s", exc)
+            await asyncio.sleep(interval)
+
+    def clear(self) -> None:
+        self.partitions.clear()
+        self._pending.clear()
+        self._seen.clear()
+        self.current_patch = None
+
+    def _partition(self, patch: str) -> PatchPartition:
+        partition = self.partitions.get(patch)
+        if partition is None:
+            partition = self.partitions[patch] = PatchPartition(patch)
+        return partition
+
+    def _kept(self) -> List[str]:
+        patches = set(self.partitions) | ({self.current_patch} if self.current_patch else set())
+        return sorted(patches, key=patch_sort_key, reverse=True)[:self.max_patches]
+
+    def _expired(self, patch: str) -> bool:
+        """Parche más antiguo que todos los conservados con el cupo lleno"""
+        kept = self._kept()
+        return len(kept) >= self.max_patches and patch_sort_key(patch) < patch_sort_key(kept[-1])
+
+    def _retain(self) -> None:
+        """Compacta los parches fuera de los `full_patches` recientes y descarta los sobrantes"""
+        kept = self._kept()
+        for patch in list(self.partitions):
+            if patch not in kept:
+                del self.partitions[patch]
+                self._pending.pop(patch, None)
+        for patch in kept[self.full_patches:]:
+            partition = self.partitions.get(patch)
+            if partition is not None and not partition.compacted:
+                partition.compact()
+
+
+# Instancia global
+patch_stats = PatchStatsStore()
@@ -0,0 +1,125 @@
+"""
+Precarga predictiva: tras una búsqueda correcta el frontend casi siempre
+pide ranked, maestrías, IDs de partidas y el resumen de perfil del mismo
+PUUID. `prefetcher` lanza esas consultas en segundo plano con concurrencia
+acotada, y `warm_cache` guarda los resultados durante poco tiempo (y une
+las peticiones simultáneas), de modo que las siguientes peticiones se
+sirven sin esperar a Riot.
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+from backend.config import settings
+from backend.services.cache import cache
+from backend.services.metrics import observe_cache
+
+logger = logging.getLogger(__name__)
+
+
+class WarmCache:
+    """
+    Resultados recientes por clave, en memoria y en Redis (compartidos entre
+    workers). Una clave en curso no se recalcula: las peticiones que llegan
+    mientras tanto esperan al mismo resultado. None no se guarda.
+    """
+
+    def __init__(self, max_entries: int = 5000):
+        self.max_entries = max_entries
+        # clave -> (expira_en, valor)
+        self._local: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    async def get_or_run(self, key: str, producer: Callable[[], Awaitable[Any]], ttl: int) -> Any:
+        entry = self._local.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            observe_cache("warm", "get", "hit")
+            return entry[1]
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            observe_cache("warm", "get", "coalesced")
+            return await asyncio.shield(inflight)
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            shared = await cache.get(f"warm:{key}")
+            if shared is not None:
+                observe_cache("warm", "get", "hit")
+                value = shared
+            else:
+                observe_cache("warm", "get", "miss")
+                value = await producer()
+                if value is not None:
+                    await cache.set(f"warm:{key}", value, ttl)
+            if value is not None:
+                self._store(key, value, ttl)
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as exc:
+            future.set_exception(exc)
+            # Marca la excepción como recuperada si nadie más esperaba
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    def clear(self) -> None:
+        self._local.clear()
+
+    def _store(self, key: str, value: Any, ttl: int) -> None:
+        self._local[key] = (time.monotonic() + ttl, value)
+        self._local.move_to_end(key)
+        while len(self._local) > self.max_entries:
+            self._local.popitem(last=False)
+
+
+class Prefetcher:
+    """
+    Tareas de precarga en segundo plano con baja prioridad: como mucho
+    `concurrency` a la vez, y se descartan (no se encolan) cuando ya hay
+    `max_pending`, para no competir con el tráfico interactivo por el rate
+    limit de Riot.
+    """
+
+    def __init__(self, concurrency: int = 2, max_pending: int = 64, enabled: bool = True):
+        self.enabled = enabled
+        self.max_pending = max_pending
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._pending: Dict[str, asyncio.Task] = {}
+
+    def schedule(self, key: str, job: Callable[[], Awaitable[Any]]) -> bool:
+        """Lanza `job` si no hay otro con la misma clave; devuelve si se lanzó"""
+        if not self.enabled or key in self._pending or len(self._pending) >= self.max_pending:
+            observe_cache("prefetch", "schedule", "skipped")
+            return False
+        observe_cache("prefetch", "schedule", "scheduled")
+        self._pending[key] = asyncio.get_running_loop().create_task(self._run(key, job))
+        return True
+
+    async def wait(self) -> None:
+        """Espera a las tareas en curso (tests y apagado)"""
+        while self._pending:
+            await asyncio.gather(*self._pending.values(), return_exceptions=True)
+
+    def cancel(self) -> None:
+        for task in self._pending.values():
+            task.cancel()
+
+    async def _run(self, key: str, job: Callable[[], Awaitable[Any]]) -> None:
+        try:
+            async with self._semaphore:
+                await job()
+        except Exception as exc:
+            logger.warning("Precarga %s fallida: %s", key, exc)
+        finally:
+            self._pending.pop(key, None)
+
+
+# Instancias globales
+warm_cache = WarmCache()
+prefetcher = Prefetcher(settings.prefetch_concurrency, enabled=settings.prefetch_enabled)
@@ -0,0 +1,56 @@
+"""
+Precarga de datos estáticos de solo lectura antes del fork de los workers
+de gunicorn. Lo que se carga en el proceso maestro (Data Dragon, índice de
+campeones, tablas de builds) se comparte copy-on-write entre los workers;
+gc.freeze() evita que el recolector de ciclos toque esas páginas y las
+duplique en cada proceso.
+"""
+import asyncio
+import gc
+import logging
+from typing import Dict
+
+from backend.config import settings
+from backend.services import champion_builds
+from backend.services.ddragon import ddragon
+
+logger = logging.getLogger(__name__)
+
+
+async def preload_static_data() -> Dict[str, int]:
+    """
+    Carga Data Dragon desde la red y guarda la instantánea configurada; si
+    la red falla, usa la instantánea. Sin ninguna de las dos, los workers
+    cargarán los datos bajo demanda como en modo de un solo proceso.
+    """
+    try:
+        counts = await ddragon.preload()
+        if settings.ddragon_snapshot_path:
+            ddragon.save_snapshot(settings.ddragon_snapshot_path)
+    except Exception as exc:
+        if not ddragon.load_snapshot(settings.ddragon_snapshot_path):
+            logger.warning("Precarga de Data Dragon fallida: %s", exc)
+            return {}
+        logger.info("Data Dragon cargado desde %s", settings.ddragon_snapshot_path)
+        await ddragon.get_champion_by_id(0)
+        counts = ddragon.loaded_counts()
+    counts["champion_builds"] = len(champion_builds.CHAMPION_BUILDS)
+    return counts
+
+
+def freeze_heap() -> int:
+    """
+    Recolecta y congela los objetos actuales: el GC no volverá a recorrerlos
+    (ni a escribir en sus cabeceras) en los workers. Devuelve cuántos quedan
+    congelados.
+    """
+    gc.collect()
+    gc.freeze()
+    return gc.get_freeze_count()
+
+
+def preload_before_fork() -> Dict[str, int]:
+    """Precarga síncrona para los hooks de gunicorn en el proceso maestro"""
+    counts = asyncio.run(preload_static_data())
+    counts["frozen_objects"] = freeze_heap()
+    return counts
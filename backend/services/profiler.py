@@ -0,0 +1,153 @@
+"""
+Profiler por muestreo para producción: mientras hay peticiones muestreadas
+en curso, un hilo captura periódicamente la pila del hilo del event loop y
+acumula pilas colapsadas (formato de flamegraph.pl / speedscope).
+Desactivado, el coste por petición es una sola comprobación booleana.
+"""
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Iterable, Optional, Tuple
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+
+class SamplingProfiler:
+    """Muestrea pilas del hilo del event loop y las agrega en memoria"""
+
+    def __init__(self, interval_ms: float = 5.0, max_stacks: int = 20000, max_depth: int = 128):
+        self.enabled = False
+        self.sample_rate = 0.0
+        self.routes: Tuple[str, ...] = ()
+        self.interval_ms = interval_ms
+        self.max_stacks = max_stacks
+        self.max_depth = max_depth
+        self.samples = 0
+        self.profiled_requests = 0
+        self._stacks: Counter = Counter()
+        self._active: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def configure(
+        self,
+        enabled: bool,
+        sample_rate: float = 0.0,
+        routes: Iterable[str] = (),
+        interval_ms: Optional[float] = None
+    ) -> None:
+        """Activa/desactiva el muestreo y define qué peticiones se perfilan"""
+        self.sample_rate = min(max(sample_rate, 0.0), 1.0)
+        self.routes = tuple(r for r in routes if r)
+        if interval_ms:
+            self.interval_ms = max(interval_ms, 1.0)
+        self.enabled = enabled
+        if enabled:
+            self._ensure_thread()
+
+    def should_sample(self, path: str) -> bool:
+        """Decide si una petición se perfila (por ruta y/o fracción aleatoria)"""
+        if self.routes and path.startswith(self.routes):
+            return True
+        return random.random() < self.sample_rate
+
+    def begin(self) -> int:
+        """Marca el inicio de una petición perfilada en el hilo actual"""
+        thread_id = threading.get_ident()
+        with self._lock:
+            self._active[thread_id] = self._active.get(thread_id, 0) + 1
+            self.profiled_requests += 1
+        self._wakeup.set()
+        return thread_id
+
+    def end(self, thread_id: int) -> None:
+        """Marca el final de una petición perfilada"""
+        with self._lock:
+            remaining = self._active.get(thread_id, 0) - 1
+            if remaining > 0:
+                self._active[thread_id] = remaining
+            else:
+                self._active.pop(thread_id, None)
+                if not self._active:
+                    self._wakeup.clear()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stacks.clear()
+            self.samples = 0
+            self.profiled_requests = 0
+
+    def status(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "sample_rate": self.sample_rate,
+            "routes": list(self.routes),
+            "interval_ms": self.interval_ms,
+            "samples": self.samples,
+            "profiled_requests": self.profiled_requests,
+            "unique_stacks": len(self._stacks),
+        }
+
+    def collapsed(self) -> str:
+        """Pilas colapsadas "marco;marco;marco cuenta" (una por línea)"""
+        with self._lock:
+            items = self._stacks.most_common()
+        return "".join(f"{stack} {count}\n" for stack, count in items)
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait()
+            if self.enabled:
+                with self._lock:
+                    thread_ids = list(self._active)
+                frames = sys._current_frames()
+                for thread_id in thread_ids:
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        self._record(frame)
+            time.sleep(self.interval_ms / 1000)
+
+    def _record(self, frame) -> None:
+        parts = []
+        depth = 0
+        while frame is not None and depth < self.max_depth:
+            code = frame.f_code
+            parts.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{code.co_firstlineno})")
+            frame = frame.f_back
+            depth += 1
+        stack = ";".join(reversed(parts))
+        with self._lock:
+            if stack not in self._stacks and len(self._stacks) >= self.max_stacks:
+                stack = "[truncado]"
+            self._stacks[stack] += 1
+            self.samples += 1
+
+
+# Instancia global
+profiler = SamplingProfiler()
+
+
+class ProfilingMiddleware:
+    """Middleware ASGI que activa el muestreo para las peticiones seleccionadas"""
+
+    def __init__(self, app: ASGIApp, sampler: SamplingProfiler = profiler):
+        self.app = app
+        self.sampler = sampler
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if not self.sampler.enabled or scope["type"] != "http" or not self.sampler.should_sample(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+        thread_id = self.sampler.begin()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.sampler.end(thread_id)
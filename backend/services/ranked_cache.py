@@ -0,0 +1,140 @@
+"""
+Caché de entradas de ranked compartida entre workers: un nivel en memoria
+acotado (entradas y bytes, con expiración activa) delante de Redis. Se usa
+como último valor bueno conocido cuando Riot falla.
+"""
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import orjson
+
+from backend.services.cache import cache
+from backend.services.metrics import CACHE_BYTES, CACHE_ENTRIES, observe_cache
+
+
+class RankedCache:
+    """
+    Últimas entradas de liga por (puuid, región), válidas `ttl_seconds`.
+    El nivel local se acota por número de entradas y bytes (LRU) y purga
+    las expiradas periódicamente; Redis las comparte entre procesos.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: int = 600,
+        max_entries: int = 50000,
+        max_bytes: int = 16 * 1024 * 1024,
+        sweep_every: int = 256
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sweep_every = sweep_every
+        self.total_bytes = 0
+        self._writes = 0
+        # clave -> (expira_en, tamaño, entradas)
+        self._entries: "OrderedDict[str, Tuple[float, int, List[dict]]]" = OrderedDict()
+
+    @staticmethod
+    def _key(puuid: str, region: str) -> str:
+        return f"ranked:{region}:{puuid}"
+
+    async def get(self, puuid: str, region: str) -> Optional[List[dict]]:
+        """Entradas guardadas hace menos de `ttl_seconds`, de este u otro proceso"""
+        key = self._key(puuid, region)
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > time.time():
+                self._entries.move_to_end(key)
+                observe_cache("ranked", "get", "hit")
+                return entry[2]
+            self._remove(key)
+            observe_cache("ranked", "get", "expired")
+        shared = await cache.get(key)
+        if shared is not None and shared.get("expires_at", 0) > time.time():
+            self._store(key, shared["data"], shared["expires_at"])
+            observe_cache("ranked", "get", "hit")
+            return shared["data"]
+        observe_cache("ranked", "get", "miss")
+        return None
+
+    async def get_many(self, puuids: Iterable[str], region: str) -> Dict[str, List[dict]]:
+        """
+        Entradas vigentes de varios jugadores, por puuid: las del nivel local
+        y el resto en un solo MGET. Las leídas de Redis no se copian al nivel
+        local (es una lectura por lotes, no tráfico interactivo).
+        """
+        now = time.time()
+        found: Dict[str, List[dict]] = {}
+        missing: List[str] = []
+        for puuid in dict.fromkeys(puuids):
+            entry = self._entries.get(self._key(puuid, region))
+            if entry is not None and entry[0] > now:
+                found[puuid] = entry[2]
+            else:
+                missing.append(puuid)
+        if missing:
+            shared = await cache.get_many([self._key(puuid, region) for puuid in missing])
+            for puuid in missing:
+                value = shared.get(self._key(puuid, region))
+                if value is not None and value.get("expires_at", 0) > now:
+                    found[puuid] = value["data"]
+        return found
+
+    def peek(self, puuid: str, region: str) -> Optional[List[dict]]:
+        """Entradas vigentes del nivel local, sin consultar Redis ni contar en métricas"""
+        entry = self._entries.get(self._key(puuid, region))
+        if entry is not None and entry[0] > time.time():
+            return entry[2]
+        return None
+
+    async def set(self, puuid: str, region: str, data: List[dict]) -> None:
+        key = self._key(puuid, region)
+        expires_at = time.time() + self.ttl_seconds
+        self._store(key, data, expires_at)
+        await cache.set(key, {"data": data, "expires_at": expires_at}, self.ttl_seconds)
+
+    def purge_expired(self) -> int:
+        """Elimina las entradas locales expiradas; devuelve cuántas"""
+        now = time.time()
+        expired = [key for key, (expires_at, _, _) in self._entries.items() if expires_at <= now]
+        for key in expired:
+            self._remove(key)
+        self._report()
+        return len(expired)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.total_bytes = 0
+        self._report()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _store(self, key: str, data: List[dict], expires_at: float) -> None:
+        size = len(orjson.dumps(data)) + len(key)
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (expires_at, size, data)
+        self.total_bytes += size
+        self._writes += 1
+        if self._writes % self.sweep_every == 0:
+            self.purge_expired()
+        while self._entries and (len(self._entries) > self.max_entries or self.total_bytes > self.max_bytes):
+            self._remove(next(iter(self._entries)))
+            observe_cache("ranked", "evict", "lru")
+        self._report()
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.total_bytes -= entry[1]
+
+    def _report(self) -> None:
+        CACHE_ENTRIES.labels("ranked").set(len(self._entries))
+        CACHE_BYTES.labels("ranked").set(self.total_bytes)
+
+
+# Instancia global
+ranked_cache = RankedCache()
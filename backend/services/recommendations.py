@@ -4,6 +4,13 @@ Servicio de recomendaciones basado en historial de partidas
 from typing import Optional
 from collections import Counter, defaultdict
 
+from backend.services.ddragon import ddragon
+from backend.services.matchups import matchup_store
+from backend.services.tracing import traced
+
+# Partidas mínimas del enfrentamiento para dar su winrate como consejo
+MIN_MATCHUP_GAMES = 20
+
 
 class RecommendationService:
     """Servicio para generar recomendaciones basadas en el historial"""
@@ -11,6 +18,7 @@ class RecommendationService:
     def __init__(self):
         pass
     
+    @traced("analyze_matches")
     def analyze_matches(self, matches: list, puuid: str) -> dict:
         """
         Analiza una lista de partidas para extraer estadísticas
@@ -178,9 +186,15 @@ class RecommendationService:
         
         return stats
     
-    def generate_recommendations(self, stats: dict, current_game_info: Optional[dict] = None) -> dict:
+    def generate_recommendations(
+        self,
+        stats: dict,
+        current_game_info: Optional[dict] = None,
+        puuid: Optional[str] = None
+    ) -> dict:
         """
-        Genera recomendaciones basadas en las estadísticas analizadas
+        Genera recomendaciones basadas en las estadísticas analizadas. Con
+        `puuid` los tips de partida en curso se calculan desde su equipo.
         """
         recommendations = {
             "champion_pool": [],
@@ -275,31 +289,75 @@ class RecommendationService:
         
         # Recomendaciones para partida en curso
         if current_game_info:
+            recommendations["matchups"] = self._lane_matchups(current_game_info, stats, puuid)
             recommendations["in_game_tips"] = self._generate_in_game_tips(
-                current_game_info, stats
+                current_game_info, stats, recommendations["matchups"], puuid
             )
         
         return recommendations
     
-    def _generate_in_game_tips(self, game_info: dict, player_stats: dict) -> list:
+    def _lane_matchups(self, game_info: dict, player_stats: dict, puuid: Optional[str] = None) -> list:
+        """
+        Enfrentamiento de cada línea de la partida en curso: los roles se
+        infieren de la matriz de matchups (la API en vivo no trae
+        teamPosition) y el del jugador se fija a su rol preferido.
+        """
+        participants = game_info.get("participants", [])
+        player = next((p for p in participants if puuid and p.get("puuid") == puuid), None)
+        team_id = player.get("teamId") if player else 100
+        allies = [p.get("championId", 0) for p in participants if p.get("teamId") == team_id]
+        enemies = [p.get("championId", 0) for p in participants if p.get("teamId") != team_id]
+        fixed = {}
+        if player and player_stats.get("preferred_role"):
+            fixed[player.get("championId", 0)] = player_stats["preferred_role"]
+        ally_roles = matchup_store.assign_roles(allies, fixed)
+        enemy_roles = {role: cid for cid, role in matchup_store.assign_roles(enemies).items()}
+        matchups = []
+        for champion_id, role in ally_roles.items():
+            opponent_id = enemy_roles.get(role)
+            if opponent_id is None:
+                continue
+            matchup = matchup_store.lookup(champion_id, opponent_id, role, patches=matchup_store.max_patches)
+            matchup["player"] = bool(player) and champion_id == player.get("championId")
+            matchups.append(matchup)
+        return matchups
+    
+    def _generate_in_game_tips(
+        self,
+        game_info: dict,
+        player_stats: dict,
+        matchups: Optional[list] = None,
+        puuid: Optional[str] = None
+    ) -> list:
         """Genera tips específicos para la partida actual"""
         tips = []
+        if matchups is None:
+            matchups = self._lane_matchups(game_info, player_stats, puuid)
         
-        participants = game_info.get("participants", [])
-        
-        # Analizar composición enemiga
-        enemy_team = []
-        player_team = []
-        player_champion = None
-        
-        for p in participants:
-            if p.get("teamId") == 100:  # Simplificado
-                player_team.append(p)
-            else:
-                enemy_team.append(p)
+        tips.append("Tips para esta partida:")
+        for matchup in sorted(matchups, key=lambda m: not m["player"]):
+            if matchup["games"] < MIN_MATCHUP_GAMES:
+                continue
+            own = ddragon.champion_name(matchup["championId"])
+            rival = ddragon.champion_name(matchup["opponentId"])
+            winrate = matchup["winrate"]
+            if matchup["player"]:
+                tips.append(
+                    f"- Tu linea ({own} vs {rival}): {winrate}% de victorias en {matchup['games']} partidas"
+                )
+                if winrate < 48:
+                    tips.append("- Matchup dificil: juega seguro, farmea y pide ayuda a tu jungla")
+                    counters = matchup_store.top(matchup["opponentId"], matchup["role"], k=3, worst=True)
+                    if counters:
+                        names = ", ".join(ddragon.champion_name(c["opponentId"]) for c in counters)
+                        tips.append(f"- Campeones que mejor contrarrestan a {rival}: {names}")
+                elif winrate > 52:
+                    tips.append("- Matchup favorable: busca presion temprana y prioridad de linea")
+            elif winrate < 46 or winrate > 54:
+                side = "ventaja" if winrate > 50 else "desventaja"
+                tips.append(f"- {matchup['role']}: {own} tiene {side} contra {rival} ({winrate}%)")
         
         # Tips generales basados en composición
-        tips.append("Tips para esta partida:")
         tips.append("- Comunica con tu equipo los objetivos prioritarios")
         tips.append("- Adapta tu build segun la composicion enemiga")
         
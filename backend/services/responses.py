@@ -0,0 +1,328 @@
+"""
+Respuestas HTTP optimizadas: serialización con orjson, compresión
+negociada (brotli/gzip) y caché en memoria de bytes ya codificados
+"""
+import gzip
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import orjson
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional: sin él solo se negocia gzip
+    brotli = None
+
+from backend.services.cache import CacheTTL
+from backend.services.metrics import observe_cache
+from backend.services.tracing import span
+
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+# Tipos de contenido que vale la pena comprimir
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript")
+
+# Niveles de compresión: las respuestas cacheadas se comprimen una sola vez,
+# por lo que pueden usar un nivel más alto que la compresión al vuelo
+DYNAMIC_LEVELS = {"br": 4, "gzip": 5}
+CACHED_LEVELS = {"br": 9, "gzip": 9}
+
+
+def encode_json(content: Any) -> bytes:
+    """Serializa a JSON (bytes) con orjson"""
+    with span("json.encode", "encode"):
+        return orjson.dumps(content, option=ORJSON_OPTIONS)
+
+
+class ORJSONResponse(JSONResponse):
+    """JSONResponse que serializa con orjson en lugar de json estándar"""
+
+    def render(self, content: Any) -> bytes:
+        return encode_json(content)
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Elige la codificación de contenido según Accept-Encoding.
+    Prioriza brotli (si está instalado) sobre gzip; respeta q=0.
+    """
+    if not accept_encoding:
+        return None
+    accepted: Dict[str, float] = {}
+    for token in accept_encoding.split(","):
+        name, _, params = token.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    wildcard = accepted.get("*", 0.0)
+    if brotli is not None and accepted.get("br", wildcard) > 0:
+        return "br"
+    if accepted.get("gzip", wildcard) > 0:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str, levels: Dict[str, int] = DYNAMIC_LEVELS) -> bytes:
+    """Comprime el cuerpo con la codificación indicada"""
+    with span(f"compress.{encoding}", "encode"):
+        if encoding == "br":
+            return brotli.compress(body, quality=levels["br"])
+        return gzip.compress(body, compresslevel=levels["gzip"], mtime=0)
+
+
+def compute_etag(body: bytes, encoding: Optional[str] = None) -> str:
+    """
+    ETag fuerte derivado del hash del cuerpo sin comprimir. Cada codificación
+    es una representación distinta y lleva su propio sufijo ("<hash>-br").
+    """
+    digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+    return f'"{digest}-{encoding}"' if encoding else f'"{digest}"'
+
+
+def _etag_base(tag: str) -> str:
+    """Etiqueta sin W/ ni sufijo de codificación, para comparar representaciones"""
+    tag = tag.strip().removeprefix("W/")
+    for encoding in ("br", "gzip"):
+        if tag.endswith(f'-{encoding}"'):
+            return tag[:-len(encoding) - 2] + '"'
+    return tag
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """
+    Comparación débil de If-None-Match (RFC 9110 §13.1.2). Acepta la etiqueta
+    de cualquier codificación del mismo cuerpo, fuerte o débil (los proxies
+    que recomprimen suelen debilitarla).
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    base = _etag_base(etag)
+    return any(_etag_base(tag) == base for tag in if_none_match.split(","))
+
+
+def cache_control_for(ttl_seconds: int, remaining_seconds: int) -> str:
+    """
+    Cabecera Cache-Control según la clase de TTL:
+    - inmutables (partidas terminadas, timelines): max-age largo + immutable
+    - datos en vivo: siempre revalidar con ETag
+    - resto: el navegador reutiliza hasta que expire la entrada del servidor
+    """
+    if ttl_seconds >= CacheTTL.MATCH_DETAIL:
+        return f"public, max-age={ttl_seconds}, immutable"
+    if ttl_seconds <= CacheTTL.LIVE_GAME:
+        return "no-cache"
+    return f"public, max-age={max(remaining_seconds, 0)}, must-revalidate"
+
+
+class EncodedPayload:
+    """Cuerpo JSON ya serializado con su ETag y variantes comprimidas memorizadas"""
+
+    __slots__ = ("body", "etag", "ttl_seconds", "expires_at", "on_grow", "_variants")
+
+    def __init__(self, body: bytes, ttl_seconds: int):
+        self.body = body
+        self.etag = compute_etag(body)
+        self.ttl_seconds = ttl_seconds
+        self.expires_at = time.monotonic() + ttl_seconds
+        # Aviso a la caché que la contiene cuando se añade una variante (bytes nuevos)
+        self.on_grow: Optional[Callable[[int], None]] = None
+        self._variants: Dict[str, bytes] = {}
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + sum(len(v) for v in self._variants.values())
+
+    def etag_for(self, encoding: Optional[str]) -> str:
+        """ETag de la representación con `encoding` (None: sin comprimir)"""
+        return self.etag[:-1] + f'-{encoding}"' if encoding else self.etag
+
+    def variant(self, encoding: str) -> bytes:
+        """Obtiene (y memoriza) la variante comprimida del cuerpo"""
+        data = self._variants.get(encoding)
+        if data is None:
+            data = compress(self.body, encoding, CACHED_LEVELS)
+            self._variants[encoding] = data
+            if self.on_grow is not None:
+                self.on_grow(len(data))
+        return data
+
+    def to_response(self, request: Request, minimum_size: int = 1024) -> Response:
+        """
+        Construye la respuesta usando la mejor codificación aceptada.
+        Si el cliente ya tiene la versión vigente (If-None-Match) responde 304.
+        """
+        remaining = int(self.expires_at - time.monotonic())
+        encoding = negotiate_encoding(request.headers.get("accept-encoding", ""))
+        if len(self.body) < minimum_size:
+            encoding = None
+        headers = {
+            "Vary": "Accept-Encoding",
+            "ETag": self.etag_for(encoding),
+            "Cache-Control": cache_control_for(self.ttl_seconds, remaining)
+        }
+        if etag_matches(request.headers.get("if-none-match", ""), self.etag):
+            return Response(status_code=304, headers=headers)
+        body = self.body
+        if encoding:
+            body = self.variant(encoding)
+            headers["Content-Encoding"] = encoding
+        return Response(content=body, media_type="application/json", headers=headers)
+
+
+class ResponseCache:
+    """
+    Caché LRU en memoria de respuestas codificadas, acotada por entradas y
+    bytes. `total_bytes` se lleva al día al insertar, al añadir variantes
+    comprimidas y al desalojar.
+    """
+
+    def __init__(self, max_entries: int = 512, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries: "OrderedDict[str, EncodedPayload]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[EncodedPayload]:
+        """Obtiene una entrada vigente y la marca como usada recientemente"""
+        payload = self._entries.get(key)
+        if payload is None:
+            return None
+        if payload.expired:
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return payload
+
+    def put(self, key: str, payload: EncodedPayload) -> None:
+        """Guarda una entrada y desaloja las menos usadas si se superan los límites"""
+        self._remove(key)
+        self._entries[key] = payload
+        self.total_bytes += payload.size
+        payload.on_grow = self._grow
+        self._evict()
+
+    def clear(self) -> None:
+        for payload in self._entries.values():
+            payload.on_grow = None
+        self._entries.clear()
+        self.total_bytes = 0
+
+    def _grow(self, size: int) -> None:
+        self.total_bytes += size
+        self._evict()
+
+    def _remove(self, key: str) -> None:
+        payload = self._entries.pop(key, None)
+        if payload is not None:
+            payload.on_grow = None
+            self.total_bytes -= payload.size
+
+    def _evict(self) -> None:
+        while len(self._entries) > self.max_entries or (len(self._entries) > 1 and self.total_bytes > self.max_bytes):
+            self._remove(next(iter(self._entries)))
+
+
+# Instancia global
+response_cache = ResponseCache()
+
+
+def request_cache_key(request: Request) -> str:
+    """Clave de caché a partir de la ruta y los parámetros de consulta ordenados"""
+    query = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+    return f"{request.url.path}?{query}"
+
+
+async def cached_json_response(
+    request: Request,
+    ttl_seconds: int,
+    producer: Callable[[], Awaitable[Any]],
+    key: Optional[str] = None
+) -> Response:
+    """
+    Sirve una respuesta JSON desde la caché de bytes codificados.
+    En caso de fallo ejecuta `producer`, serializa una única vez y guarda
+    el resultado; las variantes comprimidas se generan bajo demanda.
+    Incluye ETag y Cache-Control, y responde 304 a peticiones condicionales.
+    Las excepciones de `producer` (p. ej. HTTPException) no se cachean.
+    """
+    cache_key = key or request_cache_key(request)
+    payload = response_cache.get(cache_key)
+    observe_cache("response", "get", "miss" if payload is None else "hit")
+    if payload is None:
+        data = await producer()
+        payload = EncodedPayload(encode_json(data), ttl_seconds)
+        response_cache.put(cache_key, payload)
+    return payload.to_response(request)
+
+
+class CompressionMiddleware:
+    """
+    Middleware ASGI que comprime respuestas completas (no streaming)
+    con brotli o gzip según Accept-Encoding. Respeta las respuestas que
+    ya traen Content-Encoding (p. ej. las servidas desde la caché).
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Optional[Message] = None
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if start_message is None or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            initial, start_message = start_message, None
+            headers = MutableHeaders(raw=initial["headers"])
+            body = message.get("body", b"")
+            content_type = headers.get("content-type", "")
+            if (
+                message.get("more_body", False)
+                or "content-encoding" in headers
+                or len(body) < self.minimum_size
+                or not content_type.startswith(COMPRESSIBLE_TYPES)
+            ):
+                await send(initial)
+                await send(message)
+                return
+
+            compressed = compress(body, encoding)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(compressed))
+            headers.add_vary_header("Accept-Encoding")
+            await send(initial)
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,208 @@
+"""
+Grabación y reproducción del tráfico con la API de Riot: transportes httpx
+intercambiables para RiotAPIClient que guardan cada petición (URL,
+parámetros, estado, cabeceras, cuerpo y tiempos) en un archivo JSONL
+comprimido con gzip, y la reproducen después sin red a velocidad original
+o acelerada.
+"""
+import asyncio
+import base64
+import gzip
+import json
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Deque, Dict, Iterator, List, Optional, Tuple
+
+import httpx
+
+
+ARCHIVE_VERSION = 1
+# Cabeceras de respuesta que no aportan nada al reproducir
+_SKIPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection", "set-cookie"}
+
+
+def request_key(method: str, url: httpx.URL) -> str:
+    """Clave de emparejamiento: método, host, ruta y query ordenada"""
+    query = "&".join(sorted(f"{k}={v}" for k, v in url.params.multi_items()))
+    return f"{method} {url.host}{url.path}?{query}"
+
+
+class ArchiveWriter:
+    """Escribe registros JSONL en un archivo gzip (seguro entre hilos)"""
+
+    def __init__(self, path: str, compresslevel: int = 6):
+        self.path = path
+        self._handle = gzip.open(path, "wt", encoding="utf-8", compresslevel=compresslevel)
+        self._lock = threading.Lock()
+        self._started = time.time()
+        self._origin = time.perf_counter()
+        self.records = 0
+        self._write({"archive_version": ARCHIVE_VERSION, "started_at": self._started})
+
+    def _write(self, record: dict) -> None:
+        with self._lock:
+            if self._handle is None:
+                return
+            self._handle.write(json.dumps(record, separators=(",", ":"), ensure_ascii=False) + "\n")
+
+    def offset(self) -> float:
+        """Segundos desde el inicio de la grabación"""
+        return time.perf_counter() - self._origin
+
+    def add(
+        self,
+        request: httpx.Request,
+        response: httpx.Response,
+        body: bytes,
+        offset: float,
+        duration: float
+    ) -> None:
+        record = {
+            "t": round(offset, 6),
+            "d": round(duration, 6),
+            "key": request_key(request.method, request.url),
+            "url": str(request.url),
+            "status": response.status_code,
+            "headers": {
+                k: v for k, v in response.headers.items() if k.lower() not in _SKIPPED_HEADERS
+            },
+        }
+        try:
+            record["body"] = body.decode("utf-8")
+        except UnicodeDecodeError:
+            record["body_b64"] = base64.b64encode(body).decode("ascii")
+        self._write(record)
+        self.records += 1
+
+    def close(self) -> None:
+        with self._lock:
+            if self._handle is not None:
+                self._handle.close()
+                self._handle = None
+
+
+def read_archive(path: str) -> Iterator[dict]:
+    """Itera los registros de petición de un archivo (omite la cabecera)"""
+    with gzip.open(path, "rt", encoding="utf-8") as handle:
+        for line in handle:
+            record = json.loads(line)
+            if "key" in record:
+                yield record
+
+
+def _record_body(record: dict) -> bytes:
+    if "body_b64" in record:
+        return base64.b64decode(record["body_b64"])
+    return record.get("body", "").encode("utf-8")
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    """Reenvía las peticiones al transporte real y graba cada intercambio"""
+
+    def __init__(self, path: str, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.writer = ArchiveWriter(path)
+        self.transport = transport or httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        offset = self.writer.offset()
+        start = time.perf_counter()
+        response = await self.transport.handle_async_request(request)
+        body = await response.aread()
+        duration = time.perf_counter() - start
+        self.writer.add(request, response, body, offset, duration)
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=[(k, v) for k, v in response.headers.items() if k.lower() not in _SKIPPED_HEADERS],
+            content=body,
+            request=request,
+        )
+
+    async def aclose(self) -> None:
+        self.writer.close()
+        await self.transport.aclose()
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """
+    Responde desde un archivo grabado, sin red. Las peticiones repetidas
+    devuelven los registros en el orden grabado (el último se reutiliza).
+    `speed` escala la latencia grabada: 1.0 = original, 10 = diez veces más
+    rápido, 0 = sin esperas. Con `strict=True` una petición no grabada lanza
+    error; si no, responde 404.
+    """
+
+    def __init__(self, path: str, speed: float = 1.0, strict: bool = False):
+        self.speed = speed
+        self.strict = strict
+        self.misses = 0
+        self.hits = 0
+        self._records: Dict[str, Deque[dict]] = defaultdict(deque)
+        for record in read_archive(path):
+            self._records[record["key"]].append(record)
+
+    def _next(self, key: str) -> Optional[dict]:
+        queue = self._records.get(key)
+        if not queue:
+            return None
+        return queue.popleft() if len(queue) > 1 else queue[0]
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        key = request_key(request.method, request.url)
+        record = self._next(key)
+        if record is None:
+            self.misses += 1
+            if self.strict:
+                raise httpx.ConnectError(f"Petición no grabada: {key}", request=request)
+            return httpx.Response(404, json={"status": {"message": "No grabado", "status_code": 404}}, request=request)
+        self.hits += 1
+        if self.speed > 0 and record.get("d"):
+            await asyncio.sleep(record["d"] / self.speed)
+        return httpx.Response(
+            status_code=record["status"],
+            headers=record.get("headers", {}),
+            content=_record_body(record),
+            request=request,
+        )
+
+
+def traffic_schedule(path: str, speed: float = 1.0) -> List[Tuple[float, str]]:
+    """(segundo de inicio escalado, URL) de cada petición grabada, por orden"""
+    records = sorted(read_archive(path), key=lambda r: r["t"])
+    factor = 1 / speed if speed > 0 else 0.0
+    return [(record["t"] * factor, record["url"]) for record in records]
+
+
+async def replay_traffic(client: httpx.AsyncClient, path: str, speed: float = 1.0) -> List[float]:
+    """
+    Reemite la mezcla de peticiones grabada con su cadencia original
+    (escalada por `speed`) a través de `client` y devuelve las latencias (s).
+    Sirve para comparar cambios de caché o concurrencia con tráfico idéntico.
+    """
+    latencies: List[float] = []
+    origin = time.perf_counter()
+
+    async def one(at: float, url: str) -> None:
+        delay = at - (time.perf_counter() - origin)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        start = time.perf_counter()
+        await client.get(url)
+        latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(one(at, url) for at, url in traffic_schedule(path, speed)))
+    return latencies
+
+
+def build_transport(
+    mode: str,
+    path: str,
+    speed: float = 1.0,
+    transport: Optional[httpx.AsyncBaseTransport] = None
+) -> Optional[httpx.AsyncBaseTransport]:
+    """Transporte para RiotAPIClient según el modo ("record", "replay" o vacío)"""
+    if mode == "record":
+        return RecordingTransport(path, transport)
+    if mode == "replay":
+        return ReplayTransport(path, speed)
+    return transport
@@ -0,0 +1,280 @@
+"""
+Rollups diarios por jugador: las partidas ingeridas se suman en buckets
+(día UTC, queueId, championId) con los mismos totales que
+`summarize_champion_stats`. Las estadísticas de los últimos N días, de una
+cola o de la temporada se responden sumando unos pocos buckets, sin volver
+a descargar ni recorrer partidas. El plegado de las partidas nuevas pasa
+por `aggregation_pool`, de modo que un backfill grande no bloquea el event
+loop.
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from backend.riot_client import riot_client
+from backend.services.aggregation import (
+    COUNTER_FIELDS,
+    DAY_SECONDS,
+    aggregation_pool,
+    finalize_champion_stats,
+    merge_champion_totals,
+    new_champion_totals,
+    summarize_daily_buckets,
+)
+from backend.services.cache import cache, CacheTTL
+from backend.services.metrics import observe_cache
+
+FetchDetails = Callable[[List[str], str], Awaitable[List[dict]]]
+
+
+def parse_bucket_key(key: str) -> Tuple[int, int, int]:
+    day, queue_id, champion_id = key.split(":")
+    return int(day), int(queue_id), int(champion_id)
+
+
+class PlayerRollup:
+    """
+    Buckets de un jugador y las partidas ya sumadas (matchId -> gameCreation
+    en ms y cola). `covered_since` es el instante (s) desde el que están
+    todas sus partidas; con `truncated` el backfill se cortó en `match_limit`
+    y las más antiguas de la ventana no se sumaron.
+    """
+
+    __slots__ = ("buckets", "matches", "covered_since", "synced_at", "truncated")
+
+    def __init__(
+        self,
+        buckets: Optional[Dict[str, dict]] = None,
+        matches: Optional[Dict[str, list]] = None,
+        covered_since: Optional[int] = None,
+        synced_at: float = 0.0,
+        truncated: bool = False
+    ):
+        self.buckets: Dict[str, dict] = buckets or {}
+        self.matches: Dict[str, list] = matches or {}
+        self.covered_since = covered_since
+        self.synced_at = synced_at
+        self.truncated = truncated
+
+    @property
+    def newest(self) -> int:
+        """gameCreation (ms) de la partida más reciente sumada"""
+        return max((entry[0] for entry in self.matches.values()), default=0)
+
+    def fresh(self, matches: Iterable[dict]) -> List[dict]:
+        """Partidas aún no ingeridas"""
+        return [m for m in matches if m.get("metadata", {}).get("matchId") not in self.matches]
+
+    def ingest(self, matches: Iterable[dict], puuid: str) -> int:
+        """Suma las partidas aún no ingeridas (en línea); devuelve cuántas"""
+        return self.merge(summarize_daily_buckets(self.fresh(matches), puuid))
+
+    def merge(self, folded: dict) -> int:
+        """Suma el resultado de `summarize_daily_buckets`; devuelve cuántas partidas"""
+        added = {m: entry for m, entry in folded.get("matches", {}).items() if m not in self.matches}
+        if len(added) != len(folded.get("matches", {})):
+            # Alguna partida ya estaba sumada: los buckets no se pueden separar
+            raise ValueError("Partidas ya ingeridas en el rollup")
+        for key, totals in folded.get("buckets", {}).items():
+            stats = new_champion_totals()
+            stored = self.buckets.get(key)
+            if stored:
+                merge_champion_totals(stats, stored)
+            merge_champion_totals(stats, totals)
+            self.buckets[key] = {
+                field: dict(value) if field in COUNTER_FIELDS else value
+                for field, value in stats.items()
+            }
+        self.matches.update(added)
+        return len(added)
+
+    def select(self, since_ts: int, queues: Optional[Iterable[int]] = None) -> List[str]:
+        """Claves de los buckets desde el día de `since_ts`, opcionalmente de ciertas colas"""
+        since_day = since_ts // DAY_SECONDS
+        queue_set = set(queues) if queues else None
+        selected = []
+        for key in self.buckets:
+            day, queue_id, _ = parse_bucket_key(key)
+            if day >= since_day and (queue_set is None or queue_id in queue_set):
+                selected.append(key)
+        return selected
+
+    def champion_stats(self, since_ts: int, queues: Optional[Iterable[int]] = None) -> List[dict]:
+        """Estadísticas por campeón sumando los buckets seleccionados"""
+        champ_stats: Dict[int, dict] = {}
+        for key in self.select(since_ts, queues):
+            champion_id = parse_bucket_key(key)[2]
+            stats = champ_stats.get(champion_id)
+            if stats is None:
+                stats = champ_stats[champion_id] = new_champion_totals()
+            merge_champion_totals(stats, self.buckets[key])
+        return finalize_champion_stats(champ_stats)
+
+    def match_ids(self, since_ts: int, queues: Optional[Iterable[int]] = None) -> List[str]:
+        """Partidas ingeridas desde el día de `since_ts`, más recientes primero"""
+        since_ms = since_ts // DAY_SECONDS * DAY_SECONDS * 1000
+        queue_set = set(queues) if queues else None
+        rows = [
+            (entry[0], match_id) for match_id, entry in self.matches.items()
+            if entry[0] >= since_ms and (queue_set is None or entry[1] in queue_set)
+        ]
+        rows.sort(reverse=True)
+        return [match_id for _, match_id in rows]
+
+    def to_dict(self) -> dict:
+        return {
+            "buckets": self.buckets,
+            "matches": self.matches,
+            "covered_since": self.covered_since,
+            "synced_at": self.synced_at,
+            "truncated": self.truncated,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "PlayerRollup":
+        return cls(
+            data.get("buckets"),
+            data.get("matches"),
+            data.get("covered_since"),
+            data.get("synced_at", 0.0),
+            data.get("truncated", False)
+        )
+
+
+class RollupStore:
+    """
+    Rollups por PUUID en memoria (LRU) y en Redis (`rollup:{puuid}`).
+    `ensure` mantiene la cobertura: la primera consulta de una ventana
+    ingiere sus partidas; después solo se piden a Riot las posteriores a la
+    más reciente, como mucho cada `sync_ttl` segundos.
+    """
+
+    def __init__(self, sync_ttl: int = 120, max_players: int = 5000, local_ttl: int = 30, batch_size: int = 100):
+        self.sync_ttl = sync_ttl
+        self.max_players = max_players
+        self.local_ttl = local_ttl
+        self.batch_size = batch_size
+        # clave -> (expira_en, rollup)
+        self._local: "OrderedDict[str, Tuple[float, PlayerRollup]]" = OrderedDict()
+        self._syncing: Dict[str, asyncio.Task] = {}
+
+    @staticmethod
+    def _key(puuid: str) -> str:
+        return f"rollup:{puuid}"
+
+    async def ensure(
+        self,
+        puuid: str,
+        routing: str,
+        since_ts: int,
+        fetch_details: FetchDetails,
+        match_limit: int = 500
+    ) -> PlayerRollup:
+        """Rollup del jugador con todas sus partidas desde `since_ts` (hasta `match_limit` nuevas)"""
+        key = self._key(puuid)
+        task = self._syncing.get(key)
+        if task is None:
+            task = asyncio.get_running_loop().create_task(
+                self._sync(puuid, routing, since_ts, fetch_details, match_limit)
+            )
+            self._syncing[key] = task
+            task.add_done_callback(lambda _: self._syncing.pop(key, None))
+            return await asyncio.shield(task)
+        # Otra petición ya sincroniza este jugador: se espera y se completa si hace falta
+        await asyncio.shield(task)
+        return await self.ensure(puuid, routing, since_ts, fetch_details, match_limit)
+
+    async def _sync(
+        self,
+        puuid: str,
+        routing: str,
+        since_ts: int,
+        fetch_details: FetchDetails,
+        match_limit: int
+    ) -> PlayerRollup:
+        rollup = await self._load(puuid)
+        now = time.time()
+        backfill = rollup.covered_since is None or since_ts < rollup.covered_since
+        if not backfill and now - rollup.synced_at <= self.sync_ttl:
+            observe_cache("rollup", "sync", "hit")
+            return rollup
+        observe_cache("rollup", "sync", "backfill" if backfill else "head")
+        start_time = since_ts if backfill else max(since_ts, rollup.newest // 1000)
+        ids, exhausted, limited = await self._list_ids(puuid, routing, start_time, match_limit)
+        if ids is None:
+            return rollup
+        missing = [match_id for match_id in ids if match_id not in rollup.matches]
+        if missing:
+            fresh = rollup.fresh(await fetch_details(missing, routing))
+            # Con `threshold` partidas o más el plegado se hace en el pool de procesos
+            rollup.merge(await aggregation_pool.run("daily_buckets", fresh, puuid))
+        if backfill:
+            if exhausted or limited:
+                # Con el límite alcanzado la ventana se da por cubierta: volver a
+                # listarla en cada consulta no añadiría partidas
+                covered = since_ts
+                rollup.truncated = limited
+            else:
+                # Listado interrumpido por un error: solo hasta la más antigua obtenida
+                oldest = min((rollup.matches[m][0] for m in ids if m in rollup.matches), default=None)
+                covered = max(since_ts, oldest // 1000) if oldest else None
+            if covered is not None:
+                rollup.covered_since = covered if rollup.covered_since is None else min(rollup.covered_since, covered)
+        rollup.synced_at = now
+        await self._save(puuid, rollup)
+        return rollup
+
+    async def _list_ids(
+        self,
+        puuid: str,
+        routing: str,
+        start_time: int,
+        match_limit: int
+    ) -> Tuple[Optional[List[str]], bool, bool]:
+        """
+        IDs desde `start_time` (hasta `match_limit`), si se llegó al final de
+        la ventana y si el listado se cortó en `match_limit`
+        """
+        match_ids: List[str] = []
+        while len(match_ids) < match_limit:
+            count = min(self.batch_size, match_limit - len(match_ids))
+            result = await riot_client.get_match_ids_by_puuid(
+                puuid, routing, len(match_ids), count, start_time=start_time
+            )
+            if not result.get("success"):
+                return (match_ids or None), False, False
+            ids = result.get("data", [])
+            match_ids.extend(ids)
+            if len(ids) < count:
+                return match_ids, True, False
+        return match_ids, False, True
+
+    async def _load(self, puuid: str) -> PlayerRollup:
+        key = self._key(puuid)
+        entry = self._local.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self._local.move_to_end(key)
+            return entry[1]
+        shared = await cache.get(key)
+        rollup = PlayerRollup.from_dict(shared) if shared else (entry[1] if entry else PlayerRollup())
+        self._store_local(key, rollup)
+        return rollup
+
+    async def _save(self, puuid: str, rollup: PlayerRollup) -> None:
+        key = self._key(puuid)
+        self._store_local(key, rollup)
+        await cache.set(key, rollup.to_dict(), CacheTTL.ROLLUP)
+
+    def clear(self) -> None:
+        self._local.clear()
+
+    def _store_local(self, key: str, rollup: PlayerRollup) -> None:
+        self._local[key] = (time.monotonic() + self.local_ttl, rollup)
+        self._local.move_to_end(key)
+        while len(self._local) > self.max_players:
+            self._local.popitem(last=False)
+
+
+# Instancia global
+rollup_store = RollupStore()
@@ -0,0 +1,179 @@
+"""
+Scouting de partidas en vivo: una tarjeta por participante con su ranked y
+sus estadísticas recientes con el campeón que juega. Cada vista tiene un
+presupuesto de llamadas a Riot (los datos ya cacheados no gastan), los 10
+participantes se consultan en paralelo con concurrencia acotada y las
+tarjetas se emiten según terminan. La sesión se comparte entre todos los
+que miran la misma partida.
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import AsyncIterator, Awaitable, Callable, List, Optional, Tuple
+
+from backend.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class CallBudget:
+    """
+    Llamadas a Riot que puede gastar una vista, reintentos ante 429
+    incluidos. `share` es la parte de cada participante, para que los
+    primeros en terminar no agoten el presupuesto de los demás.
+    """
+
+    def __init__(self, limit: int, participants: int = 10):
+        self.limit = limit
+        self.share = max(1, limit // max(participants, 1))
+        self.spent = 0
+
+    @property
+    def remaining(self) -> int:
+        return max(0, self.limit - self.spent)
+
+    def take(self, wanted: int = 1) -> int:
+        """Concede hasta `wanted` llamadas; devuelve cuántas"""
+        granted = min(wanted, self.remaining)
+        self.spent += granted
+        return granted
+
+
+ScoutParticipant = Callable[[dict, CallBudget], Awaitable[dict]]
+
+
+def summarize_recent(matches: List[dict], puuid: str, champion_id: int) -> dict:
+    """Resultados recientes del jugador, en total y con `champion_id`"""
+    games = wins = champ_games = champ_wins = 0
+    kills = deaths = assists = 0
+    for match in matches:
+        player = next(
+            (p for p in match.get("info", {}).get("participants", []) if p.get("puuid") == puuid),
+            None
+        )
+        if player is None:
+            continue
+        games += 1
+        wins += 1 if player.get("win") else 0
+        if player.get("championId") == champion_id:
+            champ_games += 1
+            champ_wins += 1 if player.get("win") else 0
+            kills += player.get("kills", 0)
+            deaths += player.get("deaths", 0)
+            assists += player.get("assists", 0)
+    return {
+        "games": games,
+        "winrate": round(wins / games * 100, 1) if games else None,
+        "champion_games": champ_games,
+        "champion_winrate": round(champ_wins / champ_games * 100, 1) if champ_games else None,
+        "champion_kda": round((kills + assists) / max(deaths, 1), 2) if champ_games else None,
+    }
+
+
+class ScoutSession:
+    """Tarjetas de una partida; varios lectores pueden recorrerlas a la vez"""
+
+    def __init__(self, key: Tuple[str, int], participants: List[dict], budget: CallBudget):
+        self.key = key
+        self.participants = participants
+        self.budget = budget
+        self.cards: List[dict] = []
+        self.done = False
+        self.created = time.monotonic()
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Event()
+
+    def publish(self, card: dict) -> None:
+        self.cards.append(card)
+        self._notify()
+
+    def finish(self) -> None:
+        self.done = True
+        self._notify()
+
+    def _notify(self) -> None:
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def stream(self) -> AsyncIterator[dict]:
+        """Las tarjetas ya listas y después las nuevas, hasta completar la partida"""
+        sent = 0
+        while True:
+            while sent < len(self.cards):
+                yield self.cards[sent]
+                sent += 1
+            if self.done:
+                return
+            await self._changed.wait()
+
+
+class LiveScouting:
+    """
+    Sesiones de scouting por (región, gameId). La primera vista de una
+    partida lanza el reparto; las siguientes leen la misma sesión durante
+    `session_ttl` segundos sin gastar llamadas.
+    """
+
+    def __init__(self, call_budget: int = 60, concurrency: int = 5, session_ttl: float = 180.0, max_sessions: int = 500):
+        self.call_budget = call_budget
+        self.concurrency = concurrency
+        self.session_ttl = session_ttl
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[Tuple[str, int], ScoutSession]" = OrderedDict()
+
+    def session(self, region: str, game_data: dict, scout: ScoutParticipant) -> ScoutSession:
+        """Sesión de la partida; la crea y arranca el reparto si no existe"""
+        self._purge()
+        key = (region, game_data.get("gameId", 0))
+        session = self._sessions.get(key)
+        if session is not None:
+            return session
+        session = ScoutSession(key, game_data.get("participants", []), CallBudget(self.call_budget, len(game_data.get("participants", []))))
+        self._sessions[key] = session
+        while len(self._sessions) > self.max_sessions:
+            _, evicted = self._sessions.popitem(last=False)
+            if evicted.task is not None and not evicted.done:
+                evicted.task.cancel()
+        session.task = asyncio.create_task(self._run(session, scout))
+        return session
+
+    async def _run(self, session: ScoutSession, scout: ScoutParticipant) -> None:
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def scout_one(participant: dict) -> None:
+            async with semaphore:
+                try:
+                    card = await scout(participant, session.budget)
+                except Exception as exc:
+                    logger.warning("Scouting de %s fallido: %s", participant.get("puuid"), exc)
+                    card = {
+                        "puuid": participant.get("puuid"),
+                        "teamId": participant.get("teamId"),
+                        "championId": participant.get("championId"),
+                        "partial": True,
+                    }
+            session.publish(card)
+
+        try:
+            await asyncio.gather(*(scout_one(p) for p in session.participants))
+        finally:
+            session.finish()
+
+    def _purge(self) -> None:
+        now = time.monotonic()
+        for key in [k for k, s in self._sessions.items() if now - s.created > self.session_ttl]:
+            session = self._sessions.pop(key)
+            # Un reparto que sigue en curso ya no tiene lectores nuevos: se cancela
+            if session.task is not None and not session.done:
+                session.task.cancel()
+
+    def cancel(self) -> None:
+        for session in self._sessions.values():
+            if session.task is not None and not session.done:
+                session.task.cancel()
+        self._sessions.clear()
+
+
+# Instancia global
+live_scouting = LiveScouting(settings.scouting_call_budget)
@@ -0,0 +1,253 @@
+"""
+Tier list materializada por (región, parche, rol, bracket de rango). Las
+partidas descargadas se suman a contadores por parche (los de
+`patch_stats`, uno por región y bracket). Una tarea periódica asigna los
+brackets con los rangos compartidos en Redis, recalcula solo las tablas
+cuyos contadores cambiaron y guarda cada vista ya serializada con su ETag.
+Las peticiones leen la vista de memoria, sin ningún cálculo.
+"""
+import asyncio
+import logging
+import math
+import time
+from collections import Counter, deque
+from statistics import median_low
+from typing import Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+from backend.services.ddragon import ddragon
+from backend.services.patch_stats import (
+    ROLES, PatchPartition, PatchStatsStore, match_deltas, normalize_role, patch_of
+)
+from backend.services.ranked_cache import ranked_cache
+from backend.services.responses import EncodedPayload, encode_json
+
+logger = logging.getLogger(__name__)
+
+
+TIERS = ("IRON", "BRONZE", "SILVER", "GOLD", "PLATINUM", "EMERALD", "DIAMOND", "MASTER", "GRANDMASTER", "CHALLENGER")
+# Brackets acumulativos: una partida de Diamante cuenta en all, emerald_plus y diamond_plus
+BRACKETS = {"all": 0, "emerald_plus": TIERS.index("EMERALD"), "diamond_plus": TIERS.index("DIAMOND"),
+            "master_plus": TIERS.index("MASTER")}
+# Cortes por percentil de puntuación dentro de cada rol
+TIER_CUTS = (("S+", 0.05), ("S", 0.20), ("A", 0.50), ("B", 0.80), ("C", 1.0))
+# Partidas ficticias al 50% con las que se suaviza el winrate de muestras pequeñas
+PRIOR_GAMES = 100
+# Participantes con rango conocido necesarios para asignar bracket a una partida
+MIN_RANKED_PARTICIPANTS = 3
+# Pasadas de asignación que espera una partida a que se conozcan sus rangos
+MAX_BRACKET_ATTEMPTS = 3
+
+# (región, matchId, parche, contadores, puuids, intentos)
+UnassignedMatch = Tuple[str, str, str, Counter, List[str], int]
+
+
+def match_tier(puuids: Iterable[str], ranks: Dict[str, List[dict]]) -> Optional[int]:
+    """
+    Tier mediano (índice en TIERS) de los participantes con SoloQ conocida
+    en `ranks` (puuid -> entradas); None si se conocen menos de
+    MIN_RANKED_PARTICIPANTS.
+    """
+    tiers = []
+    for puuid in puuids:
+        solo = next((e for e in ranks.get(puuid, []) if e.get("queueType") == "RANKED_SOLO_5x5"), None)
+        if solo and solo.get("tier") in TIERS:
+            tiers.append(TIERS.index(solo["tier"]))
+    return median_low(tiers) if len(tiers) >= MIN_RANKED_PARTICIPANTS else None
+
+
+def tier_score(wins: int, games: int, pickrate: float, banrate: float) -> float:
+    """Winrate suavizado, con un peso menor para la popularidad (pick y ban)"""
+    smoothed = (wins + PRIOR_GAMES / 2) / (games + PRIOR_GAMES)
+    return round((smoothed - 0.5) * 400 + 2 * math.sqrt(pickrate) + 0.2 * banrate, 3)
+
+
+def build_rows(partition: PatchPartition, role: str, min_games: int) -> List[dict]:
+    """Filas de la tier list de un rol ("ALL" = todos), ordenadas por puntuación"""
+    rows = []
+    for (champion_id, row_role), counters in partition.rows.items():
+        games = counters["games"]
+        if games < min_games or (role != "ALL" and row_role != role):
+            continue
+        pickrate = games / partition.games * 100 if partition.games else 0.0
+        banrate = partition.bans[champion_id] / partition.games * 100 if partition.games else 0.0
+        rows.append({
+            "championId": champion_id,
+            "role": row_role,
+            "games": games,
+            "winRate": round(counters["wins"] / games * 100, 2),
+            "pickRate": round(pickrate, 2),
+            "banRate": round(banrate, 2),
+            "score": tier_score(counters["wins"], games, pickrate, banrate),
+        })
+    rows.sort(key=lambda r: (-r["score"], r["championId"]))
+    for position, row in enumerate(rows):
+        percentile = (position + 1) / len(rows)
+        row["tier"] = next(name for name, cut in TIER_CUTS if percentile <= cut)
+    return rows
+
+
+class TierListStore:
+    """
+    Contadores por (región, bracket) y vistas materializadas por (región,
+    parche, rol, bracket). `refresh()` recalcula solo las vistas de las
+    tablas que recibieron partidas desde la última vez.
+    """
+
+    def __init__(self, min_games: int = 20, view_ttl: int = 300, max_unassigned: int = 20000):
+        self.min_games = min_games
+        self.view_ttl = view_ttl
+        self._stores: Dict[Tuple[str, str], PatchStatsStore] = {}
+        # Partidas ya sumadas en "all" que esperan bracket (las más antiguas se descartan)
+        self._unassigned: Deque[UnassignedMatch] = deque(maxlen=max_unassigned)
+        self._dirty: Set[Tuple[str, str]] = set()
+        # (región, parche, rol, bracket) -> vista serializada
+        self._views: Dict[Tuple[str, str, str, str], EncodedPayload] = {}
+        self._current_patch: Optional[str] = None
+
+    def store(self, region: str, bracket: str) -> PatchStatsStore:
+        key = (region, bracket)
+        store = self._stores.get(key)
+        if store is None:
+            store = self._stores[key] = PatchStatsStore(
+                full_patches=1, max_patches=3, max_seen=50000, namespace=f"tierlist:{region}:{bracket}"
+            )
+            store.rollover(self._current_patch)
+        return store
+
+    async def ingest(self, match: dict) -> bool:
+        """
+        Suma la partida en el bracket "all" de su región (la tabla la reclama
+        en Redis: un solo worker la cuenta) y la deja pendiente de bracket.
+        Los demás brackets se asignan en `assign_brackets`, con los rangos
+        compartidos, para que no dependan de qué worker la descargó.
+        """
+        info = match.get("info", {})
+        region = info.get("platformId", "").lower()
+        match_id = match.get("metadata", {}).get("matchId")
+        patch = patch_of(info.get("gameVersion"))
+        if not region or not match_id or not patch:
+            return False
+        deltas = match_deltas(match)
+        if not await self.store(region, "all").ingest_deltas(match_id, patch, deltas):
+            return False
+        self._dirty.add((region, "all"))
+        puuids = [p.get("puuid", "") for p in info.get("participants", []) if p.get("puuid")]
+        self._unassigned.append((region, match_id, patch, deltas, puuids, 0))
+        return True
+
+    async def assign_brackets(self) -> int:
+        """
+        Suma las partidas pendientes en los brackets que alcanza su tier
+        mediano, con los rangos de Redis (`ranked:*`, un MGET por región).
+        Las que aún no tienen rangos suficientes esperan a la siguiente
+        pasada, hasta MAX_BRACKET_ATTEMPTS; después solo cuentan en "all".
+        Devuelve cuántas partidas se asignaron.
+        """
+        pending, self._unassigned = list(self._unassigned), deque(maxlen=self._unassigned.maxlen)
+        by_region: Dict[str, List[UnassignedMatch]] = {}
+        for item in pending:
+            by_region.setdefault(item[0], []).append(item)
+        assigned = 0
+        for region, items in by_region.items():
+            ranks = await ranked_cache.get_many((puuid for item in items for puuid in item[4]), region)
+            for item in items:
+                _, match_id, patch, deltas, puuids, attempts = item
+                tier = match_tier(puuids, ranks)
+                if tier is None:
+                    if attempts + 1 < MAX_BRACKET_ATTEMPTS:
+                        self._unassigned.append(item[:5] + (attempts + 1,))
+                    continue
+                assigned += 1
+                for bracket, floor in BRACKETS.items():
+                    if floor and tier >= floor and await self.store(region, bracket).ingest_deltas(match_id, patch, deltas):
+                        self._dirty.add((region, bracket))
+        return assigned
+
+    def rollover(self, version: Optional[str]) -> None:
+        patch = patch_of(version)
+        if patch and patch != self._current_patch:
+            self._current_patch = patch
+            for key, store in self._stores.items():
+                store.rollover(version)
+                self._dirty.add(key)
+
+    def refresh(self) -> int:
+        """Rematerializa las vistas de las tablas modificadas; devuelve cuántas vistas"""
+        dirty, self._dirty = self._dirty, set()
+        built = 0
+        for region, bracket in dirty:
+            store = self._stores[(region, bracket)]
+            for patch in store.patches():
+                partition = store.partitions[patch]
+                for role in ("ALL",) + ROLES:
+                    data = {
+                        "region": region,
+                        "patch": patch,
+                        "role": role,
+                        "bracket": bracket,
+                        "games": partition.games,
+                        "generated_at": int(time.time()),
+                        "rows": build_rows(partition, role, self.min_games),
+                    }
+                    self._views[(region, patch, role, bracket)] = EncodedPayload(encode_json(data), self.view_ttl)
+                    built += 1
+            # Vistas de parches ya descartados
+            kept = set(store.patches())
+            for key in [k for k in self._views if k[0] == region and k[3] == bracket and k[1] not in kept]:
+                del self._views[key]
+        return built
+
+    def view(
+        self,
+        region: str,
+        role: Optional[str] = None,
+        bracket: str = "all",
+        patch: Optional[str] = None
+    ) -> Optional[EncodedPayload]:
+        """Vista materializada; por defecto del parche actual de la región"""
+        role = normalize_role(role) or "ALL"
+        if patch is None:
+            store = self._stores.get((region, bracket))
+            patch = store.partition().patch if store is not None else None
+        payload = self._views.get((region, patch, role, bracket))
+        if payload is not None and payload.expired:
+            # Mismo cuerpo (mismo ETag) con la vigencia renovada
+            payload = self._views[(region, patch, role, bracket)] = EncodedPayload(payload.body, self.view_ttl)
+        return payload
+
+    async def sync(self) -> None:
+        """Asigna los brackets pendientes, envía los incrementos locales y carga los de todos los workers"""
+        await self.assign_brackets()
+        for key, store in list(self._stores.items()):
+            await store.flush()
+            if await store.load():
+                self._dirty.add(key)
+
+    async def load(self, regions: List[str]) -> None:
+        """Crea las tablas conocidas de cada región para cargarlas de Redis al arrancar"""
+        for region in regions:
+            for bracket in BRACKETS:
+                self.store(region, bracket)
+
+    async def run_sync(self, regions: List[str], interval: float = 300.0) -> None:
+        """Tarea de fondo del lifespan: rotación de parche, sincronización y rematerializado"""
+        await self.load(regions)
+        while True:
+            try:
+                self.rollover(await ddragon.refresh_version())
+                await self.sync()
+                self.refresh()
+            except Exception as exc:
+                logger.warning("Recalculo de la tier list fallido: %s", exc)
+            await asyncio.sleep(interval)
+
+    def clear(self) -> None:
+        self._stores.clear()
+        self._unassigned.clear()
+        self._dirty.clear()
+        self._views.clear()
+        self._current_patch = None
+
+
+# Instancia global
+tierlist_store = TierListStore()
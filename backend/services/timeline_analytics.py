@@ -0,0 +1,208 @@
+"""
+Analítica de timelines: métricas de fase de líneas (diferencias de oro,
+CS y XP a minutos fijos), primera sangre, tiempos de objetivos y curvas
+de oro por minuto. Se calcula una sola vez por partida con arrays NumPy.
+"""
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from backend.services.tracing import traced
+
+
+# Minutos en los que se calculan las diferencias contra el rival de línea
+CHECKPOINT_MINUTES = (10, 15)
+
+
+def _frame_arrays(frames: List[dict], participant_ids: List[int]) -> Dict[str, np.ndarray]:
+    """Convierte los frames en matrices (frames x participantes) de oro, xp y cs"""
+    shape = (len(frames), len(participant_ids))
+    gold = np.zeros(shape, dtype=np.int32)
+    xp = np.zeros(shape, dtype=np.int32)
+    cs = np.zeros(shape, dtype=np.int32)
+    for f, frame in enumerate(frames):
+        pframes = frame.get("participantFrames", {})
+        for col, pid in enumerate(participant_ids):
+            pframe = pframes.get(str(pid), {})
+            gold[f, col] = pframe.get("totalGold", 0)
+            xp[f, col] = pframe.get("xp", 0)
+            cs[f, col] = pframe.get("minionsKilled", 0) + pframe.get("jungleMinionsKilled", 0)
+    return {"gold": gold, "xp": xp, "cs": cs}
+
+
+def _lane_opponents(participant_ids: List[int], match: Optional[dict]) -> np.ndarray:
+    """
+    Índice de columna del rival de línea de cada participante.
+    Usa teamPosition de la partida si está disponible; si no, asume el
+    orden estándar (participantes 1-5 contra 6-10 en la misma posición).
+    """
+    count = len(participant_ids)
+    fallback = np.array([(col + count // 2) % count for col in range(count)], dtype=np.int64)
+    if not match:
+        return fallback
+
+    by_pid = {
+        p.get("participantId"): p
+        for p in match.get("info", {}).get("participants", [])
+    }
+    slots = {}
+    for col, pid in enumerate(participant_ids):
+        participant = by_pid.get(pid, {})
+        slots[(participant.get("teamId"), participant.get("teamPosition"))] = col
+
+    opponents = fallback.copy()
+    for col, pid in enumerate(participant_ids):
+        participant = by_pid.get(pid, {})
+        position = participant.get("teamPosition")
+        enemy_team = 200 if participant.get("teamId") == 100 else 100
+        if position and (enemy_team, position) in slots:
+            opponents[col] = slots[(enemy_team, position)]
+    return opponents
+
+
+def _objective_events(frames: List[dict]) -> List[dict]:
+    """Eventos de objetivos (monstruos épicos y estructuras) en orden temporal"""
+    objectives = []
+    for frame in frames:
+        for event in frame.get("events", []):
+            event_type = event.get("type")
+            if event_type == "ELITE_MONSTER_KILL":
+                objectives.append({
+                    "type": event.get("monsterType"),
+                    "subType": event.get("monsterSubType"),
+                    "teamId": event.get("killerTeamId"),
+                    "timestamp": event.get("timestamp", 0)
+                })
+            elif event_type == "BUILDING_KILL":
+                # teamId es el equipo dueño de la estructura destruida
+                owner = event.get("teamId")
+                objectives.append({
+                    "type": event.get("buildingType"),
+                    "subType": event.get("towerType") or event.get("laneType"),
+                    "teamId": 200 if owner == 100 else 100,
+                    "timestamp": event.get("timestamp", 0)
+                })
+    return objectives
+
+
+def _first_blood(frames: List[dict]) -> Optional[dict]:
+    """
+    Primera sangre: el CHAMPION_KILL más temprano. El CHAMPION_SPECIAL_KILL
+    de tipo KILL_FIRST_BLOOD no se usa porque no trae `victimId`.
+    """
+    first_kill = None
+    for frame in frames:
+        for event in frame.get("events", []):
+            if event.get("type") != "CHAMPION_KILL":
+                continue
+            if first_kill is None or event.get("timestamp", 0) < first_kill["timestamp"]:
+                first_kill = {
+                    "killerId": event.get("killerId"),
+                    "victimId": event.get("victimId"),
+                    "timestamp": event.get("timestamp", 0)
+                }
+    return first_kill
+
+
+@traced("timeline_analytics")
+def compute_timeline_analytics(timeline: dict, match: Optional[dict] = None) -> dict:
+    """
+    Calcula las métricas de fase de líneas de una partida a partir del timeline.
+    `match` (Match-V5) es opcional y sirve para emparejar rivales por teamPosition.
+    """
+    info = timeline.get("info", {})
+    frames = info.get("frames", [])
+    participants = info.get("participants") or [
+        {"participantId": pid} for pid in range(1, 11)
+    ]
+    participant_ids = [p.get("participantId") for p in participants]
+    puuids = {p.get("participantId"): p.get("puuid") for p in participants}
+    frame_interval = info.get("frameInterval", 60000) or 60000
+
+    arrays = _frame_arrays(frames, participant_ids)
+    opponents = _lane_opponents(participant_ids, match)
+    half = len(participant_ids) // 2
+
+    # Curvas de oro por equipo y diferencia (equipo 100 - equipo 200)
+    team_gold_100 = arrays["gold"][:, :half].sum(axis=1)
+    team_gold_200 = arrays["gold"][:, half:].sum(axis=1)
+
+    checkpoints: Dict[int, Optional[Dict[str, np.ndarray]]] = {}
+    for minute in CHECKPOINT_MINUTES:
+        index = int(minute * 60000 // frame_interval)
+        if index >= len(frames):
+            checkpoints[minute] = None
+            continue
+        checkpoints[minute] = {
+            metric: values[index] - values[index, opponents]
+            for metric, values in arrays.items()
+        }
+        checkpoints[minute].update({
+            f"{metric}_total": values[index] for metric, values in arrays.items()
+        })
+
+    first_blood = _first_blood(frames)
+    objectives = _objective_events(frames)
+
+    players = {}
+    for col, pid in enumerate(participant_ids):
+        row = {
+            "participantId": pid,
+            "opponentId": participant_ids[int(opponents[col])],
+            "gold_curve": arrays["gold"][:, col].tolist(),
+            "first_blood_kill": bool(first_blood and first_blood.get("killerId") == pid),
+            "first_blood_victim": bool(first_blood and first_blood.get("victimId") == pid),
+        }
+        for minute, values in checkpoints.items():
+            for metric in ("gold", "cs", "xp"):
+                row[f"{metric}_at_{minute}"] = int(values[f"{metric}_total"][col]) if values else None
+                row[f"{metric}_diff_at_{minute}"] = int(values[metric][col]) if values else None
+        players[puuids.get(pid) or str(pid)] = row
+
+    def first_of(kind: str) -> Optional[dict]:
+        return next((o for o in objectives if o["type"] == kind), None)
+
+    return {
+        "matchId": timeline.get("metadata", {}).get("matchId"),
+        "frameInterval": frame_interval,
+        # El frame 0 es el minuto 0: la duración sale del último timestamp
+        "minutes": frames[-1].get("timestamp", 0) // 60000 if frames else 0,
+        "first_blood": first_blood,
+        "objectives": objectives,
+        "first_objectives": {
+            "dragon": first_of("DRAGON"),
+            "baron": first_of("BARON_NASHOR"),
+            "herald": first_of("RIFTHERALD"),
+            "tower": first_of("TOWER_BUILDING"),
+        },
+        "team_gold": {
+            "100": team_gold_100.tolist(),
+            "200": team_gold_200.tolist(),
+            "diff": (team_gold_100 - team_gold_200).tolist(),
+        },
+        "players": players,
+    }
+
+
+def summarize_lane_phase(analytics: List[dict], puuid: str) -> dict:
+    """
+    Promedia las métricas de fase de líneas de un jugador sobre varias partidas
+    """
+    rows = [a["players"][puuid] for a in analytics if puuid in a.get("players", {})]
+    summary: dict = {"games": len(rows)}
+    if not rows:
+        return summary
+
+    for minute in CHECKPOINT_MINUTES:
+        for metric in ("gold", "cs", "xp"):
+            key = f"{metric}_diff_at_{minute}"
+            values = np.array([r[key] for r in rows if r.get(key) is not None], dtype=np.float64)
+            summary[f"avg_{key}"] = round(float(values.mean()), 1) if values.size else None
+
+    summary["first_blood_kill_rate"] = round(
+        sum(r["first_blood_kill"] for r in rows) / len(rows) * 100, 1
+    )
+    summary["first_blood_death_rate"] = round(
+        sum(r["first_blood_victim"] for r in rows) / len(rows) * 100, 1
+    )
+    return summary
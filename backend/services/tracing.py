@@ -0,0 +1,212 @@
+"""
+Trazas por petición con contextvars: registra cada llamada a Riot,
+operación de caché, codificación y paso de agregación con su duración.
+Emite la cabecera Server-Timing, guarda trazas para depuración y
+registra las peticiones lentas con su árbol de spans completo.
+"""
+import asyncio
+import json
+import logging
+import time
+import uuid
+from collections import OrderedDict, defaultdict
+from contextvars import ContextVar
+from functools import wraps
+from typing import Dict, List, Optional
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+logger = logging.getLogger("backend.tracing")
+
+
+class Span:
+    """Intervalo medido dentro de una petición"""
+
+    __slots__ = ("name", "category", "attrs", "start", "end", "children", "_token")
+
+    def __init__(self, name: str, category: str, attrs: Optional[dict] = None):
+        self.name = name
+        self.category = category
+        self.attrs = attrs or {}
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.children: List["Span"] = []
+        self._token = None
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end if self.end is not None else time.perf_counter()
+        return (end - self.start) * 1000
+
+    def set(self, key: str, value) -> None:
+        """Añade un atributo al span"""
+        self.attrs[key] = value
+
+    def to_dict(self, origin: float) -> dict:
+        data = {
+            "name": self.name,
+            "category": self.category,
+            "start_ms": round((self.start - origin) * 1000, 3),
+            "duration_ms": round(self.duration_ms, 3),
+        }
+        if self.attrs:
+            data["attrs"] = self.attrs
+        if self.children:
+            data["children"] = [child.to_dict(origin) for child in self.children]
+        return data
+
+    def __enter__(self) -> "Span":
+        parent = _current_span.get()
+        if parent is not None:
+            parent.children.append(self)
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.end = time.perf_counter()
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        _current_span.reset(self._token)
+
+
+class _NoopSpan:
+    """Span vacío usado cuando no hay traza activa (sin coste apreciable)"""
+
+    def set(self, key: str, value) -> None:
+        return None
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        return None
+
+
+_NOOP_SPAN = _NoopSpan()
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def span(name: str, category: str = "app", **attrs):
+    """
+    Abre un span hijo del span actual. Uso:
+
+        with span("riot", "riot", endpoint="match.detail"):
+            ...
+    """
+    if _current_span.get() is None:
+        return _NOOP_SPAN
+    return Span(name, category, attrs)
+
+
+def traced(name: str, category: str = "aggregate"):
+    """Decorador que envuelve una función (sync o async) en un span"""
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name, category):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name, category):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class Trace:
+    """Árbol de spans de una petición"""
+
+    def __init__(self, method: str, path: str):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.root = Span(f"{method} {path}", "request")
+
+    def categories(self) -> Dict[str, dict]:
+        """Duración acumulada y número de spans por categoría (excluye la raíz)"""
+        totals: Dict[str, dict] = defaultdict(lambda: {"dur": 0.0, "count": 0})
+        stack = list(self.root.children)
+        while stack:
+            current = stack.pop()
+            totals[current.category]["dur"] += current.duration_ms
+            totals[current.category]["count"] += 1
+            stack.extend(current.children)
+        return totals
+
+    def server_timing(self) -> str:
+        """Valor de la cabecera Server-Timing (las llamadas concurrentes se suman)"""
+        parts = [
+            f'{category};dur={data["dur"]:.1f};desc="{data["count"]} spans"'
+            for category, data in sorted(self.categories().items())
+        ]
+        parts.append(f"total;dur={self.root.duration_ms:.1f}")
+        return ", ".join(parts)
+
+    def to_dict(self) -> dict:
+        return {"trace_id": self.trace_id, "spans": self.root.to_dict(self.root.start)}
+
+
+class TraceBuffer:
+    """Últimas trazas completas, para consultarlas en modo depuración"""
+
+    def __init__(self, max_traces: int = 200):
+        self.max_traces = max_traces
+        self._traces: "OrderedDict[str, dict]" = OrderedDict()
+
+    def add(self, trace: Trace) -> None:
+        self._traces[trace.trace_id] = trace.to_dict()
+        while len(self._traces) > self.max_traces:
+            self._traces.popitem(last=False)
+
+    def get(self, trace_id: str) -> Optional[dict]:
+        return self._traces.get(trace_id)
+
+
+# Instancia global
+trace_buffer = TraceBuffer()
+
+
+class TracingMiddleware:
+    """
+    Middleware ASGI que crea la traza de cada petición y añade Server-Timing.
+    Con `debug=True` guarda la traza (consultable por X-Trace-Id); con
+    `slow_request_ms > 0` registra el árbol de spans de las peticiones lentas.
+    """
+
+    def __init__(self, app: ASGIApp, debug: bool = False, slow_request_ms: float = 0):
+        self.app = app
+        self.debug = debug
+        self.slow_request_ms = slow_request_ms
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace = Trace(scope.get("method", "GET"), scope.get("path", ""))
+        token = _current_span.set(trace.root)
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", trace.server_timing())
+                if self.debug:
+                    headers.append("X-Trace-Id", trace.trace_id)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            trace.root.end = time.perf_counter()
+            _current_span.reset(token)
+            if self.debug:
+                trace_buffer.add(trace)
+            if self.slow_request_ms and trace.root.duration_ms >= self.slow_request_ms:
+                logger.warning(
+                    "Petición lenta (%.1f ms): %s",
+                    trace.root.duration_ms,
+                    json.dumps(trace.to_dict(), ensure_ascii=False)
+                )
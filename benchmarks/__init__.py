@@ -0,0 +1,4 @@
+"""
+Benchmarks del backend: servidor Riot falso, generador de datos sintéticos
+y medición de rutas clave y de las funciones de agregación
+"""
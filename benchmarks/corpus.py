@@ -0,0 +1,812 @@
+"""
+Generador de corpus sintético a escala (10^6+ partidas) para pruebas de
+rendimiento: partidas Match-V5, timelines, cuentas y entradas de liga
+coherentes entre sí, deterministas a partir de una semilla y con
+distribuciones de campeones, items, hechizos y runas tomadas de Data Dragon.
+
+    python -m benchmarks.corpus --matches 1000000 --workers 8 --out corpus.jsonl.gz
+    python -m benchmarks.corpus --matches 50000 --timelines --load
+"""
+import argparse
+import asyncio
+import bisect
+import gzip
+import hashlib
+import itertools
+import math
+import random
+import sys
+import time
+from dataclasses import dataclass
+from multiprocessing import Pool
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import orjson
+
+from benchmarks import synthetic
+
+
+POSITIONS = ("TOP", "JUNGLE", "MIDDLE", "BOTTOM", "UTILITY")
+QUEUE_WEIGHTS = ((420, 0.7), (440, 0.2), (450, 0.1))
+# Distribución aproximada de la ladder de clasificatorias
+TIER_WEIGHTS = (
+    ("IRON", 0.05), ("BRONZE", 0.15), ("SILVER", 0.21), ("GOLD", 0.23),
+    ("PLATINUM", 0.17), ("EMERALD", 0.12), ("DIAMOND", 0.055), ("MASTER", 0.015),
+)
+DIVISIONS = ("IV", "III", "II", "I")
+
+# Afinidad de cada clase de campeón con cada posición
+ROLE_AFFINITY = {
+    "Fighter": {"TOP": 1.0, "JUNGLE": 0.7, "MIDDLE": 0.15},
+    "Tank": {"TOP": 0.8, "JUNGLE": 0.5, "UTILITY": 0.5},
+    "Mage": {"MIDDLE": 1.0, "UTILITY": 0.4, "BOTTOM": 0.1},
+    "Assassin": {"MIDDLE": 0.9, "JUNGLE": 0.6},
+    "Marksman": {"BOTTOM": 1.0, "MIDDLE": 0.1},
+    "Support": {"UTILITY": 1.0},
+}
+# Etiquetas de item que interesan a cada clase
+ITEM_AFFINITY = {
+    "Fighter": ("Damage", "Health", "CooldownReduction", "AbilityHaste"),
+    "Tank": ("Health", "Armor", "SpellBlock"),
+    "Mage": ("SpellDamage", "Mana", "MagicPenetration"),
+    "Assassin": ("Damage", "ArmorPenetration", "Lethality"),
+    "Marksman": ("CriticalStrike", "AttackSpeed", "Damage"),
+    "Support": ("ManaRegen", "Aura", "Health", "GoldPer"),
+}
+# Segundo hechizo por posición (el primero es Destello casi siempre)
+POSITION_SPELLS = {
+    "TOP": (12, 14), "JUNGLE": (11,), "MIDDLE": (14, 12, 21),
+    "BOTTOM": (7, 21), "UTILITY": (14, 3),
+}
+FLASH = 4
+STAT_PERKS = ((5008, 5005, 5007), (5008, 5010, 5001), (5011, 5001, 5013))
+
+
+def _zipf_weights(count: int, exponent: float) -> List[float]:
+    return [1.0 / (rank + 1) ** exponent for rank in range(count)]
+
+
+class _Weighted:
+    """Muestreo ponderado O(log n) con pesos acumulados"""
+
+    __slots__ = ("values", "cumulative", "total")
+
+    def __init__(self, values: Sequence, weights: Sequence[float]):
+        self.values = list(values)
+        self.cumulative = list(itertools.accumulate(weights))
+        self.total = self.cumulative[-1] if self.cumulative else 0.0
+
+    def pick(self, rng: random.Random):
+        return self.values[bisect.bisect(self.cumulative, rng.random() * self.total)]
+
+
+@dataclass
+class Distributions:
+    """Catálogos de Data Dragon y sus pesos de popularidad"""
+    champions: List[Tuple[int, str, str]]
+    items: Dict[str, List[int]]
+    boots: List[int]
+    spells: List[int]
+    rune_trees: List[Tuple[int, List[List[int]]]]
+    version: str = "15.1.1"
+
+    @classmethod
+    def from_ddragon(
+        cls,
+        champions: dict,
+        items: dict,
+        spells: dict,
+        runes: list,
+        version: str = "15.1.1"
+    ) -> "Distributions":
+        """Construye las distribuciones a partir de los JSON de Data Dragon"""
+        champion_rows = [
+            (int(c["key"]), c["id"], (c.get("tags") or ["Fighter"])[0])
+            for c in champions.values()
+        ]
+        by_class: Dict[str, List[int]] = {name: [] for name in ITEM_AFFINITY}
+        boots = []
+        for item_id, item in items.items():
+            gold = item.get("gold", {})
+            maps = item.get("maps", {})
+            if not gold.get("purchasable", True) or not maps.get("11", True) or item.get("into"):
+                continue
+            tags = set(item.get("tags", []))
+            if "Boots" in tags and gold.get("total", 0) >= 900:
+                boots.append(int(item_id))
+            elif gold.get("total", 0) >= 2200 and "Consumable" not in tags:
+                for name, wanted in ITEM_AFFINITY.items():
+                    if tags.intersection(wanted):
+                        by_class[name].append(int(item_id))
+        spell_ids = [
+            int(s["key"]) for s in spells.values() if "CLASSIC" in s.get("modes", ["CLASSIC"])
+        ]
+        trees = [
+            (tree["id"], [[rune["id"] for rune in slot.get("runes", [])] for slot in tree.get("slots", [])])
+            for tree in runes
+        ]
+        return cls(champion_rows, by_class, boots, spell_ids, trees, version)
+
+    @classmethod
+    def fallback(cls) -> "Distributions":
+        """Tablas mínimas para generar sin red (subconjunto de synthetic.py)"""
+        classes = list(ITEM_AFFINITY)
+        champions = [
+            (champion_id, name, classes[i % len(classes)])
+            for i, (champion_id, name) in enumerate(synthetic.CHAMPIONS)
+        ]
+        items = {name: list(synthetic.ITEMS) for name in ITEM_AFFINITY}
+        trees = [
+            (8000 + 100 * t, [synthetic.KEYSTONES[t * 3:t * 3 + 3]] + [[8000 + 100 * t + s * 10 + r for r in range(3)] for s in range(1, 4)])
+            for t in range(4)
+        ]
+        return cls(champions, items, [3006, 3020, 3047, 3111, 3158], list(synthetic.SPELLS), trees)
+
+
+async def load_distributions(service=None, lang: str = "es_ES") -> Distributions:
+    """Carga las distribuciones desde DataDragonService (usa su caché en memoria)"""
+    if service is None:
+        from backend.services.ddragon import ddragon as service
+    return Distributions.from_ddragon(
+        await service.get_champions(lang),
+        await service.get_items(lang),
+        await service.get_summoner_spells(lang),
+        await service.get_runes(lang),
+        await service.get_latest_version()
+    )
+
+
+@dataclass
+class CorpusSpec:
+    seed: int = 1
+    matches: int = 100000
+    players: int = 200000
+    platform: str = "LA1"
+    # Fin del periodo cubierto; las partidas se reparten hacia atrás
+    end_ms: int = synthetic.HISTORY_END_MS
+    span_days: int = 90
+
+
+class CorpusGenerator:
+    """
+    Genera el documento i-ésimo de cada tipo de forma independiente
+    (semilla + índice), lo que permite repartir el trabajo entre procesos.
+    """
+
+    def __init__(self, spec: CorpusSpec, distributions: Optional[Distributions] = None):
+        self.spec = spec
+        self.dist = distributions or Distributions.fallback()
+        rng = random.Random(spec.seed)
+
+        champions = list(self.dist.champions)
+        rng.shuffle(champions)
+        popularity = _zipf_weights(len(champions), 0.8)
+        self._champions_by_position = {
+            position: _Weighted(
+                champions,
+                [w * ROLE_AFFINITY.get(c[2], {}).get(position, 0.02) for c, w in zip(champions, popularity)]
+            )
+            for position in POSITIONS
+        }
+        self._items_by_class = {}
+        for name, pool in self.dist.items.items():
+            pool = list(pool) or [item for items in self.dist.items.values() for item in items]
+            rng.shuffle(pool)
+            self._items_by_class[name] = _Weighted(pool, _zipf_weights(len(pool), 0.7))
+        self._queues = _Weighted([q for q, _ in QUEUE_WEIGHTS], [w for _, w in QUEUE_WEIGHTS])
+        self._tiers = _Weighted(range(len(TIER_WEIGHTS)), [w for _, w in TIER_WEIGHTS])
+
+        # Los jugadores se ordenan por tier: rango [inicio, fin) de índices por tier
+        bounds = [0]
+        for _, weight in TIER_WEIGHTS:
+            bounds.append(min(spec.players, bounds[-1] + max(10, int(round(weight * spec.players)))))
+        bounds[-1] = spec.players
+        self._tier_bounds = bounds
+        self._keystones = [(tree_id, slots) for tree_id, slots in self.dist.rune_trees if slots and slots[0]]
+
+    # ==================== JUGADORES ====================
+
+    def puuid(self, index: int) -> str:
+        """PUUID de 78 caracteres derivado de la semilla y el índice"""
+        digest = hashlib.blake2b(f"{self.spec.seed}:{index}".encode(), digest_size=39).hexdigest()
+        return digest
+
+    def tier_of(self, index: int) -> str:
+        position = bisect.bisect_right(self._tier_bounds, index) - 1
+        return TIER_WEIGHTS[min(position, len(TIER_WEIGHTS) - 1)][0]
+
+    def account(self, index: int) -> dict:
+        return {"puuid": self.puuid(index), "gameName": f"Jugador{index}", "tagLine": self.spec.platform}
+
+    def league_entries(self, index: int) -> List[dict]:
+        rng = random.Random(f"{self.spec.seed}:league:{index}")
+        tier = self.tier_of(index)
+        wins, losses = rng.randint(20, 400), rng.randint(20, 400)
+        apex = tier == "MASTER"
+        return [{
+            "leagueId": f"corpus-{tier.lower()}",
+            "queueType": "RANKED_SOLO_5x5",
+            "tier": tier,
+            "rank": "I" if apex else rng.choice(DIVISIONS),
+            "puuid": self.puuid(index),
+            "leaguePoints": rng.randint(0, 1200) if apex else rng.randint(0, 99),
+            "wins": wins,
+            "losses": losses,
+            "veteran": rng.random() < 0.1,
+            "inactive": False,
+            "freshBlood": rng.random() < 0.1,
+            "hotStreak": rng.random() < 0.1,
+        }]
+
+    # ==================== PARTIDAS ====================
+
+    def match_id(self, index: int) -> str:
+        return f"{self.spec.platform}_{7_000_000_000 + index}"
+
+    def _rng(self, index: int, kind: str) -> random.Random:
+        return random.Random(f"{self.spec.seed}:{kind}:{index}")
+
+    def _runes(self, rng: random.Random) -> dict:
+        primary_id, primary_slots = rng.choice(self._keystones)
+        secondary = [t for t in self.dist.rune_trees if t[0] != primary_id] or [(primary_id, primary_slots)]
+        secondary_id, secondary_slots = rng.choice(secondary)
+        minor_slots = [slot for slot in secondary_slots[1:] if slot] or [primary_slots[0]]
+        picked = rng.sample(minor_slots, min(2, len(minor_slots)))
+        offense, flex, defense = (rng.choice(group) for group in STAT_PERKS)
+        return {
+            "statPerks": {"defense": defense, "flex": flex, "offense": offense},
+            "styles": [
+                {
+                    "description": "primaryStyle",
+                    "style": primary_id,
+                    "selections": [
+                        {"perk": rng.choice(slot), "var1": 0, "var2": 0, "var3": 0}
+                        for slot in primary_slots[:4] if slot
+                    ],
+                },
+                {
+                    "description": "subStyle",
+                    "style": secondary_id,
+                    "selections": [{"perk": rng.choice(slot), "var1": 0, "var2": 0, "var3": 0} for slot in picked],
+                },
+            ],
+        }
+
+    def _spells(self, rng: random.Random, position: str) -> Tuple[int, int]:
+        options = [s for s in POSITION_SPELLS[position] if s in self.dist.spells] or self.dist.spells
+        second = rng.choice(options)
+        first = FLASH if rng.random() < 0.95 else rng.choice([s for s in self.dist.spells if s != second])
+        return (first, second) if rng.random() < 0.5 else (second, first)
+
+    def _items(self, rng: random.Random, champion_class: str, minutes: float) -> List[int]:
+        completed = min(5, max(1, int(minutes / 8)))
+        pool = self._items_by_class.get(champion_class) or next(iter(self._items_by_class.values()))
+        chosen: List[int] = []
+        for _ in range(completed * 3):
+            item = pool.pick(rng)
+            if item not in chosen:
+                chosen.append(item)
+            if len(chosen) == completed:
+                break
+        if self.dist.boots:
+            chosen.insert(min(1, len(chosen)), rng.choice(self.dist.boots))
+        slots = chosen[:6] + [0] * (6 - min(len(chosen), 6))
+        return slots + [3364 if champion_class == "Support" else 3340]
+
+    def _pick_players(self, rng: random.Random) -> List[int]:
+        tier = self._tiers.pick(rng)
+        low, high = self._tier_bounds[tier], self._tier_bounds[tier + 1]
+        if high - low < 10:
+            low, high = 0, self.spec.players
+        picked = set()
+        while len(picked) < 10:
+            picked.add(rng.randrange(low, high))
+        return list(picked)
+
+    def match(self, index: int) -> dict:
+        """Partida Match-V5 coherente (kills/muertes por equipo, objetivos, oro)"""
+        rng = self._rng(index, "match")
+        spec = self.spec
+        match_id = self.match_id(index)
+        players = self._pick_players(rng)
+        duration = int(min(max(rng.gauss(1750, 330), 900), 3000))
+        minutes = duration / 60
+        start = spec.end_ms - int(spec.span_days * 86_400_000 * (index + rng.random()) / max(spec.matches, 1))
+        blue_wins = rng.random() < 0.505
+        surrender = duration < 1800 and rng.random() < 0.35
+
+        # Kills por equipo proporcionales a la duración; el ganador mata más
+        team_kills = {}
+        for team_id, won in ((100, blue_wins), (200, not blue_wins)):
+            rate = rng.uniform(0.55, 1.0) if won else rng.uniform(0.3, 0.75)
+            team_kills[team_id] = max(1, int(rate * minutes))
+
+        champions_used = set()
+        participants = []
+        for slot in range(10):
+            team_id = 100 if slot < 5 else 200
+            position = POSITIONS[slot % 5]
+            champion = self._champions_by_position[position].pick(rng)
+            while champion[0] in champions_used:
+                champion = self._champions_by_position[position].pick(rng)
+            champions_used.add(champion[0])
+            participants.append(self._participant(
+                rng, slot + 1, players[slot], team_id, position, champion,
+                minutes, team_id == 100 and blue_wins or team_id == 200 and not blue_wins, surrender
+            ))
+
+        self._distribute_kills(rng, participants, team_kills)
+        teams = [self._team(rng, team_id, won, minutes) for team_id, won in ((100, blue_wins), (200, not blue_wins))]
+        for team in teams:
+            team["objectives"]["champion"]["kills"] = team_kills[team["teamId"]]
+
+        return {
+            "metadata": {
+                "dataVersion": "2",
+                "matchId": match_id,
+                "participants": [p["puuid"] for p in participants],
+            },
+            "info": {
+                "endOfGameResult": "GameComplete",
+                "gameCreation": start - 60_000,
+                "gameDuration": duration,
+                "gameEndTimestamp": start + duration * 1000,
+                "gameId": 7_000_000_000 + index,
+                "gameMode": "CLASSIC",
+                "gameName": f"teambuilder-match-{7_000_000_000 + index}",
+                "gameStartTimestamp": start,
+                "gameType": "MATCHED_GAME",
+                "gameVersion": f"{self.dist.version}.{rng.randint(100, 999)}",
+                "mapId": 11,
+                "participants": participants,
+                "platformId": spec.platform,
+                "queueId": self._queues.pick(rng),
+                "teams": teams,
+                "tournamentCode": "",
+            },
+        }
+
+    def _participant(
+        self,
+        rng: random.Random,
+        participant_id: int,
+        player: int,
+        team_id: int,
+        position: str,
+        champion: Tuple[int, str, str],
+        minutes: float,
+        win: bool,
+        surrender: bool
+    ) -> dict:
+        champion_id, champion_name, champion_class = champion
+        support, jungle = position == "UTILITY", position == "JUNGLE"
+        cs_rate = 1.2 if support else rng.uniform(5.0, 8.5) if not jungle else rng.uniform(0.5, 1.5)
+        neutral = int(minutes * rng.uniform(4.5, 6.5)) if jungle else rng.randint(0, 12)
+        gold_rate = rng.uniform(300, 360) if win else rng.uniform(250, 320)
+        if support:
+            gold_rate *= 0.7
+        gold = int(500 + gold_rate * minutes)
+        damage = int(minutes * (rng.uniform(250, 450) if support or champion_class == "Tank" else rng.uniform(550, 1000)))
+        spell1, spell2 = self._spells(rng, position)
+        items = self._items(rng, champion_class, minutes)
+        vision = int(minutes * (rng.uniform(2.0, 3.5) if support else rng.uniform(0.5, 1.4)))
+        level = min(18, int(6 + minutes / 2.6 + rng.uniform(-1.5, 1.5)))
+        account = self.account(player)
+        participant = {
+            "participantId": participant_id,
+            "puuid": account["puuid"],
+            "riotIdGameName": account["gameName"],
+            "riotIdTagline": account["tagLine"],
+            "summonerLevel": 30 + player % 700,
+            "profileIcon": player % 5000,
+            "championId": champion_id,
+            "championName": champion_name,
+            "champLevel": level,
+            "champExperience": int(minutes * rng.uniform(550, 700)),
+            "teamId": team_id,
+            "teamPosition": position,
+            "individualPosition": position,
+            "lane": "BOTTOM" if support else position,
+            "role": "SUPPORT" if support else "CARRY" if position == "BOTTOM" else "SOLO" if not jungle else "NONE",
+            "win": win,
+            "gameEndedInSurrender": surrender,
+            "kills": 0,
+            "deaths": 0,
+            "assists": 0,
+            "doubleKills": 0,
+            "tripleKills": 0,
+            "quadraKills": 0,
+            "pentaKills": 0,
+            "largestMultiKill": 0,
+            "largestKillingSpree": 0,
+            "firstBloodKill": False,
+            "firstBloodAssist": False,
+            "firstTowerKill": False,
+            "totalMinionsKilled": int(minutes * cs_rate),
+            "neutralMinionsKilled": neutral,
+            "goldEarned": gold,
+            "goldSpent": int(gold * rng.uniform(0.85, 0.98)),
+            "totalDamageDealtToChampions": damage,
+            "physicalDamageDealtToChampions": int(damage * 0.55),
+            "magicDamageDealtToChampions": int(damage * 0.4),
+            "trueDamageDealtToChampions": int(damage * 0.05),
+            "totalDamageDealt": damage * rng.randint(5, 9),
+            "totalDamageTaken": int(minutes * rng.uniform(600, 1100)),
+            "damageSelfMitigated": int(minutes * rng.uniform(300, 1200)),
+            "damageDealtToBuildings": rng.randint(0, 8000),
+            "damageDealtToObjectives": rng.randint(0, 30000) if jungle else rng.randint(0, 9000),
+            "totalHeal": rng.randint(500, 12000),
+            "visionScore": vision,
+            "wardsPlaced": int(vision * 0.5),
+            "wardsKilled": int(vision * 0.15),
+            "detectorWardsPlaced": rng.randint(0, 4),
+            "visionWardsBoughtInGame": rng.randint(0, 5),
+            "turretKills": rng.randint(0, 3),
+            "inhibitorKills": rng.randint(0, 1) if win else 0,
+            "dragonKills": rng.randint(0, 3) if jungle else 0,
+            "baronKills": rng.randint(0, 1) if jungle and win else 0,
+            "longestTimeSpentLiving": rng.randint(200, int(minutes * 60)),
+            "timePlayed": int(minutes * 60),
+            "consumablesPurchased": rng.randint(1, 8),
+            "summoner1Id": spell1,
+            "summoner2Id": spell2,
+            "perks": self._runes(rng),
+        }
+        for slot, item in enumerate(items):
+            participant[f"item{slot}"] = item
+        return participant
+
+    @staticmethod
+    def _distribute_kills(rng: random.Random, participants: List[dict], team_kills: Dict[int, int]) -> None:
+        """Reparte kills, muertes y asistencias de forma coherente entre equipos"""
+        carry = {"TOP": 1.0, "JUNGLE": 0.9, "MIDDLE": 1.2, "BOTTOM": 1.3, "UTILITY": 0.35}
+        by_team = {100: participants[:5], 200: participants[5:]}
+        first_blood_time = None
+        for team_id, members in by_team.items():
+            enemies = by_team[300 - team_id]
+            kill_weights = [carry[m["teamPosition"]] * rng.uniform(0.5, 1.5) for m in members]
+            death_weights = [rng.uniform(0.6, 1.4) for _ in enemies]
+            for _ in range(team_kills[team_id]):
+                killer = rng.choices(members, kill_weights)[0]
+                victim = rng.choices(enemies, death_weights)[0]
+                killer["kills"] += 1
+                victim["deaths"] += 1
+                for helper in members:
+                    if helper is not killer and rng.random() < 0.45:
+                        helper["assists"] += 1
+            fb_time = rng.random()
+            if first_blood_time is None or fb_time < first_blood_time[0]:
+                scorer = max(members, key=lambda m: m["kills"])
+                first_blood_time = (fb_time, scorer)
+        if first_blood_time is not None:
+            first_blood_time[1]["firstBloodKill"] = True
+        for p in participants:
+            kills = p["kills"]
+            p["largestKillingSpree"] = min(kills, rng.randint(0, 8)) if kills >= 2 else 0
+            p["doubleKills"] = kills // 6
+            p["tripleKills"] = kills // 14
+            p["largestMultiKill"] = 3 if p["tripleKills"] else 2 if p["doubleKills"] else min(kills, 1)
+            team_total = team_kills[p["teamId"]]
+            p["challenges"] = {
+                "kda": round((kills + p["assists"]) / max(p["deaths"], 1), 4),
+                "killParticipation": round((kills + p["assists"]) / team_total, 4) if team_total else 0,
+                "goldPerMinute": round(p["goldEarned"] / max(p["timePlayed"] / 60, 1), 2),
+                "damagePerMinute": round(p["totalDamageDealtToChampions"] / max(p["timePlayed"] / 60, 1), 2),
+                "visionScorePerMinute": round(p["visionScore"] / max(p["timePlayed"] / 60, 1), 4),
+            }
+
+    def _team(self, rng: random.Random, team_id: int, won: bool, minutes: float) -> dict:
+        def objective(first: bool, kills: int) -> dict:
+            return {"first": first, "kills": kills}
+
+        towers = rng.randint(6, 11) if won else rng.randint(0, 6)
+        dragons = rng.randint(2, 5) if won else rng.randint(0, 3)
+        return {
+            "teamId": team_id,
+            "win": won,
+            "bans": [
+                {"championId": self._champions_by_position[POSITIONS[turn]].pick(rng)[0], "pickTurn": turn + 1}
+                for turn in range(5)
+            ],
+            "objectives": {
+                "baron": objective(won and minutes > 22, 1 if won and minutes > 22 else 0),
+                "champion": objective(False, 0),
+                "dragon": objective(rng.random() < (0.6 if won else 0.4), dragons),
+                "horde": objective(rng.random() < 0.5, rng.randint(0, 6)),
+                "inhibitor": objective(won, rng.randint(1, 3) if won else 0),
+                "riftHerald": objective(rng.random() < 0.5, rng.randint(0, 1)),
+                "tower": objective(rng.random() < (0.6 if won else 0.4), towers),
+            },
+        }
+
+    # ==================== TIMELINES ====================
+
+    def timeline(self, index: int, match: Optional[dict] = None) -> dict:
+        """Timeline Match-V5 con frames por minuto y eventos coherentes con la partida"""
+        match = match or self.match(index)
+        rng = self._rng(index, "timeline")
+        info = match["info"]
+        participants = info["participants"]
+        duration_ms = info["gameDuration"] * 1000
+        frame_count = duration_ms // 60_000 + 2
+        final_minute = max(duration_ms / 60_000, 1)
+
+        events_by_frame: List[List[dict]] = [[] for _ in range(frame_count)]
+
+        def add(event: dict) -> None:
+            events_by_frame[min(event["timestamp"] // 60_000 + 1, frame_count - 1)].append(event)
+
+        # Kills: se emparejan asesinos y víctimas a partir de los totales
+        first_killer = next((p for p in participants if p["firstBloodKill"]), None)
+        kills = []
+        for team_id in (100, 200):
+            killers = [p["participantId"] for p in participants if p["teamId"] == team_id for _ in range(p["kills"])]
+            victims = [p["participantId"] for p in participants if p["teamId"] != team_id for _ in range(p["deaths"])]
+            rng.shuffle(victims)
+            kills.extend(zip(killers, victims))
+        times = sorted(rng.randint(150_000, duration_ms - 5_000) for _ in kills)
+        rng.shuffle(kills)
+        if first_killer is not None:
+            first = next((k for k in kills if k[0] == first_killer["participantId"]), None)
+            if first is not None:
+                kills.remove(first)
+                kills.insert(0, first)
+        for number, ((killer, victim), timestamp) in enumerate(zip(kills, times)):
+            add({
+                "type": "CHAMPION_KILL",
+                "timestamp": timestamp,
+                "killerId": killer,
+                "victimId": victim,
+                "assistingParticipantIds": [],
+                "bounty": 300,
+                "position": {"x": rng.randint(500, 14500), "y": rng.randint(500, 14500)},
+            })
+            if number == 0:
+                add({"type": "CHAMPION_SPECIAL_KILL", "timestamp": timestamp, "killerId": killer, "killType": "KILL_FIRST_BLOOD"})
+
+        jungler = {p["teamId"]: p["participantId"] for p in participants if p["teamPosition"] == "JUNGLE"}
+        for team in info["teams"]:
+            team_id = team["teamId"]
+            objectives = team["objectives"]
+            for _ in range(objectives["dragon"]["kills"]):
+                add({
+                    "type": "ELITE_MONSTER_KILL", "timestamp": rng.randint(300_000, duration_ms - 5_000),
+                    "killerId": jungler.get(team_id, 0), "killerTeamId": team_id,
+                    "monsterType": "DRAGON", "monsterSubType": rng.choice(("FIRE_DRAGON", "WATER_DRAGON", "AIR_DRAGON", "EARTH_DRAGON")),
+                })
+            for _ in range(objectives["baron"]["kills"]):
+                add({
+                    "type": "ELITE_MONSTER_KILL", "timestamp": rng.randint(1_200_000, max(duration_ms - 5_000, 1_200_001)),
+                    "killerId": jungler.get(team_id, 0), "killerTeamId": team_id, "monsterType": "BARON_NASHOR",
+                })
+            for _ in range(objectives["riftHerald"]["kills"]):
+                add({
+                    "type": "ELITE_MONSTER_KILL", "timestamp": rng.randint(840_000, min(duration_ms - 5_000, 1_190_000)),
+                    "killerId": jungler.get(team_id, 0), "killerTeamId": team_id, "monsterType": "RIFTHERALD",
+                })
+            for tower in range(objectives["tower"]["kills"]):
+                add({
+                    "type": "BUILDING_KILL", "timestamp": rng.randint(600_000, duration_ms - 5_000),
+                    "killerId": rng.choice([p["participantId"] for p in participants if p["teamId"] == team_id]),
+                    "teamId": 300 - team_id, "buildingType": "TOWER_BUILDING",
+                    "laneType": rng.choice(("TOP_LANE", "MID_LANE", "BOT_LANE")),
+                    "towerType": ("OUTER_TURRET", "INNER_TURRET", "BASE_TURRET", "NEXUS_TURRET")[min(tower // 3, 3)],
+                })
+
+        for p in participants:
+            for slot in range(6):
+                item = p[f"item{slot}"]
+                if item:
+                    add({
+                        "type": "ITEM_PURCHASED", "timestamp": rng.randint(60_000, duration_ms - 5_000),
+                        "participantId": p["participantId"], "itemId": item,
+                    })
+        winner = next(t["teamId"] for t in info["teams"] if t["win"])
+        add({"type": "GAME_END", "timestamp": duration_ms, "winningTeam": winner, "gameId": info["gameId"]})
+
+        frames = []
+        for f in range(frame_count):
+            progress = min(f / final_minute, 1.0)
+            timestamp = min(f * 60_000, duration_ms)
+            participant_frames = {}
+            for p in participants:
+                pid = p["participantId"]
+                noise = 1 + rng.uniform(-0.04, 0.04) if 0 < progress < 1 else 1
+                jungle = p["teamPosition"] == "JUNGLE"
+                participant_frames[str(pid)] = {
+                    "participantId": pid,
+                    "totalGold": int((500 + (p["goldEarned"] - 500) * progress) * noise),
+                    "currentGold": rng.randint(0, 1500),
+                    "xp": int(p["champExperience"] * progress * noise),
+                    "level": max(1, int(p["champLevel"] * math.sqrt(progress))),
+                    "minionsKilled": int(p["totalMinionsKilled"] * progress),
+                    "jungleMinionsKilled": int(p["neutralMinionsKilled"] * progress) if jungle else 0,
+                    "position": {"x": rng.randint(500, 14500), "y": rng.randint(500, 14500)},
+                }
+            events = sorted(events_by_frame[f], key=lambda e: e["timestamp"])
+            frames.append({"timestamp": timestamp, "participantFrames": participant_frames, "events": events})
+
+        return {
+            "metadata": {"dataVersion": "2", "matchId": match["metadata"]["matchId"], "participants": match["metadata"]["participants"]},
+            "info": {
+                "frameInterval": 60000,
+                "gameId": info["gameId"],
+                "participants": [{"participantId": p["participantId"], "puuid": p["puuid"]} for p in participants],
+                "frames": frames,
+            },
+        }
+
+    # ==================== FLUJOS ====================
+
+    def iter_documents(self, start: int, stop: int, kinds: Sequence[str] = ("match",)) -> Iterator[Tuple[str, dict]]:
+        """(tipo, documento) para las partidas [start, stop) y los jugadores del mismo rango"""
+        for index in range(start, min(stop, self.spec.matches)):
+            match = self.match(index) if "match" in kinds or "timeline" in kinds else None
+            if "match" in kinds:
+                yield "match", match
+            if "timeline" in kinds:
+                yield "timeline", self.timeline(index, match)
+        players = range(start, min(stop, self.spec.players)) if start < self.spec.players else ()
+        for index in players:
+            if "account" in kinds:
+                yield "account", self.account(index)
+            if "league" in kinds:
+                for entry in self.league_entries(index):
+                    yield "league", entry
+
+
+def _jsonl_chunk(args: Tuple[CorpusSpec, Distributions, int, int, Tuple[str, ...]]) -> bytes:
+    """Genera un tramo como líneas JSONL {"kind": ..., "data": ...} (para multiprocessing)"""
+    spec, distributions, start, stop, kinds = args
+    generator = CorpusGenerator(spec, distributions)
+    return b"".join(
+        orjson.dumps({"kind": kind, "data": document}) + b"\n"
+        for kind, document in generator.iter_documents(start, stop, kinds)
+    )
+
+
+def _ranges(total: int, chunk: int) -> Iterator[Tuple[int, int]]:
+    for start in range(0, total, chunk):
+        yield start, min(start + chunk, total)
+
+
+def write_jsonl(
+    path: str,
+    spec: CorpusSpec,
+    distributions: Optional[Distributions] = None,
+    kinds: Sequence[str] = ("match",),
+    workers: int = 1,
+    chunk: int = 2000
+) -> int:
+    """
+    Escribe el corpus en JSONL (gzip si la ruta termina en .gz; "-" = stdout)
+    y devuelve el número de bytes sin comprimir. Con `workers > 1` genera los
+    tramos en paralelo conservando el orden.
+    """
+    distributions = distributions or Distributions.fallback()
+    total = max(spec.matches, spec.players if {"account", "league"} & set(kinds) else 0)
+    tasks = ((spec, distributions, start, stop, tuple(kinds)) for start, stop in _ranges(total, chunk))
+    if path == "-":
+        handle = sys.stdout.buffer
+    elif path.endswith(".gz"):
+        handle = gzip.open(path, "wb", compresslevel=3)
+    else:
+        handle = open(path, "wb")
+    written = 0
+    try:
+        if workers > 1:
+            with Pool(workers) as pool:
+                for block in pool.imap(_jsonl_chunk, tasks):
+                    handle.write(block)
+                    written += len(block)
+        else:
+            for task in tasks:
+                block = _jsonl_chunk(task)
+                handle.write(block)
+                written += len(block)
+    finally:
+        if handle is not sys.stdout.buffer:
+            handle.close()
+    return written
+
+
+def read_jsonl(path: str) -> Iterator[Tuple[str, dict]]:
+    """Lee un corpus escrito con write_jsonl"""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rb") as handle:
+        for line in handle:
+            record = orjson.loads(line)
+            yield record["kind"], record["data"]
+
+
+async def load_into_store(
+    documents: Iterator[Tuple[str, dict]],
+    store=None,
+    concurrency: int = 64
+) -> Dict[str, int]:
+    """
+    Carga partidas y timelines en el almacén de partidas (por defecto
+    `match_store`), que precalcula tarjetas, resúmenes y analítica.
+    """
+    if store is None:
+        from backend.services.match_store import match_store as store
+    counts = {"match": 0, "timeline": 0}
+    pending: set = set()
+    last_match: Dict[str, dict] = {}
+
+    async def save(kind: str, document: dict) -> None:
+        if kind == "match":
+            await store.save_match(document)
+        else:
+            match_id = document["metadata"]["matchId"]
+            await store.save_timeline(match_id, document, last_match.pop(match_id, None))
+
+    for kind, document in documents:
+        if kind not in counts:
+            continue
+        if kind == "match":
+            last_match[document["metadata"]["matchId"]] = document
+        counts[kind] += 1
+        pending.add(asyncio.ensure_future(save(kind, document)))
+        if len(pending) >= concurrency:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                task.result()
+        # Las partidas sin timeline no necesitan quedarse en memoria
+        if len(last_match) > concurrency * 4:
+            last_match.pop(next(iter(last_match)))
+    if pending:
+        await asyncio.gather(*pending)
+    return counts
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Generador de corpus sintético Match-V5")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--matches", type=int, default=100000)
+    parser.add_argument("--players", type=int, default=200000)
+    parser.add_argument("--span-days", type=int, default=90)
+    parser.add_argument("--timelines", action="store_true", help="Incluir timelines (unas 10 veces más datos)")
+    parser.add_argument("--players-docs", action="store_true", help="Incluir cuentas y entradas de liga")
+    parser.add_argument("--ddragon", action="store_true", help="Distribuciones desde Data Dragon (requiere red)")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--out", default="-", help="Fichero JSONL (.gz para comprimir); - = stdout")
+    parser.add_argument("--load", action="store_true", help="Cargar en match_store (Redis) en vez de escribir")
+    parser.add_argument("--from-file", help="Cargar un JSONL existente en match_store")
+    return parser.parse_args(argv)
+
+
+async def _load(args: argparse.Namespace, spec: CorpusSpec, distributions: Distributions, kinds: Tuple[str, ...]) -> Dict[str, int]:
+    from backend.services.cache import cache
+
+    await cache.connect()
+    try:
+        if args.from_file:
+            documents = read_jsonl(args.from_file)
+        else:
+            documents = CorpusGenerator(spec, distributions).iter_documents(0, spec.matches, kinds)
+        return await load_into_store(documents)
+    finally:
+        await cache.disconnect()
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = parse_args(argv)
+    spec = CorpusSpec(seed=args.seed, matches=args.matches, players=args.players, span_days=args.span_days)
+    distributions = asyncio.run(load_distributions()) if args.ddragon else Distributions.fallback()
+    kinds = ("match",) + (("timeline",) if args.timelines else ()) + (("account", "league") if args.players_docs else ())
+
+    started = time.perf_counter()
+    if args.load or args.from_file:
+        counts = asyncio.run(_load(args, spec, distributions, kinds))
+        summary = ", ".join(f"{count} {kind}" for kind, count in counts.items())
+    else:
+        written = write_jsonl(args.out, spec, distributions, kinds, workers=args.workers)
+        summary = f"{written / 1e6:.1f} MB JSONL"
+    elapsed = time.perf_counter() - started
+    print(f"{summary} en {elapsed:.1f} s ({spec.matches / elapsed:.0f} partidas/s)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,279 @@
+"""
+Servidor local que imita la API de Riot con datos sintéticos: latencia
+configurable, cabeceras X-App-Rate-Limit con ventanas deslizantes e
+inyección de respuestas 429 con Retry-After.
+
+Uso en proceso (sin red):
+
+    transport = RedirectTransport(httpx.ASGITransport(app=create_fake_riot_app()))
+
+o como servidor HTTP real en un hilo:
+
+    with FakeRiotServer(FakeRiotConfig(latency_ms=40)) as server:
+        transport = RedirectTransport(server.url)
+"""
+import asyncio
+import random
+import socket
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, List, Optional, Tuple, Union
+
+import httpx
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse
+
+from benchmarks import synthetic
+
+
+@dataclass
+class FakeRiotConfig:
+    """Parámetros del servidor falso"""
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    # Límites de aplicación "peticiones:segundos,..." (como X-App-Rate-Limit)
+    app_rate_limit: str = "2000:1,100000:120"
+    # Fracción de peticiones que responden 429 aunque no se supere el límite
+    error_429_rate: float = 0.0
+    retry_after: int = 1
+    pool_size: int = 10000
+    history_size: int = 600
+    apex_size: int = 300
+    seed: int = 0
+
+
+class SlidingWindowLimiter:
+    """Contador de peticiones por ventana deslizante, como los límites de Riot"""
+
+    def __init__(self, spec: str):
+        self.windows: List[Tuple[int, int]] = []
+        for part in spec.split(","):
+            limit, _, seconds = part.strip().partition(":")
+            if limit.isdigit() and seconds.isdigit():
+                self.windows.append((int(limit), int(seconds)))
+        self._hits: List[Deque[float]] = [deque() for _ in self.windows]
+
+    def hit(self, now: Optional[float] = None) -> Tuple[bool, int]:
+        """Registra una petición; devuelve (permitida, segundos de espera si no)"""
+        now = time.monotonic() if now is None else now
+        retry_after = 0
+        for (limit, seconds), hits in zip(self.windows, self._hits):
+            while hits and hits[0] <= now - seconds:
+                hits.popleft()
+            if len(hits) >= limit:
+                retry_after = max(retry_after, int(hits[0] + seconds - now) + 1)
+        if retry_after:
+            return False, retry_after
+        for hits in self._hits:
+            hits.append(now)
+        return True, 0
+
+    def limit_header(self) -> str:
+        return ",".join(f"{limit}:{seconds}" for limit, seconds in self.windows)
+
+    def count_header(self) -> str:
+        return ",".join(
+            f"{len(hits)}:{seconds}" for (_, seconds), hits in zip(self.windows, self._hits)
+        )
+
+
+def create_fake_riot_app(config: Optional[FakeRiotConfig] = None) -> FastAPI:
+    """Aplicación ASGI con las rutas de Riot que usa el backend"""
+    config = config or FakeRiotConfig()
+    limiter = SlidingWindowLimiter(config.app_rate_limit)
+    rng = random.Random(config.seed)
+    app = FastAPI(title="Fake Riot API")
+    app.state.config = config
+    app.state.limiter = limiter
+    app.state.requests = 0
+
+    @app.middleware("http")
+    async def riot_behaviour(request: Request, call_next):
+        app.state.requests += 1
+        delay = config.latency_ms + (rng.uniform(0, config.jitter_ms) if config.jitter_ms else 0)
+        if delay:
+            await asyncio.sleep(delay / 1000)
+
+        allowed, retry_after = limiter.hit()
+        if allowed and config.error_429_rate and rng.random() < config.error_429_rate:
+            allowed, retry_after = False, config.retry_after
+        if not allowed:
+            response = JSONResponse(
+                {"status": {"message": "Rate limit exceeded", "status_code": 429}},
+                status_code=429
+            )
+            response.headers["Retry-After"] = str(retry_after)
+            response.headers["X-Rate-Limit-Type"] = "application"
+        else:
+            response = await call_next(request)
+        response.headers["X-App-Rate-Limit"] = limiter.limit_header()
+        response.headers["X-App-Rate-Limit-Count"] = limiter.count_header()
+        return response
+
+    def puuid_from_summoner(summoner_id: str) -> str:
+        digits = summoner_id.rsplit("-", 1)[-1]
+        if not digits.isdigit():
+            raise HTTPException(status_code=404, detail="Data not found")
+        return synthetic.player_puuid(int(digits))
+
+    # ==================== ACCOUNT-V1 ====================
+
+    @app.get("/riot/account/v1/accounts/by-puuid/{puuid}")
+    async def account_by_puuid(puuid: str):
+        return synthetic.make_account(puuid)
+
+    @app.get("/riot/account/v1/accounts/by-riot-id/{game_name}/{tag_line}")
+    async def account_by_riot_id(game_name: str, tag_line: str):
+        digits = game_name[len("Jugador"):]
+        if not game_name.startswith("Jugador") or not digits.isdigit():
+            raise HTTPException(status_code=404, detail="Data not found")
+        return synthetic.make_account(synthetic.player_puuid(int(digits)))
+
+    # ==================== SUMMONER-V4 ====================
+
+    @app.get("/lol/summoner/v4/summoners/by-puuid/{puuid}")
+    async def summoner_by_puuid(puuid: str):
+        return synthetic.make_summoner(puuid)
+
+    @app.get("/lol/summoner/v4/summoners/{summoner_id}")
+    async def summoner_by_id(summoner_id: str):
+        return synthetic.make_summoner(puuid_from_summoner(summoner_id))
+
+    # ==================== MATCH-V5 ====================
+
+    @app.get("/lol/match/v5/matches/by-puuid/{puuid}/ids")
+    async def match_ids(
+        puuid: str,
+        start: int = 0,
+        count: int = Query(20, le=100),
+        startTime: Optional[int] = None,
+        endTime: Optional[int] = None
+    ):
+        ids = synthetic.match_ids_for(puuid, config.history_size)
+        if startTime is not None or endTime is not None:
+            low = (startTime or 0) * 1000
+            high = endTime * 1000 if endTime is not None else None
+            ids = [
+                match_id for match_id in ids
+                if synthetic.history_start_ms(synthetic.match_position(match_id)) >= low
+                and (high is None or synthetic.history_start_ms(synthetic.match_position(match_id)) <= high)
+            ]
+        return ids[start:start + count]
+
+    @app.get("/lol/match/v5/matches/{match_id}")
+    async def match_detail(match_id: str):
+        owner = synthetic.match_owner(match_id)
+        if owner is None:
+            raise HTTPException(status_code=404, detail="Data not found")
+        return synthetic.make_match(match_id, owner, config.pool_size)
+
+    # ==================== LEAGUE-V4 ====================
+
+    @app.get("/lol/league/v4/entries/by-puuid/{puuid}")
+    async def league_by_puuid(puuid: str):
+        return synthetic.make_league_entries(puuid)
+
+    @app.get("/lol/league/v4/entries/by-summoner/{summoner_id}")
+    async def league_by_summoner(summoner_id: str):
+        return synthetic.make_league_entries(puuid_from_summoner(summoner_id))
+
+    @app.get("/lol/league/v4/{tier}leagues/by-queue/{queue}")
+    async def apex_league(tier: str, queue: str):
+        if tier not in ("challenger", "grandmaster", "master"):
+            raise HTTPException(status_code=404, detail="Data not found")
+        return synthetic.make_apex_league(tier.upper(), config.apex_size, config.pool_size)
+
+    # ==================== SPECTATOR-V5 ====================
+
+    @app.get("/lol/spectator/v5/active-games/by-summoner/{summoner_id}")
+    async def active_game(summoner_id: str):
+        game = synthetic.make_active_game(puuid_from_summoner(summoner_id), config.pool_size)
+        if game is None:
+            raise HTTPException(status_code=404, detail="Data not found")
+        return game
+
+    # ==================== CHAMPION-MASTERY-V4 ====================
+
+    @app.get("/lol/champion-mastery/v4/champion-masteries/by-puuid/{puuid}/top")
+    async def mastery_top(puuid: str, count: int = 10):
+        return synthetic.make_mastery_top(puuid, count)
+
+    return app
+
+
+class RedirectTransport(httpx.AsyncBaseTransport):
+    """
+    Transporte httpx que reenvía las URLs de *.api.riotgames.com al servidor
+    falso, ya sea por HTTP (`target` es una URL base) o en proceso (`target`
+    es otro transporte, p. ej. httpx.ASGITransport).
+    """
+
+    def __init__(self, target: Union[str, httpx.AsyncBaseTransport]):
+        if isinstance(target, str):
+            self.base = httpx.URL(target)
+            self.transport: httpx.AsyncBaseTransport = httpx.AsyncHTTPTransport(
+                limits=httpx.Limits(max_connections=200, max_keepalive_connections=100)
+            )
+        else:
+            self.base = httpx.URL("http://fake-riot")
+            self.transport = target
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        request.url = request.url.copy_with(
+            scheme=self.base.scheme,
+            host=self.base.host,
+            port=self.base.port
+        )
+        request.headers["Host"] = request.url.netloc.decode("ascii")
+        return await self.transport.handle_async_request(request)
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+
+class FakeRiotServer:
+    """Ejecuta la aplicación falsa con uvicorn en un hilo en segundo plano"""
+
+    def __init__(self, config: Optional[FakeRiotConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        import uvicorn
+
+        self.app = create_fake_riot_app(config)
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._socket.bind((host, port))
+        self.host, self.port = self._socket.getsockname()[:2]
+        self._server = uvicorn.Server(uvicorn.Config(self.app, log_level="warning", access_log=False))
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def start(self) -> "FakeRiotServer":
+        self._thread = threading.Thread(
+            target=self._server.run,
+            kwargs={"sockets": [self._socket]},
+            name="fake-riot",
+            daemon=True
+        )
+        self._thread.start()
+        deadline = time.monotonic() + 10
+        while not self._server.started:
+            if time.monotonic() > deadline:
+                raise RuntimeError("El servidor Riot falso no arrancó")
+            time.sleep(0.01)
+        return self
+
+    def stop(self) -> None:
+        self._server.should_exit = True
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+        self._socket.close()
+
+    def __enter__(self) -> "FakeRiotServer":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.stop()
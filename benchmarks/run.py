@@ -0,0 +1,284 @@
+"""
+Ejecuta los benchmarks del backend contra el servidor Riot falso y guarda
+los resultados en JSON para comparar regresiones entre commits.
+
+    python -m benchmarks.run --requests 200 --concurrency 20 --latency-ms 30 \
+        --output benchmarks/results/actual.json --compare benchmarks/results/base.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Sequence
+
+import httpx
+
+from benchmarks import synthetic
+from benchmarks.fake_riot import FakeRiotConfig, FakeRiotServer, RedirectTransport, create_fake_riot_app
+
+
+# Rutas medidas; {puuid} se sustituye por un jugador del pool
+ROUTES = {
+    "profile_summary": "/api/profile/summary/{puuid}?season_year=2025",
+    "ranking_top": "/api/ranking/top?limit=50",
+    "player_stats": "/api/player/{puuid}/stats",
+    "player_live": "/api/player/{puuid}/live",
+}
+MICRO_SIZES = (10, 100, 500, 5000)
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """Percentil por el método del rango más cercano"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def latency_summary(latencies_ms: List[float]) -> dict:
+    return {
+        "p50_ms": round(percentile(latencies_ms, 50), 3),
+        "p90_ms": round(percentile(latencies_ms, 90), 3),
+        "p99_ms": round(percentile(latencies_ms, 99), 3),
+        "max_ms": round(max(latencies_ms, default=0.0), 3),
+        "mean_ms": round(sum(latencies_ms) / len(latencies_ms), 3) if latencies_ms else 0.0,
+    }
+
+
+async def bench_route(
+    client: httpx.AsyncClient,
+    template: str,
+    requests: int,
+    concurrency: int,
+    puuids: List[str]
+) -> dict:
+    """Lanza `requests` peticiones con `concurrency` simultáneas y mide latencias"""
+    rng = random.Random(template)
+    paths = [template.format(puuid=rng.choice(puuids)) for _ in range(requests)]
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(path: str) -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.get(path)
+            latencies.append((time.perf_counter() - start) * 1000)
+            key = str(response.status_code)
+            statuses[key] = statuses.get(key, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(path) for path in paths))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(requests / elapsed, 2) if elapsed else 0.0,
+        "statuses": statuses,
+        **latency_summary(latencies),
+    }
+
+
+def bench_function(func: Callable, args: tuple, repeat: int) -> dict:
+    """Mide una función síncrona `repeat` veces (mínimo, mediana y media en ms)"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        "repeat": repeat,
+        "min_ms": round(min(timings), 3),
+        "median_ms": round(percentile(timings, 50), 3),
+        "mean_ms": round(sum(timings) / len(timings), 3),
+    }
+
+
+def run_micro(sizes: Sequence[int], repeat: int) -> dict:
+    """Micro-benchmarks de las funciones de agregación sobre N partidas"""
+    from backend.services.aggregation import summarize_champion_stats
+    from backend.services.recommendations import recommendation_service
+
+    puuid = synthetic.player_puuid(1)
+    history = synthetic.match_ids_for(puuid, max(sizes))
+    matches = [synthetic.make_match(match_id, puuid) for match_id in history]
+    results = {}
+    for size in sizes:
+        subset = matches[:size]
+        # Menos repeticiones para los tamaños grandes
+        runs = max(1, repeat if size <= 500 else repeat // 5)
+        results[f"analyze_matches[{size}]"] = bench_function(
+            recommendation_service.analyze_matches, (subset, puuid), runs
+        )
+        results[f"summarize_champion_stats[{size}]"] = bench_function(
+            summarize_champion_stats, (subset, puuid), runs
+        )
+    return results
+
+
+async def run_routes(args: argparse.Namespace) -> dict:
+    """Mide las rutas del backend con el cliente Riot apuntando al servidor falso"""
+    from backend.main import app, riot_client
+    from backend.services.ddragon import ddragon
+    from backend.services.responses import response_cache
+
+    config = FakeRiotConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        app_rate_limit=args.rate_limit,
+        error_429_rate=args.error_429_rate,
+        retry_after=args.retry_after,
+        pool_size=args.pool,
+    )
+    server: Optional[FakeRiotServer] = None
+    if args.in_process:
+        fake_app = create_fake_riot_app(config)
+        transport = RedirectTransport(httpx.ASGITransport(app=fake_app))
+    else:
+        server = FakeRiotServer(config).start()
+        fake_app = server.app
+        transport = RedirectTransport(server.url)
+
+    # Data Dragon sin red: versión y campeones sintéticos
+    ddragon._version = "15.1.1"
+    ddragon._champions = synthetic.ddragon_champions()
+
+    original_client = riot_client._client
+    riot_client._client = httpx.AsyncClient(
+        transport=transport,
+        headers=original_client.headers,
+        timeout=httpx.Timeout(30.0)
+    )
+    puuids = [synthetic.player_puuid(i) for i in range(args.players)]
+    selected = args.routes or list(ROUTES)
+    results = {}
+    try:
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app),
+            base_url="http://bench",
+            timeout=httpx.Timeout(300.0)
+        ) as client:
+            for name in selected:
+                if args.cold:
+                    response_cache.clear()
+                riot_before = fake_app.state.requests
+                results[name] = await bench_route(
+                    client, ROUTES[name], args.requests, args.concurrency, puuids
+                )
+                results[name]["riot_requests"] = fake_app.state.requests - riot_before
+                print(
+                    f"{name:<18} {results[name]['throughput_rps']:>9.1f} req/s  "
+                    f"p50 {results[name]['p50_ms']:>8.1f} ms  p99 {results[name]['p99_ms']:>8.1f} ms",
+                    file=sys.stderr
+                )
+    finally:
+        await riot_client._client.aclose()
+        riot_client._client = original_client
+        if server is not None:
+            server.stop()
+    return results
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment() -> dict:
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> List[str]:
+    """
+    Compara p50/p99 de rutas y medianas de micro-benchmarks contra una base.
+    Devuelve las métricas que empeoran más de `threshold` (0.1 = 10%).
+    """
+    regressions = []
+    pairs = [("routes", ("p50_ms", "p99_ms")), ("micro", ("median_ms",))]
+    for section, metrics in pairs:
+        for name, values in current.get(section, {}).items():
+            base = baseline.get(section, {}).get(name)
+            if not base:
+                continue
+            for metric in metrics:
+                before, after = base.get(metric), values.get(metric)
+                if not before or after is None:
+                    continue
+                change = (after - before) / before
+                line = f"{section}.{name}.{metric}: {before:.2f} -> {after:.2f} ({change:+.1%})"
+                print(line, file=sys.stderr)
+                if change > threshold:
+                    regressions.append(line)
+    return regressions
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmarks del backend contra un servidor Riot falso")
+    parser.add_argument("--routes", nargs="*", choices=list(ROUTES), help="Rutas a medir (por defecto todas)")
+    parser.add_argument("--requests", type=int, default=100, help="Peticiones por ruta")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--players", type=int, default=50, help="Tamaño del pool de jugadores consultados")
+    parser.add_argument("--pool", type=int, default=10000, help="Jugadores distintos en las partidas sintéticas")
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--jitter-ms", type=float, default=10.0)
+    parser.add_argument("--rate-limit", default="2000:1,100000:120", help="Límites X-App-Rate-Limit del servidor falso")
+    parser.add_argument("--error-429-rate", type=float, default=0.0, help="Fracción de 429 inyectados")
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--cold", action="store_true", help="Vaciar la caché de respuestas antes de cada ruta")
+    parser.add_argument("--in-process", action="store_true", help="Servidor falso en proceso (ASGI) en vez de HTTP")
+    parser.add_argument("--micro-sizes", type=int, nargs="*", default=list(MICRO_SIZES))
+    parser.add_argument("--micro-repeat", type=int, default=10)
+    parser.add_argument("--skip-routes", action="store_true")
+    parser.add_argument("--skip-micro", action="store_true")
+    parser.add_argument("--output", help="Ruta del JSON de resultados")
+    parser.add_argument("--compare", help="JSON de una ejecución anterior para comparar")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Empeoramiento tolerado al comparar")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = parse_args(argv)
+    results = {"environment": environment(), "config": vars(args)}
+    if not args.skip_routes:
+        results["routes"] = asyncio.run(run_routes(args))
+    if not args.skip_micro and args.micro_sizes:
+        results["micro"] = run_micro(args.micro_sizes, args.micro_repeat)
+
+    payload = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as handle:
+            handle.write(payload + "\n")
+    else:
+        print(payload)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as handle:
+            regressions = compare(results, json.load(handle), args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regresiones por encima del {args.threshold:.0%}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
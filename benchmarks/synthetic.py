@@ -0,0 +1,269 @@
+"""
+Documentos sintéticos con la forma de la API de Riot (Match-V5, League-V4,
+Account-V1, Summoner-V4, Spectator-V5), deterministas a partir de sus IDs
+"""
+import random
+import zlib
+from typing import List, Optional
+
+
+PLATFORM = "LA1"
+QUEUES = (420, 420, 420, 440, 450)
+POSITIONS = ("TOP", "JUNGLE", "MIDDLE", "BOTTOM", "UTILITY")
+TIERS = ("IRON", "BRONZE", "SILVER", "GOLD", "PLATINUM", "EMERALD", "DIAMOND")
+DIVISIONS = ("IV", "III", "II", "I")
+
+# (championId, nombre) de un subconjunto de campeones reales
+CHAMPIONS = [
+    (266, "Aatrox"), (103, "Ahri"), (84, "Akali"), (12, "Alistar"), (32, "Amumu"),
+    (22, "Ashe"), (53, "Blitzcrank"), (51, "Caitlyn"), (122, "Darius"), (119, "Draven"),
+    (81, "Ezreal"), (114, "Fiora"), (86, "Garen"), (104, "Graves"), (39, "Irelia"),
+    (59, "JarvanIV"), (222, "Jinx"), (145, "Kaisa"), (64, "LeeSin"), (99, "Lux"),
+    (21, "MissFortune"), (25, "Morgana"), (76, "Nidalee"), (61, "Orianna"), (235, "Senna"),
+    (91, "Talon"), (412, "Thresh"), (4, "TwistedFate"), (67, "Vayne"), (157, "Yasuo"),
+]
+ITEMS = [3031, 3089, 3157, 6655, 3020, 3006, 3071, 3153, 6672, 3072, 3102, 3135, 3165, 4645, 3053]
+SPELLS = [4, 14, 12, 7, 11, 3, 21]
+KEYSTONES = [8005, 8008, 8010, 8112, 8128, 8214, 8229, 8230, 8437, 8439, 8351, 8369]
+
+# Fin del historial sintético (2025-07-01 UTC); una partida por hora hacia atrás
+HISTORY_END_MS = 1_751_328_000_000
+HOUR_MS = 3_600_000
+
+
+def _rng(*parts) -> random.Random:
+    """Generador determinista a partir de una clave"""
+    return random.Random(zlib.crc32(":".join(str(p) for p in parts).encode()))
+
+
+def player_puuid(index: int) -> str:
+    return f"bench-puuid-{index:06d}"
+
+
+def player_index(puuid: str) -> int:
+    try:
+        return int(puuid.rsplit("-", 1)[-1])
+    except ValueError:
+        return zlib.crc32(puuid.encode()) % 1_000_000
+
+
+def summoner_id(puuid: str) -> str:
+    return f"bench-summ-{player_index(puuid):06d}"
+
+
+def make_account(puuid: str) -> dict:
+    index = player_index(puuid)
+    return {"puuid": puuid, "gameName": f"Jugador{index}", "tagLine": "LAN"}
+
+
+def make_summoner(puuid: str) -> dict:
+    rng = _rng("summoner", puuid)
+    return {
+        "id": summoner_id(puuid),
+        "puuid": puuid,
+        "profileIconId": rng.randint(1, 5000),
+        "revisionDate": 1_700_000_000_000,
+        "summonerLevel": rng.randint(30, 900),
+    }
+
+
+def make_league_entries(puuid: str) -> List[dict]:
+    rng = _rng("league", puuid)
+    if rng.random() < 0.2:
+        return []
+    wins, losses = rng.randint(10, 300), rng.randint(10, 300)
+    return [{
+        "leagueId": "bench-league",
+        "queueType": "RANKED_SOLO_5x5",
+        "tier": rng.choice(TIERS),
+        "rank": rng.choice(DIVISIONS),
+        "summonerId": summoner_id(puuid),
+        "puuid": puuid,
+        "leaguePoints": rng.randint(0, 99),
+        "wins": wins,
+        "losses": losses,
+        "veteran": False,
+        "inactive": False,
+        "freshBlood": False,
+        "hotStreak": rng.random() < 0.1,
+    }]
+
+
+def make_apex_league(tier: str, size: int, pool_size: int) -> dict:
+    rng = _rng("apex", tier)
+    base = {"CHALLENGER": 1000, "GRANDMASTER": 500, "MASTER": 0}.get(tier, 0)
+    entries = []
+    for i in range(size):
+        puuid = player_puuid(rng.randrange(pool_size))
+        entries.append({
+            "summonerId": summoner_id(puuid),
+            "puuid": puuid,
+            "leaguePoints": base + rng.randint(0, 800),
+            "rank": "I",
+            "wins": rng.randint(100, 600),
+            "losses": rng.randint(100, 600),
+            "veteran": False,
+            "inactive": False,
+            "freshBlood": False,
+            "hotStreak": False,
+        })
+    return {"tier": tier, "leagueId": f"bench-{tier.lower()}", "queue": "RANKED_SOLO_5x5", "name": tier, "entries": entries}
+
+
+def match_ids_for(puuid: str, total: int = 600) -> List[str]:
+    """Historial completo (más reciente primero) de un jugador"""
+    index = player_index(puuid)
+    return [f"{PLATFORM}_{index:06d}{n:04d}" for n in range(total)]
+
+
+def match_owner(match_id: str) -> Optional[str]:
+    """PUUID del jugador a cuyo historial pertenece la partida"""
+    digits = match_id.rsplit("_", 1)[-1]
+    if len(digits) != 10 or not digits.isdigit():
+        return None
+    return player_puuid(int(digits[:6]))
+
+
+def match_position(match_id: str) -> int:
+    """Posición en el historial (0 = más reciente), de los últimos 4 dígitos"""
+    return int(match_id[-4:]) if match_id[-4:].isdigit() else 0
+
+
+def history_start_ms(position: int) -> int:
+    """Inicio aproximado (hora completa) de la partida en esa posición"""
+    return HISTORY_END_MS - position * HOUR_MS
+
+
+def _participant(rng: random.Random, puuid: str, participant_id: int, team_id: int, win: bool) -> dict:
+    champion_id, champion_name = rng.choice(CHAMPIONS)
+    position = POSITIONS[(participant_id - 1) % 5]
+    kills, deaths, assists = rng.randint(0, 15), rng.randint(0, 12), rng.randint(0, 20)
+    spells = rng.sample(SPELLS, 2)
+    account = make_account(puuid)
+    participant = {
+        "participantId": participant_id,
+        "puuid": puuid,
+        "riotIdGameName": account["gameName"],
+        "riotIdTagline": account["tagLine"],
+        "summonerId": summoner_id(puuid),
+        "championId": champion_id,
+        "championName": champion_name,
+        "teamId": team_id,
+        "teamPosition": position,
+        "individualPosition": position,
+        "lane": position if position != "UTILITY" else "BOTTOM",
+        "role": "SOLO",
+        "win": win,
+        "kills": kills,
+        "deaths": deaths,
+        "assists": assists,
+        "champLevel": rng.randint(10, 18),
+        "totalMinionsKilled": rng.randint(20, 280),
+        "neutralMinionsKilled": rng.randint(0, 40),
+        "visionScore": rng.randint(5, 80),
+        "totalDamageDealtToChampions": rng.randint(5000, 45000),
+        "goldEarned": rng.randint(6000, 18000),
+        "summoner1Id": spells[0],
+        "summoner2Id": spells[1],
+        "perks": {
+            "statPerks": {"defense": 5002, "flex": 5008, "offense": 5005},
+            "styles": [
+                {"description": "primaryStyle", "style": 8100, "selections": [{"perk": rng.choice(KEYSTONES)}]},
+                {"description": "subStyle", "style": 8200, "selections": []},
+            ],
+        },
+    }
+    for slot, item in enumerate(rng.sample(ITEMS, 6)):
+        participant[f"item{slot}"] = item
+    participant["item6"] = 3340
+    return participant
+
+
+def make_match(match_id: str, owner_puuid: Optional[str] = None, pool_size: int = 10000) -> dict:
+    """Partida Match-V5 determinista; `owner_puuid` ocupa siempre el primer puesto"""
+    rng = _rng("match", match_id)
+    puuids = [player_puuid(rng.randrange(pool_size)) for _ in range(10)]
+    if owner_puuid:
+        puuids[0] = owner_puuid
+    blue_wins = rng.random() < 0.5
+    duration = rng.randint(900, 2400)
+    creation = history_start_ms(match_position(match_id)) + rng.randint(0, 600_000)
+    participants = [
+        _participant(rng, puuid, pid + 1, 100 if pid < 5 else 200, blue_wins == (pid < 5))
+        for pid, puuid in enumerate(puuids)
+    ]
+    return {
+        "metadata": {"dataVersion": "2", "matchId": match_id, "participants": puuids},
+        "info": {
+            "gameCreation": creation,
+            "gameStartTimestamp": creation + 30_000,
+            "gameEndTimestamp": creation + 30_000 + duration * 1000,
+            "gameDuration": duration,
+            "gameId": zlib.crc32(match_id.encode()),
+            "gameMode": "CLASSIC",
+            "gameType": "MATCHED_GAME",
+            "gameVersion": "15.1.640.1234",
+            "mapId": 11,
+            "platformId": PLATFORM,
+            "queueId": rng.choice(QUEUES),
+            "participants": participants,
+            "teams": [
+                {"teamId": 100, "win": blue_wins, "bans": [], "objectives": {}},
+                {"teamId": 200, "win": not blue_wins, "bans": [], "objectives": {}},
+            ],
+        },
+    }
+
+
+def make_active_game(puuid: str, pool_size: int = 10000) -> Optional[dict]:
+    """Partida en vivo para ~30% de los jugadores; None si no está en partida"""
+    rng = _rng("live", puuid)
+    if rng.random() >= 0.3:
+        return None
+    puuids = [puuid] + [player_puuid(rng.randrange(pool_size)) for _ in range(9)]
+    return {
+        "gameId": zlib.crc32(puuid.encode()),
+        "mapId": 11,
+        "gameMode": "CLASSIC",
+        "gameType": "MATCHED",
+        "gameQueueConfigId": 420,
+        "gameStartTime": HISTORY_END_MS,
+        "gameLength": rng.randint(0, 1800),
+        "platformId": PLATFORM,
+        "participants": [
+            {
+                "puuid": p,
+                "summonerId": summoner_id(p),
+                "teamId": 100 if i < 5 else 200,
+                "championId": rng.choice(CHAMPIONS)[0],
+                "spell1Id": 4,
+                "spell2Id": 14,
+                "profileIconId": 1,
+                "bot": False,
+            }
+            for i, p in enumerate(puuids)
+        ],
+        "bannedChampions": [],
+    }
+
+
+def make_mastery_top(puuid: str, count: int = 10) -> List[dict]:
+    rng = _rng("mastery", puuid)
+    champions = rng.sample(CHAMPIONS, min(count, len(CHAMPIONS)))
+    return [
+        {
+            "puuid": puuid,
+            "championId": champion_id,
+            "championLevel": rng.randint(1, 50),
+            "championPoints": rng.randint(1000, 900000),
+        }
+        for champion_id, _ in champions
+    ]
+
+
+def ddragon_champions() -> dict:
+    """Tabla mínima con la forma de champion.json de Data Dragon"""
+    return {
+        name: {"id": name, "key": str(champion_id), "name": name, "tags": ["Fighter"]}
+        for champion_id, name in CHAMPIONS
+    }
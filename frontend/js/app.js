@@ -16,6 +16,7 @@ const state = {
     runeIndex: {},
     matches: [],
     matchesLoaded: 0,
+    lastMatchId: null,
     championStats: {},
     championStatsList: [],
     championStatsExpanded: false,
@@ -294,6 +295,8 @@ function setupEvents() {
     $('#load-more-btn')?.addEventListener('click', loadMoreMatches);
     $('#match-queue-filter')?.addEventListener('change', filterMatches);
     $('#champion-stats-toggle')?.addEventListener('click', toggleChampionStatsView);
+    $('#champion-stats-period')?.addEventListener('change', reloadChampionStats);
+    $('#champion-stats-queue')?.addEventListener('change', reloadChampionStats);
     
     // Modal
     $('#modal-close')?.addEventListener('click', closeModal);
@@ -477,6 +480,7 @@ async function loadProfile() {
     state.summoner = summoner;
     state.matches = [];
     state.matchesLoaded = 0;
+    state.lastMatchId = null;
     state.championStats = {};
     state.championStatsList = [];
     state.championStatsExpanded = false;
@@ -792,6 +796,8 @@ function renderMasteryList(masteries) {
 async function loadMatches(matchIds) {
     const container = $('#matches-container');
     let rateLimited = false;
+    // "Cargar más" sigue tras la última pedida aunque alguna no llegue a cargarse
+    if (matchIds.length) state.lastMatchId = matchIds[matchIds.length - 1];
 
     for (const id of matchIds) {
         let match = null;
@@ -888,6 +894,23 @@ function renderChampionStatsList() {
     }
 }
 
+// Estadísticas de campeones filtradas por periodo y cola (rollups diarios del backend)
+async function reloadChampionStats() {
+    const period = $('#champion-stats-period')?.value || 'season';
+    const queue = $('#champion-stats-queue')?.value || 'all';
+    let url = `/api/profile/summary/${state.puuid}?region=${state.region}`;
+    if (period !== 'season') url += `&days=${period}`;
+    if (queue !== 'all') url += `&queue=${queue}`;
+    try {
+        const summary = await api(url);
+        setChampionStatsFromSummary(summary?.champions || []);
+    } catch (err) {
+        console.warn('Champion stats fetch failed', err);
+        state.championStatsList = [];
+    }
+    renderChampionStatsList();
+}
+
 function toggleChampionStatsView() {
     state.championStatsExpanded = !state.championStatsExpanded;
     renderChampionStatsList();
@@ -1061,7 +1084,8 @@ async function loadMoreMatches() {
     btn.disabled = true;
     
     try {
-        const ids = await api(`/api/matches/${state.puuid}?region=${state.region}&start=${state.matchesLoaded}&count=10`);
+        const after = state.lastMatchId ? `&after=${encodeURIComponent(state.lastMatchId)}` : '';
+        const ids = await api(`/api/matches/${state.puuid}?region=${state.region}&start=${state.matchesLoaded}&count=10${after}`);
         if (ids?.length) await loadMatches(ids);
         if (ids.length < 10) btn.classList.add('hidden');
     } catch (err) {
@@ -1380,88 +1404,97 @@ async function checkLiveGame() {
     }
 }
 
+// Lee una respuesta NDJSON y llama a onLine con cada objeto según llega
+async function readNdjson(res, onLine) {
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const lines = buffer.split('\n');
+        buffer = lines.pop();
+        lines.filter(Boolean).forEach(line => onLine(JSON.parse(line)));
+    }
+    if (buffer.trim()) onLine(JSON.parse(buffer));
+}
+
+function renderScoutCard(card) {
+    const meta = document.querySelector(`.live-player[data-puuid="${card.puuid}"] .live-player-meta`);
+    if (!meta) return;
+    const solo = Array.isArray(card.ranked) ? card.ranked.find(r => r.queueType === 'RANKED_SOLO_5x5') : null;
+    const recent = card.recent;
+    let html = solo ? `<span class="live-rank">${solo.tier} ${solo.rank || ''}</span>` : '<span class="live-rank">Unranked</span>';
+    if (recent?.champion_games) {
+        html += `<span class="live-wr">${recent.champion_winrate}% WR · ${recent.champion_kda} KDA (${recent.champion_games})</span>`;
+    } else if (recent?.games) {
+        html += `<span class="live-wr">${recent.winrate}% WR reciente</span>`;
+    }
+    meta.innerHTML = html;
+}
+
 async function showLiveGame() {
     try {
-        if (!state.summoner?.id) {
+        if (!state.puuid) {
             showError('No se pudo obtener la información del invocador');
             return;
         }
-        const live = await api(`/api/live/${state.summoner.id}?region=${state.region}`);
+        // Scouting en streaming: la partida primero y cada jugador según se completa
+        const res = await fetch(`/api/player/${state.puuid}/live/scout?region=${state.region}`);
+        if (!res.ok || !(res.headers.get('content-type') || '').includes('ndjson')) return;
         
-        const blue = live.participants.filter(p => p.teamId === 100);
-        const red = live.participants.filter(p => p.teamId === 200);
+        const renderTeam = team => team.map(p => {
+            const isCurrent = p.puuid === state.puuid;
+            return `
+                <div class="live-player ${isCurrent ? 'current' : ''}" data-puuid="${p.puuid}">
+                    <img src="${getChampionIcon(p.championId)}" class="live-champ-icon">
+                    <div class="live-player-info">
+                        <div class="live-player-name">${p.riotId || p.summonerName || 'Jugador'}</div>
+                        <div class="live-player-meta"><span class="live-wr">Cargando...</span></div>
+                    </div>
+                    <div class="live-spells">
+                        <img src="${getSpellIcon(p.spell1Id)}" class="live-spell">
+                        <img src="${getSpellIcon(p.spell2Id)}" class="live-spell">
+                    </div>
+                </div>
+            `;
+        }).join('');
         
-        // Cargar datos adicionales de cada jugador
-        const renderTeamEnhanced = async (team) => {
-            const playersHtml = await Promise.all(team.map(async (p) => {
-                let rankInfo = '';
-                let recentWR = '';
-                
-                // Intentar obtener ranked info
-                try {
-                    const summoner = await api(`/api/summoner/by-name/${encodeURIComponent(p.summonerName || p.riotId)}?region=${state.region}`).catch(() => null);
-                    if (summoner?.id) {
-                        const ranked = await api(`/api/ranked/by-summoner/${summoner.id}?region=${state.region}`).catch(() => []);
-                        const solo = Array.isArray(ranked) ? ranked.find(r => r.queueType === 'RANKED_SOLO_5x5') : null;
-                        if (solo) {
-                            const wr = Math.round((solo.wins / (solo.wins + solo.losses)) * 100);
-                            rankInfo = `<span class="live-rank">${solo.tier} ${solo.rank}</span>`;
-                            recentWR = `<span class="live-wr">${wr}% WR</span>`;
-                        }
-                    }
-                } catch {}
-                
-                const isCurrent = p.summonerId === state.summoner?.id || p.puuid === state.puuid;
-                
-                return `
-                    <div class="live-player ${isCurrent ? 'current' : ''}">
-                        <img src="${getChampionIcon(p.championId)}" class="live-champ-icon">
-                        <div class="live-player-info">
-                            <div class="live-player-name">${p.riotId || p.summonerName || 'Jugador'}</div>
-                            <div class="live-player-meta">
-                                ${rankInfo}
-                                ${recentWR}
-                            </div>
+        const renderGame = live => {
+            const blue = live.participants.filter(p => p.teamId === 100);
+            const red = live.participants.filter(p => p.teamId === 200);
+            $('#modal-body').innerHTML = `
+                <div class="modal-header">
+                    <div>
+                        <div class="live-indicator">
+                            <span class="live-dot"></span>
+                            EN VIVO
                         </div>
-                        <div class="live-spells">
-                            <img src="${getSpellIcon(p.spell1Id)}" class="live-spell">
-                            <img src="${getSpellIcon(p.spell2Id)}" class="live-spell">
+                        <div style="color: var(--text-secondary); font-size: 0.9rem; margin-top: 4px;">
+                            ${queueNames[live.gameQueueConfigId] || 'Partida'} · ${formatDuration(Math.floor(live.gameLength || 0))}
                         </div>
                     </div>
-                `;
-            }));
-            return playersHtml.join('');
-        };
-        
-        const blueHtml = await renderTeamEnhanced(blue);
-        const redHtml = await renderTeamEnhanced(red);
-        
-        $('#modal-body').innerHTML = `
-            <div class="modal-header">
-                <div>
-                    <div class="live-indicator">
-                        <span class="live-dot"></span>
-                        EN VIVO
+                </div>
+                <div class="live-teams">
+                    <div class="live-team blue">
+                        <div class="live-team-header">Equipo Azul</div>
+                        ${renderTeam(blue)}
                     </div>
-                    <div style="color: var(--text-secondary); font-size: 0.9rem; margin-top: 4px;">
-                        ${queueNames[live.gameQueueConfigId] || 'Partida'} · ${formatDuration(Math.floor(live.gameLength))}
+                    <div class="live-team red">
+                        <div class="live-team-header">Equipo Rojo</div>
+                        ${renderTeam(red)}
                     </div>
                 </div>
-            </div>
-            <div class="live-teams">
-                <div class="live-team blue">
-                    <div class="live-team-header">Equipo Azul</div>
-                    ${blueHtml}
-                </div>
-                <div class="live-team red">
-                    <div class="live-team-header">Equipo Rojo</div>
-                    ${redHtml}
-                </div>
-            </div>
-        `;
+            `;
+            $('#match-modal').classList.remove('hidden');
+            document.body.style.overflow = 'hidden';
+        };
         
-        $('#match-modal').classList.remove('hidden');
-        document.body.style.overflow = 'hidden';
+        await readNdjson(res, line => {
+            if (line.type === 'game') renderGame(line.game);
+            else if (line.type === 'participant') renderScoutCard(line.card);
+        });
     } catch (err) {
         console.error('Live game error:', err);
     }
@@ -1477,6 +1510,7 @@ async function refreshProfile() {
         $('#matches-container').innerHTML = '';
         state.matches = [];
         state.matchesLoaded = 0;
+        state.lastMatchId = null;
         state.championStats = {};
         await loadProfile();
     } catch (err) {
@@ -0,0 +1,52 @@
+"""
+Configuración de gunicorn para el modo multiproceso:
+
+    gunicorn -c gunicorn.conf.py backend.main:app
+
+Con preload_app la aplicación se importa una vez en el proceso maestro; los
+datos estáticos se precargan y se congelan antes del fork, de modo que los
+workers (uvicorn, uno por núcleo por defecto) los comparten copy-on-write.
+"""
+import glob
+import multiprocessing
+import os
+import tempfile
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = 30
+keepalive = 5
+# Reciclar workers de forma escalonada acota la fragmentación de memoria
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "0"))
+max_requests_jitter = max_requests // 10
+accesslog = "-"
+
+# /metrics agrega todos los workers. prometheus_client lee la variable al
+# importarse, así que se fija aquí, antes de que preload_app cargue la app.
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "prometheus_multiproc"))
+
+
+def on_starting(server):
+    """Vacía el directorio de métricas: los ficheros de una ejecución anterior se sumarían a los nuevos"""
+    path = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    os.makedirs(path, exist_ok=True)
+    for stale in glob.glob(os.path.join(path, "*.db")):
+        os.remove(stale)
+
+
+def when_ready(server):
+    """Proceso maestro, con la app ya importada y antes de crear los workers"""
+    from backend.services.preload import preload_before_fork
+
+    counts = preload_before_fork()
+    server.log.info("Datos compartidos precargados: %s", counts)
+
+
+def child_exit(server, worker):
+    """Descarta las métricas del worker terminado"""
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
@@ -136,3 +136,1166 @@ async def test_fetch_match_details_retries_on_rate_limit(monkeypatch):
     results = await main.fetch_match_details(["A"], routing="americas", concurrency=1)
     assert attempts["A"] == 2  # hubo reintento
     assert results and results[0]["metadata"]["matchId"] == "A"
+
+
+def test_match_route_caches_encoded_and_compressed_body(monkeypatch):
+    """Las partidas se serializan una vez y se sirven comprimidas desde la caché"""
+    from backend.services.responses import response_cache
+    response_cache.clear()
+    calls = {"count": 0}
+
+    async def mock_get_match(match_id, routing):
+        calls["count"] += 1
+        participants = [{"puuid": f"p{i}", "championName": "Ahri", "kills": i} for i in range(10)]
+        return {"success": True, "data": {"metadata": {"matchId": match_id}, "info": {"participants": participants * 10}}}
+
+    monkeypatch.setattr(main.riot_client, "get_match_by_id", mock_get_match)
+
+    first = client.get("/api/match/LA1_1?region=la1", headers={"Accept-Encoding": "gzip"})
+    second = client.get("/api/match/LA1_1?region=la1", headers={"Accept-Encoding": "gzip"})
+    assert first.status_code == 200
+    assert first.headers["content-encoding"] == "gzip"
+    assert second.json() == first.json()
+    assert second.json()["metadata"]["matchId"] == "LA1_1"
+    assert calls["count"] == 1
+    response_cache.clear()
+
+
+def test_negotiate_encoding_respects_quality_values():
+    from backend.services import responses
+
+    assert responses.negotiate_encoding("") is None
+    assert responses.negotiate_encoding("gzip;q=0, identity") is None
+    assert responses.negotiate_encoding("gzip, deflate") == "gzip"
+    expected = "br" if responses.brotli is not None else "gzip"
+    assert responses.negotiate_encoding("gzip, br") == expected
+
+
+def test_cached_routes_support_conditional_get(monkeypatch):
+    """Las rutas cacheadas exponen ETag y responden 304 a If-None-Match"""
+    from backend.services.responses import response_cache
+    response_cache.clear()
+
+    async def mock_get_timeline(match_id, routing):
+        return {"success": True, "data": {"info": {"frames": []}}}
+
+    monkeypatch.setattr(main.riot_client, "get_match_timeline", mock_get_timeline)
+
+    first = client.get("/api/match/LA1_2/timeline")
+    etag = first.headers["etag"]
+    assert etag.startswith('"')
+    assert "immutable" in first.headers["cache-control"]
+
+    revalidated = client.get("/api/match/LA1_2/timeline", headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+    assert revalidated.headers["etag"] == etag
+
+    stale = client.get("/api/match/LA1_2/timeline", headers={"If-None-Match": '"otro"'})
+    assert stale.status_code == 200
+    response_cache.clear()
+
+    # Cada codificación tiene su ETag; If-None-Match acepta cualquiera, fuerte o débil
+    from starlette.requests import Request
+    from backend.services.responses import EncodedPayload
+
+    def request(headers):
+        return Request({"type": "http", "headers": [(k.encode(), v.encode()) for k, v in headers.items()]})
+
+    payload = EncodedPayload(b"[" + b"1," * 1000 + b"1]", 60)
+    plain = payload.to_response(request({}))
+    gzipped = payload.to_response(request({"accept-encoding": "gzip"}))
+    assert plain.headers["etag"] == payload.etag
+    assert gzipped.headers["etag"] == payload.etag[:-1] + '-gzip"'
+    revalidated = payload.to_response(request({"accept-encoding": "gzip", "if-none-match": "W/" + gzipped.headers["etag"]}))
+    assert revalidated.status_code == 304 and revalidated.headers["etag"] == gzipped.headers["etag"]
+    assert payload.to_response(request({"if-none-match": gzipped.headers["etag"]})).status_code == 304
+
+    # El contador de bytes de la caché incluye las variantes comprimidas
+    from backend.services.responses import ResponseCache
+    bounded = ResponseCache(max_bytes=3000)
+    first_payload = EncodedPayload(b"[" + b"2," * 1000 + b"2]", 60)
+    bounded.put("a", first_payload)
+    first_payload.to_response(request({"accept-encoding": "gzip"}))
+    assert bounded.total_bytes == first_payload.size > len(first_payload.body)
+    bounded.put("b", EncodedPayload(b"[" + b"3," * 1000 + b"3]", 60))
+    assert bounded.get("a") is None and bounded.total_bytes == bounded.get("b").size
+
+
+def test_match_card_view_and_field_projection(monkeypatch):
+    """view=card devuelve la tarjeta compacta y fields proyecta rutas anidadas"""
+    from backend.services.responses import response_cache
+    response_cache.clear()
+
+    async def mock_get_match(match_id, routing):
+        return {"success": True, "data": {
+            "metadata": {"matchId": match_id, "participants": ["p1"]},
+            "info": {
+                "gameDuration": 1500,
+                "queueId": 420,
+                "participants": [{
+                    "puuid": "p1", "championId": 103, "championName": "Ahri",
+                    "kills": 5, "deaths": 1, "assists": 7,
+                    "totalMinionsKilled": 150, "neutralMinionsKilled": 10,
+                    "item0": 6655, "summoner1Id": 4, "summoner2Id": 14,
+                    "challenges": {"kda": 12.0}
+                }]
+            }
+        }}
+
+    monkeypatch.setattr(main.riot_client, "get_match_by_id", mock_get_match)
+
+    card = client.get("/api/match/LA1_3?view=card").json()
+    assert card["matchId"] == "LA1_3"
+    assert card["participants"][0]["cs"] == 160
+    assert card["participants"][0]["spells"] == [4, 14]
+    assert "challenges" not in card["participants"][0]
+
+    projected = client.get("/api/match/LA1_3?fields=info.queueId,info.participants.kills").json()
+    assert projected == {"info": {"queueId": 420, "participants": [{"kills": 5}]}}
+    response_cache.clear()
+
+
+def test_timeline_analytics_lane_diffs_and_objectives():
+    from backend.services.timeline_analytics import compute_timeline_analytics, summarize_lane_phase
+
+    def frame(minute, events=()):
+        participant_frames = {
+            str(pid): {
+                "totalGold": 500 + minute * (400 if pid == 3 else 300),
+                "xp": minute * 350,
+                "minionsKilled": minute * (8 if pid == 3 else 6),
+                "jungleMinionsKilled": 0
+            }
+            for pid in range(1, 11)
+        }
+        return {"timestamp": minute * 60000, "participantFrames": participant_frames, "events": list(events)}
+
+    frames = [frame(m) for m in range(16)]
+    # Como en Riot, el evento especial de primera sangre llega junto a la kill y sin victimId
+    frames[3]["events"] = [
+        {"type": "CHAMPION_SPECIAL_KILL", "killType": "KILL_FIRST_BLOOD", "killerId": 3, "timestamp": 180500},
+        {"type": "CHAMPION_KILL", "killerId": 3, "victimId": 8, "timestamp": 180500},
+    ]
+    frames[4]["events"] = [{"type": "CHAMPION_KILL", "killerId": 8, "victimId": 3, "timestamp": 240000}]
+    frames[8]["events"] = [{"type": "ELITE_MONSTER_KILL", "killerTeamId": 100, "monsterType": "DRAGON", "timestamp": 480000}]
+    timeline = {
+        "metadata": {"matchId": "LA1_9"},
+        "info": {
+            "frameInterval": 60000,
+            "frames": frames,
+            "participants": [{"participantId": pid, "puuid": f"p{pid}"} for pid in range(1, 11)]
+        }
+    }
+
+    analytics = compute_timeline_analytics(timeline)
+    mid = analytics["players"]["p3"]
+    assert mid["opponentId"] == 8
+    assert mid["gold_diff_at_10"] == 1000
+    assert mid["cs_diff_at_15"] == 30
+    assert mid["first_blood_kill"] is True
+    assert analytics["players"]["p8"]["first_blood_victim"] is True
+    assert analytics["first_objectives"]["dragon"]["teamId"] == 100
+    assert analytics["team_gold"]["diff"][10] == 1000
+    assert analytics["minutes"] == 15
+
+    summary = summarize_lane_phase([analytics], "p3")
+    assert summary["avg_gold_diff_at_15"] == 1500.0
+    assert summary["first_blood_kill_rate"] == 100.0
+    assert summarize_lane_phase([analytics], "p8")["first_blood_death_rate"] == 100.0
+
+
+def test_metrics_endpoint_exposes_route_and_riot_labels():
+    """/metrics etiqueta rutas por plantilla y endpoints de Riot sin IDs"""
+    from backend.services.metrics import riot_endpoint_label, record_rate_limits, RIOT_RATE_LIMIT_USAGE
+
+    client.get("/api/regions")
+    body = client.get("/metrics").text
+    assert 'lol_http_requests_total{method="GET",route="/api/regions",status="2xx"}' in body
+
+    url = "https://americas.api.riotgames.com/lol/match/v5/matches/LA1_123/timeline"
+    assert riot_endpoint_label(url) == "match.timeline"
+    assert riot_endpoint_label("https://la1.api.riotgames.com/lol/league/v4/entries/by-puuid/x") == "league.entries-by-puuid"
+
+    record_rate_limits("match.detail", {
+        "X-App-Rate-Limit": "20:1,100:120",
+        "X-App-Rate-Limit-Count": "5:1,50:120"
+    })
+    assert RIOT_RATE_LIMIT_USAGE.labels("app", "*", "120")._value.get() == 0.5
+
+
+def test_server_timing_header_reports_riot_and_encode_spans(monkeypatch):
+    """Cada respuesta incluye Server-Timing con el desglose por categoría"""
+    from backend.services.responses import response_cache
+    response_cache.clear()
+
+    class FakeResponse:
+        status_code = 200
+        headers = {}
+
+        def raise_for_status(self):
+            return None
+
+        def json(self):
+            return {"metadata": {"matchId": "LA1_4"}, "info": {}}
+
+    async def fake_get(url, params=None):
+        return FakeResponse()
+
+    monkeypatch.setattr(main.riot_client._client, "get", fake_get)
+
+    response = client.get("/api/match/LA1_4")
+    timing = response.headers["server-timing"]
+    assert 'riot;dur=' in timing and 'desc="1 spans"' in timing
+    assert "encode;dur=" in timing
+    assert "total;dur=" in timing
+    response_cache.clear()
+
+
+def test_profiling_admin_endpoints_require_token(monkeypatch):
+    monkeypatch.setattr(main.settings, "admin_token", "secreto")
+    assert client.get("/api/admin/profiling").status_code == 403
+    assert client.get("/api/admin/profiling", headers={"X-Admin-Token": "otro"}).status_code == 403
+    status = client.get("/api/admin/profiling", headers={"X-Admin-Token": "secreto"}).json()
+    assert status["enabled"] is False
+
+
+def test_sampling_profiler_collects_collapsed_stacks():
+    import time as _time
+    from backend.services.profiler import SamplingProfiler
+
+    sampler = SamplingProfiler(interval_ms=1)
+    sampler.configure(True, routes=["/api/profile"])
+    assert sampler.should_sample("/api/profile/summary/x")
+
+    def busy_loop():
+        deadline = _time.perf_counter() + 0.1
+        while _time.perf_counter() < deadline:
+            pass
+
+    thread_id = sampler.begin()
+    busy_loop()
+    sampler.end(thread_id)
+    sampler.configure(False)
+
+    folded = sampler.collapsed()
+    assert sampler.samples > 0
+    assert "busy_loop" in folded
+    stack, count = folded.splitlines()[0].rsplit(" ", 1)
+    assert int(count) >= 1 and ";" in stack
+
+
+@pytest.mark.asyncio
+async def test_fake_riot_server_serves_riot_client_with_rate_limit_headers():
+    import httpx
+    from backend.riot_client import RiotAPIClient
+    from benchmarks import synthetic
+    from benchmarks.fake_riot import FakeRiotConfig, RedirectTransport, create_fake_riot_app
+
+    fake_app = create_fake_riot_app(FakeRiotConfig(app_rate_limit="3:10"))
+    riot = RiotAPIClient()
+    await riot.aclose()
+    riot._client = httpx.AsyncClient(transport=RedirectTransport(httpx.ASGITransport(app=fake_app)))
+
+    puuid = synthetic.player_puuid(7)
+    ids = await riot.get_match_ids_by_puuid(puuid, count=5)
+    assert ids["data"] == synthetic.match_ids_for(puuid)[:5]
+    match = await riot.get_match_by_id(ids["data"][0])
+    assert match["data"]["info"]["participants"][0]["puuid"] == puuid
+    assert (await riot.get_summoner_by_puuid(puuid))["success"]
+    limited = await riot.get_summoner_by_puuid(puuid)
+    assert limited["status_code"] == 429
+    await riot.aclose()
+
+
+def test_corpus_generator_is_deterministic_and_consistent(tmp_path):
+    from benchmarks.corpus import CorpusGenerator, CorpusSpec, read_jsonl, write_jsonl
+    from backend.services.timeline_analytics import compute_timeline_analytics
+
+    spec = CorpusSpec(seed=3, matches=20, players=200)
+    generator = CorpusGenerator(spec)
+    match = generator.match(4)
+    assert match == CorpusGenerator(spec).match(4)
+
+    participants = match["info"]["participants"]
+    blue_kills = sum(p["kills"] for p in participants[:5])
+    assert blue_kills == sum(p["deaths"] for p in participants[5:])
+    assert sum(p["firstBloodKill"] for p in participants) == 1
+
+    timeline = generator.timeline(4, match)
+    analytics = compute_timeline_analytics(timeline, match)
+    first_blood = next(p for p in participants if p["firstBloodKill"])
+    assert analytics["first_blood"]["killerId"] == first_blood["participantId"]
+
+    path = str(tmp_path / "corpus.jsonl.gz")
+    write_jsonl(path, spec, kinds=("match", "timeline"))
+    kinds = [kind for kind, _ in read_jsonl(path)]
+    assert kinds.count("match") == 20 and kinds.count("timeline") == 20
+
+
+@pytest.mark.asyncio
+async def test_riot_traffic_record_and_replay(tmp_path):
+    import httpx
+    from backend.riot_client import RiotAPIClient
+    from backend.services.riot_replay import RecordingTransport, ReplayTransport, read_archive
+
+    def upstream(request):
+        return httpx.Response(
+            200,
+            json={"puuid": request.url.path.rsplit("/", 1)[-1], "summonerLevel": 30},
+            headers={"X-App-Rate-Limit": "20:1"}
+        )
+
+    path = str(tmp_path / "traffic.jsonl.gz")
+    recorder = RiotAPIClient(transport=RecordingTransport(path, httpx.MockTransport(upstream)))
+    recorded = await recorder.get_summoner_by_puuid("abc")
+    await recorder.aclose()
+
+    records = list(read_archive(path))
+    assert len(records) == 1 and records[0]["status"] == 200
+    assert "X-Riot-Token" not in str(records[0])
+
+    replay = ReplayTransport(path, speed=0)
+    replayer = RiotAPIClient(transport=replay)
+    assert await replayer.get_summoner_by_puuid("abc") == recorded
+    missing = await replayer.get_summoner_by_puuid("otro")
+    assert missing["status_code"] == 404 and replay.misses == 1
+    await replayer.aclose()
+
+
+class FakeRedis:
+    """Subconjunto en memoria de redis.asyncio para probar RedisCache"""
+
+    def __init__(self):
+        self.data = {}
+        self.sets = {}
+        self.zsets = {}
+        self.calls = []
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def mget(self, keys):
+        self.calls.append("mget")
+        return [self.data.get(k) for k in keys]
+
+    async def setex(self, key, ttl, value):
+        self.data[key] = value
+
+    async def unlink(self, *keys):
+        self.calls.append("unlink")
+        removed = sum(1 for k in keys if self.data.pop(k, None) is not None or self.sets.pop(k, None) is not None)
+        return removed
+
+    async def scan_iter(self, match=None, count=None):
+        import fnmatch
+        for key in list(self.data):
+            if fnmatch.fnmatch(key, match):
+                yield key
+
+    async def sscan_iter(self, name, count=None):
+        for member in list(self.sets.get(name, ())):
+            yield member
+
+    async def zrevrange(self, name, start, end, withscores=False):
+        rows = sorted(self.zsets.get(name, {}).items(), key=lambda row: row[1], reverse=True)
+        return [(member.encode("utf-8"), score) for member, score in rows[start:end + 1]]
+
+    def pipeline(self, transaction=True):
+        redis = self
+
+        class Pipeline:
+            def __init__(self):
+                self.ops = []
+
+            def setex(self, key, ttl, value):
+                self.ops.append(("data", key, value))
+
+            def sadd(self, name, *members):
+                self.ops.append(("set", name, members))
+
+            def expire(self, name, ttl):
+                self.ops.append(("noop", name, None))
+
+            def eval(self, script, numkeys, *keys_and_args):
+                self.ops.append(("noop", None, None))
+
+            def zincrby(self, name, amount, member):
+                self.ops.append(("zincr", name, (member, amount)))
+
+            def zremrangebyrank(self, name, start, end):
+                self.ops.append(("ztrim", name, end))
+
+            async def execute(self):
+                redis.calls.append("pipeline")
+                results = []
+                for kind, key, value in self.ops:
+                    if kind == "data":
+                        redis.data[key] = value
+                    elif kind == "noop":
+                        pass
+                    elif kind == "zincr":
+                        zset = redis.zsets.setdefault(key, {})
+                        zset[value[0]] = zset.get(value[0], 0.0) + value[1]
+                    elif kind == "ztrim":
+                        # Solo el caso que usa RedisCache: ZREMRANGEBYRANK key 0 -(n+1)
+                        zset = redis.zsets.get(key, {})
+                        for member in sorted(zset, key=zset.get)[:len(zset) + value + 1]:
+                            del zset[member]
+                    else:
+                        members = redis.sets.setdefault(key, set())
+                        results.append(len(set(value) - members))
+                        members.update(value)
+                        continue
+                    results.append(True)
+                return results
+
+        return Pipeline()
+
+
+@pytest.mark.asyncio
+async def test_redis_cache_batches_and_scan_tag_invalidation():
+    from backend.services.cache import RedisCache
+
+    redis_cache = RedisCache()
+    fake = FakeRedis()
+    redis_cache._client = fake
+
+    await redis_cache.set_many([("a", {"v": 1}, 60), ("b", [2], 3600)], tags=["grupo"])
+    assert fake.calls == ["pipeline"]
+    assert await redis_cache.get_many(["a", "b", "c"]) == {"a": {"v": 1}, "b": [2]}
+    assert fake.calls[-1] == "mget"
+
+    await redis_cache.set_many({f"match:{i}": i for i in range(5)})
+    assert await redis_cache.clear_pattern("match:*", batch_size=2) == 5
+    assert await redis_cache.invalidate_tags("grupo") == 2
+    assert fake.data == {} and fake.sets == {}
+
+    # Los incrementos del autocompletado recortan el sorted set a los más populares
+    await redis_cache.incr_scores("autocomplete:la1", {"a#1": 1.0, "b#1": 3.0, "c#1": 2.0}, max_members=2)
+    await redis_cache.incr_scores("autocomplete:la1", {"a#1": 1.5}, max_members=2)
+    assert await redis_cache.top_scores("autocomplete:la1", 5) == [("b#1", 3.0), ("c#1", 2.0)]
+
+
+def test_cache_codec_formats_and_dictionary():
+    import json as _json
+    from benchmarks.corpus import CorpusGenerator, CorpusSpec
+    from backend.services.codec import (
+        CacheCodec, FORMAT_MSGPACK, FORMAT_MSGPACK_ZSTD, FORMAT_MSGPACK_ZSTD_DICT, train_dictionary
+    )
+
+    codec = CacheCodec(threshold=64)
+    assert codec.encode({"a": 1})[0] == FORMAT_MSGPACK
+    generator = CorpusGenerator(CorpusSpec(matches=60, players=500))
+    matches = [generator.match(i) for i in range(60)]
+    encoded = codec.encode(matches[0])
+    assert encoded[0] == FORMAT_MSGPACK_ZSTD
+    assert codec.decode(encoded) == matches[0]
+    assert len(encoded) * 3 < len(_json.dumps(matches[0]))
+    # Valores JSON escritos antes del codec se siguen leyendo
+    assert codec.decode(b'{"legacy": true}') == {"legacy": True}
+
+    dictionary = train_dictionary(matches[:50], size=16384)
+    with_dict = CacheCodec(threshold=64, dictionary=dictionary)
+    packed = with_dict.encode(matches[55])
+    assert packed[0] == FORMAT_MSGPACK_ZSTD_DICT
+    assert with_dict.decode(packed) == matches[55]
+    assert len(packed) < len(codec.encode(matches[55]))
+
+
+@pytest.mark.asyncio
+async def test_riot_client_negative_caches_not_in_game_and_unranked(monkeypatch):
+    import httpx
+    from backend.riot_client import RiotAPIClient
+    from backend.services.negative_cache import negative_cache
+
+    calls = []
+
+    def upstream(request):
+        calls.append(request.url.path)
+        if "active-games" in request.url.path or "by-riot-id" in request.url.path:
+            return httpx.Response(404, json={"status": {"status_code": 404}})
+        return httpx.Response(200, json=[])
+
+    negative_cache.clear()
+    riot = RiotAPIClient(transport=httpx.MockTransport(upstream))
+    for _ in range(3):
+        live = await riot.get_current_game("summ-1")
+        assert live["status_code"] == 404
+        ranked = await riot.get_league_entries_by_puuid("puuid-1")
+        assert ranked["success"] and ranked["data"] == []
+    await riot.get_account_by_riot_id("Faker", "KR1")
+    assert (await riot.get_account_by_riot_id("faker", "kr1"))["negative_cache"] == "not_found"
+    assert len(calls) == 3
+    await riot.aclose()
+    negative_cache.clear()
+
+    # Otro worker copia la entrada de Redis con el TTL que le queda, no con el completo
+    import time
+    from backend.services.negative_cache import NegativeCache
+    monkeypatch.setattr(main.cache, "_client", FakeRedis())
+    writer, reader = NegativeCache(), NegativeCache()
+    await writer.remember("spectator.active-game", "/live/x", "not_in_game")
+    shared = await main.cache.get("neg:/live/x")
+    await main.cache.set("neg:/live/x", {**shared, "expires_at": time.time() + 2}, 60)
+    assert (await reader.get("spectator.active-game", "/live/x"))["negative_cache"] == "not_in_game"
+    assert reader._local["neg:/live/x"][0] - time.monotonic() <= 2
+
+
+@pytest.mark.asyncio
+async def test_ranked_cache_is_bounded_and_serves_last_known_good(monkeypatch):
+    from backend.services.ranked_cache import RankedCache, ranked_cache
+
+    bounded = RankedCache(ttl_seconds=600, max_entries=2)
+    for i in range(3):
+        await bounded.set(f"p{i}", "la1", [{"tier": "GOLD", "wins": i}])
+    assert len(bounded) == 2 and await bounded.get("p0", "la1") is None
+    assert bounded.total_bytes > 0
+
+    expired = RankedCache(ttl_seconds=-1)
+    await expired.set("p", "la1", [{"tier": "GOLD"}])
+    assert expired.purge_expired() == 1 and expired.total_bytes == 0
+
+    responses = iter([
+        {"success": True, "data": [{"tier": "SILVER", "queueType": "RANKED_SOLO_5x5"}]},
+        {"success": False, "status_code": 503},
+    ])
+
+    async def flaky_entries(puuid, region):
+        return next(responses)
+
+    ranked_cache.clear()
+    monkeypatch.setattr(main.riot_client, "get_league_entries_by_puuid", flaky_entries)
+    first = await main.fetch_ranked_entries("lkg-puuid", "la1")
+    assert await main.fetch_ranked_entries("lkg-puuid", "la1") == first
+    ranked_cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_app_factory_and_preload_from_snapshot(monkeypatch, tmp_path):
+    import gc
+    from backend.services import preload
+
+    fresh = main.create_app()
+    paths = set(fresh.openapi()["paths"])
+    assert {"/api/health", "/api/match/{match_id}", "/api/ranking/top"} <= paths
+    assert fresh is not main.app
+
+    source = DataDragonService()
+    source._version = "15.1.1"
+    source._champions = {"Ahri": {"id": "Ahri", "key": "103"}, "Annie": {"id": "Annie", "key": "1"}}
+    source._items, source._summoner_spells, source._runes = {"1001": {}}, {"SummonerFlash": {}}, [{"id": 8100}]
+    snapshot = tmp_path / "ddragon.json"
+    source.save_snapshot(str(snapshot))
+
+    offline = DataDragonService()
+
+    async def no_network():
+        raise OSError("sin red")
+
+    monkeypatch.setattr(offline, "preload", no_network)
+    monkeypatch.setattr(preload, "ddragon", offline)
+    monkeypatch.setattr(preload.settings, "ddragon_snapshot_path", str(snapshot))
+    counts = await preload.preload_static_data()
+    assert counts["champions"] == 2 and counts["runes"] == 1 and counts["champion_builds"] > 0
+    assert (await offline.get_champion_by_id(103))["id"] == "Ahri"
+    assert offline._version == "15.1.1"
+
+    try:
+        assert preload.freeze_heap() > 0
+    finally:
+        gc.unfreeze()
+
+
+@pytest.mark.asyncio
+async def test_aggregation_pool_matches_inline_results_with_compact_inputs():
+    import orjson
+    from benchmarks import synthetic
+    from backend.services.aggregation import AggregationPool, AGGREGATIONS, compact_match
+
+    puuid = synthetic.player_puuid(7)
+    matches = [synthetic.make_match(match_id, puuid) for match_id in synthetic.match_ids_for(puuid, 120)]
+    compact = compact_match(matches[0], puuid)
+    assert len(compact["info"]["participants"]) == 1
+    assert len(orjson.dumps(compact)) * 5 < len(orjson.dumps(matches[0]))
+    assert compact_match(matches[0], "otro-puuid") is None
+
+    pool = AggregationPool(workers=1, threshold=100)
+    try:
+        for name in ("champion_stats", "analyze_matches"):
+            expected = AGGREGATIONS[name](matches, puuid)
+            assert await pool.run(name, matches, puuid) == expected
+        # Por debajo del umbral no se crea el pool
+        small = AggregationPool(workers=1, threshold=100)
+        assert await small.run("champion_stats", matches[:10], puuid) == AGGREGATIONS["champion_stats"](matches[:10], puuid)
+        assert small._executor is None
+    finally:
+        pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_identity_cache_normalizes_riot_ids_and_refreshes_profiles(monkeypatch):
+    import asyncio
+    from backend.services.identity import IdentityCache, normalize_riot_id
+
+    assert normalize_riot_id(" Ｆａｋｅｒ ", "kr 1") == normalize_riot_id("FAKER", "KR1") == "faker#kr1"
+
+    calls = {"riot_id": 0, "summoner": 0}
+    account = {"puuid": "p-faker", "gameName": "Faker", "tagLine": "KR1"}
+
+    async def by_riot_id(game_name, tag_line, routing="americas"):
+        calls["riot_id"] += 1
+        return {"success": True, "data": dict(account)}
+
+    async def by_puuid(puuid, region="la1"):
+        calls["summoner"] += 1
+        return {"success": True, "data": {"puuid": puuid, "id": "S1", "summonerLevel": 100 + calls["summoner"]}}
+
+    monkeypatch.setattr(main.riot_client, "get_account_by_riot_id", by_riot_id)
+    monkeypatch.setattr(main.riot_client, "get_summoner_by_puuid", by_puuid)
+
+    identity = IdentityCache(refresh_after=60)
+    for name, tag in (("Faker", "KR1"), ("faker ", "kr1"), ("ＦＡＫＥＲ", "ＫＲ１")):
+        assert (await identity.resolve(name, tag, "asia"))["data"]["puuid"] == "p-faker"
+    assert calls["riot_id"] == 1
+    # Índice inverso sin llamada a Riot
+    assert (await identity.get_account("p-faker", "asia"))["data"]["gameName"] == "Faker"
+
+    assert (await identity.get_summoner("p-faker", "kr"))["data"]["summonerLevel"] == 101
+    assert (await identity.get_summoner("p-faker", "kr"))["data"]["summonerLevel"] == 101
+    assert calls["summoner"] == 1
+    # Perfil envejecido: se sirve el guardado y se refresca en segundo plano
+    identity.refresh_after = -1
+    assert (await identity.get_summoner("p-faker", "kr"))["data"]["summonerLevel"] == 101
+    await asyncio.gather(*identity._refreshing.values())
+    identity.refresh_after = 60
+    assert (await identity.get_summoner("p-faker", "kr"))["data"]["summonerLevel"] == 102
+
+    # Cambio de Riot ID: el nombre anterior deja de resolverse desde la caché
+    await identity.remember_account({"puuid": "p-faker", "gameName": "Hide on bush", "tagLine": "KR1"}, "asia")
+    await identity.resolve("faker", "kr1", "asia")
+    assert calls["riot_id"] == 2
+
+
+def test_autocomplete_ranks_by_popularity_without_riot_calls(monkeypatch):
+    import asyncio
+    import time
+    from backend.services.autocomplete import AutocompleteIndex, autocomplete_index, SEARCH_WEIGHT
+    from benchmarks import synthetic
+
+    index = AutocompleteIndex()
+    for i in range(2000):
+        index.record("la1", f"Jugador{i}", "LAN", 1.0)
+    index.record("la1", "Faker", "KR1", SEARCH_WEIGHT)
+    index.record("la1", "Fakeria", "LAN", 1.0)
+    index.record("la2", "Faker", "LAS", 1.0)
+    match = synthetic.make_match(synthetic.match_ids_for(synthetic.player_puuid(3), 1)[0], synthetic.player_puuid(3))
+    index.record_match(match)
+
+    assert [r["gameName"] for r in index.complete("la1", "FAK")] == ["Faker", "Fakeria"]
+    assert [r["tagLine"] for r in index.complete("la1", "faker#k")] == ["KR1"]
+    assert index.complete("la2", "f")[0]["tagLine"] == "LAS"
+    assert index.complete("la1", "jugador1", limit=3)[0]["score"] >= 1
+    participant = match["info"]["participants"][0]
+    assert index.complete("la1", participant["riotIdGameName"])
+
+    # Prefijo corto (top-K precalculado) y largo (bisect) en microsegundos
+    start = time.perf_counter()
+    for query in ("j", "ju", "jugador12", "jugador1999#l") * 250:
+        index.complete("la1", query)
+    assert (time.perf_counter() - start) / 1000 < 0.001
+
+    monkeypatch.setattr(main, "autocomplete_index", index)
+    body = client.get("/api/player/autocomplete?q=fa&region=la1&limit=1").json()
+    assert body["results"] == [{"gameName": "Faker", "tagLine": "KR1", "score": SEARCH_WEIGHT}]
+    assert autocomplete_index is not index
+
+    # Grafías que solo difieren en mayúsculas suman en el set compartido
+    fake = FakeRedis()
+    monkeypatch.setattr(main.cache, "_client", fake)
+    worker_a, worker_b, fresh = AutocompleteIndex(), AutocompleteIndex(), AutocompleteIndex()
+    worker_a.record("la1", "Faker", "KR1", 3.0)
+    worker_b.record("la1", "FAKER", "kr1", 1.0)
+    worker_b.record("la1", "faker", "KR1", 1.0)
+    asyncio.run(worker_a.flush())
+    asyncio.run(worker_b.flush())
+    assert fake.zsets["autocomplete:la1"] == {"Faker#KR1": 3.0, "FAKER#kr1": 2.0}
+    assert asyncio.run(fresh.load(["la1"])) == 1
+    assert fresh.complete("la1", "fak") == [{"gameName": "Faker", "tagLine": "KR1", "score": 5.0}]
+    asyncio.run(worker_b.load(["la1"]))
+    worker_b.record("la1", "FAKER", "KR1", 1.0)
+    asyncio.run(worker_b.flush())
+    assert fake.zsets["autocomplete:la1"]["Faker#KR1"] == 4.0
+
+
+@pytest.mark.asyncio
+async def test_search_prefetches_profile_data_for_follow_up_requests(monkeypatch):
+    import httpx
+    from collections import Counter
+    from benchmarks import synthetic
+    from backend.services.prefetch import Prefetcher, WarmCache
+    from backend.services.rollups import RollupStore
+
+    puuid = synthetic.player_puuid(11)
+    match_ids = synthetic.match_ids_for(puuid, 15)
+    calls = Counter()
+
+    async def account(game_name, tag_line, routing="americas"):
+        calls["account"] += 1
+        return {"success": True, "data": {"puuid": puuid, "gameName": "Prefetch", "tagLine": "LAN"}}
+
+    async def league(p, region="la1"):
+        calls["league"] += 1
+        return {"success": True, "data": synthetic.make_league_entries(p)}
+
+    async def mastery(p, count=10, region="la1"):
+        calls["mastery"] += 1
+        return {"success": True, "data": synthetic.make_mastery_top(p, count)}
+
+    async def ids(p, routing="americas", start=0, count=20, start_time=None, **kwargs):
+        calls["match_ids"] += 1
+        listed = [m for m in match_ids if synthetic.make_match(m)["info"]["gameCreation"] >= (start_time or 0) * 1000]
+        return {"success": True, "data": listed[start:start + count]}
+
+    async def match(match_id, routing="americas"):
+        calls["match"] += 1
+        return {"success": True, "data": synthetic.make_match(match_id, puuid)}
+
+    for name, fn in (
+        ("get_account_by_riot_id", account), ("get_league_entries_by_puuid", league),
+        ("get_champion_mastery_top", mastery), ("get_match_ids_by_puuid", ids), ("get_match_by_id", match),
+    ):
+        monkeypatch.setattr(main.riot_client, name, fn)
+    background = Prefetcher(concurrency=1)
+    monkeypatch.setattr(main, "prefetcher", background)
+    monkeypatch.setattr(main, "warm_cache", WarmCache())
+    monkeypatch.setattr(main, "rollup_store", RollupStore())
+    # Las partidas sintéticas son de 2025
+    monkeypatch.setattr(main, "get_season_start_timestamp", lambda year=None: 1_735_689_600)
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+        assert (await http.get("/api/account/Prefetch/LAN?region=la1")).status_code == 200
+        await background.wait()
+        warmed = dict(calls)
+        assert warmed["league"] == warmed["mastery"] == 1 and warmed["match"] == 15
+
+        assert (await http.get(f"/api/mastery/{puuid}?region=la1&count=10")).json()
+        assert (await http.get(f"/api/ranked/{puuid}?region=la1")).json()
+        assert (await http.get(f"/api/matches/{puuid}?region=la1&count=15")).json() == match_ids
+        summary = (await http.get(f"/api/profile/summary/{puuid}?region=la1")).json()
+        assert summary["matches"] == match_ids and summary["champions"]
+    # Ninguna de las peticiones posteriores llegó a Riot
+    assert dict(calls) == warmed
+
+
+@pytest.mark.asyncio
+async def test_match_history_cursor_pages_from_local_index(monkeypatch):
+    import asyncio
+    from collections import Counter
+    from benchmarks import synthetic
+    from backend.services import match_history as history_module
+    from backend.services.ingest import StatsIngestor
+    from backend.services.match_history import MatchHistory
+    from backend.services.prefetch import Prefetcher
+
+    puuid = synthetic.player_puuid(21)
+    all_ids = synthetic.match_ids_for(puuid, 14)
+    riot_ids = all_ids[2:]  # las dos más recientes llegan después
+    calls = Counter()
+
+    async def ids(p, routing="americas", start=0, count=20, **kwargs):
+        calls["match_ids"] += 1
+        await asyncio.sleep(0)  # cede el bucle como una llamada real
+        return {"success": True, "data": riot_ids[start:start + count]}
+
+    async def match(match_id, routing="americas"):
+        calls[match_id] += 1
+        if match_id == flaky and calls[match_id] == 1:
+            return {"success": False, "status": 503}
+        return {"success": True, "data": synthetic.make_match(match_id, puuid)}
+
+    flaky = riot_ids[1]  # su primer detalle falla
+    ingestor = StatsIngestor()
+    monkeypatch.setattr(main, "stats_ingestor", ingestor)
+    monkeypatch.setattr(main.riot_client, "get_match_ids_by_puuid", ids)
+    monkeypatch.setattr(main.riot_client, "get_match_by_id", match)
+    monkeypatch.setattr(main.cache, "_client", FakeRedis())
+    background = Prefetcher(concurrency=1)
+    monkeypatch.setattr(history_module, "prefetcher", background)
+    history = MatchHistory(batch_size=5)
+
+    first = await history.page(puuid, "la1", main.fetch_match_details, count=4)
+    assert [card["matchId"] for card in first["matches"]] == [m for m in riot_ids[:4] if m != flaky]
+    # Las estadísticas agregadas no se suman dentro de la petición: quedan en cola
+    assert len(ingestor) == 4
+    ingested = []
+
+    async def record(match):
+        ingested.append(match["metadata"]["matchId"])
+
+    monkeypatch.setattr(ingestor, "ingest", record)
+    assert await ingestor.drain() == 4 and set(ingested) == set(riot_ids[:5]) - {flaky}
+    assert first["has_more"] and calls["match_ids"] == 1
+    await background.wait()  # la página siguiente ya está precargada
+    # El detalle fallido no desplaza el índice: sigue alineado con la lista de Riot
+    assert await history.cached_ids(puuid, "la1", 0, 8) == riot_ids[:8]
+
+    riot_ids[:0] = all_ids[:2]
+    second = await history.page(puuid, "la1", main.fetch_match_details, first["next_cursor"], count=4)
+    # Las partidas nuevas no desplazan la página del cursor
+    assert [card["matchId"] for card in second["matches"]] == all_ids[6:10]
+
+    history.head_ttl = 0  # la cabecera caduca y se resincroniza
+    latest = await history.page(puuid, "la1", main.fetch_match_details, count=4, prefetch_next=False)
+    history.head_ttl = 60
+    # La fila pendiente se reintenta al volver a pedir su página
+    assert [card["matchId"] for card in latest["matches"]] == all_ids[:4]
+    assert await history.cached_ids(puuid, "la1", 0, 5) == all_ids[:5]
+    assert await history.ids(puuid, "la1", 0, 3, after=all_ids[4]) == all_ids[5:8]
+
+    await background.wait()
+    seen = [card["matchId"] for card in second["matches"]]
+    cursor = second["next_cursor"]
+    while cursor:
+        page = await history.page(puuid, "la1", main.fetch_match_details, cursor, count=4, prefetch_next=False)
+        seen += [card["matchId"] for card in page["matches"]]
+        cursor = page["next_cursor"]
+    assert not page["has_more"] and seen == all_ids[6:]
+    # Cada partida se pidió a Riot una sola vez (la fallida, dos)
+    assert all(calls[match_id] == (2 if match_id == flaky else 1) for match_id in all_ids)
+
+    with pytest.raises(ValueError):
+        await history.page(puuid, "la1", main.fetch_match_details, "%%%", count=4)
+
+    # Peticiones concurrentes sobre un índice vacío (sin Redis comparten el mismo
+    # objeto en memoria) hacen una sola sincronización con Riot
+    riot_ids[:] = all_ids
+    flaky = None
+    calls.clear()
+    monkeypatch.setattr(main.cache, "_client", None)
+    fresh = MatchHistory(batch_size=5)
+    pages = await asyncio.gather(
+        fresh.ids(puuid, "la1", 0, 4),
+        fresh.ids(puuid, "la1", 0, 8),
+        fresh.page(puuid, "la1", main.fetch_match_details, count=4, prefetch_next=False),
+    )
+    assert pages[0] == all_ids[:4] and pages[1] == all_ids[:8]
+    assert [card["matchId"] for card in pages[2]["matches"]] == all_ids[:4]
+    assert await fresh.ids(puuid, "la1", 8, 4) == all_ids[8:12]
+    assert await fresh.cached_ids(puuid, "la1", 0, 14) == all_ids
+    assert calls["match_ids"] == 3  # una cabecera y dos lotes de cola, sin repetir
+
+
+@pytest.mark.asyncio
+async def test_daily_rollups_answer_queue_and_window_filters(monkeypatch):
+    from collections import Counter
+    from benchmarks import synthetic
+    from backend.services import rollups as rollups_module
+    from backend.services.aggregation import AggregationPool, summarize_champion_stats
+    from backend.services.rollups import DAY_SECONDS, RollupStore
+
+    puuid = synthetic.player_puuid(31)
+    match_ids = synthetic.match_ids_for(puuid, 120)
+    matches = {m: synthetic.make_match(m, puuid) for m in match_ids}
+    listed = match_ids[20:]  # las 20 más recientes llegan después
+    calls = Counter()
+
+    async def ids(p, routing="americas", start=0, count=20, start_time=None, **kwargs):
+        calls["match_ids"] += 1
+        rows = [m for m in listed if matches[m]["info"]["gameCreation"] >= (start_time or 0) * 1000]
+        return {"success": True, "data": rows[start:start + count]}
+
+    async def fetch_details(requested, routing):
+        calls["match"] += len(requested)
+        return [matches[m] for m in requested]
+
+    monkeypatch.setattr(main.riot_client, "get_match_ids_by_puuid", ids)
+    pool = AggregationPool(workers=1, threshold=50)
+    monkeypatch.setattr(rollups_module, "aggregation_pool", pool)
+    store = RollupStore(sync_ttl=0, batch_size=50)
+    try:
+        rollup = await store.ensure(puuid, "americas", 0, fetch_details)
+        assert pool._executor is not None  # el backfill se plegó en el pool de procesos
+    finally:
+        pool.shutdown()
+    assert calls["match"] == 100
+    assert rollup.champion_stats(0) == summarize_champion_stats([matches[m] for m in listed], puuid)
+
+    listed[:0] = match_ids[:20]
+    rollup = await store.ensure(puuid, "americas", 0, fetch_details)
+    assert calls["match"] == 120  # solo las nuevas
+    assert rollup.match_ids(0) == match_ids
+
+    newest_day = matches[match_ids[0]]["info"]["gameCreation"] // 1000 // DAY_SECONDS
+    since = (newest_day - 2) * DAY_SECONDS
+    for queues in (None, [420], [440, 450]):
+        expected = [
+            matches[m] for m in match_ids
+            if matches[m]["info"]["gameCreation"] >= since * 1000
+            and (queues is None or matches[m]["info"]["queueId"] in queues)
+        ]
+        assert rollup.champion_stats(since, queues) == summarize_champion_stats(expected, puuid)
+        assert rollup.match_ids(since, queues) == [m["metadata"]["matchId"] for m in expected]
+    # Una ventana ya cubierta no vuelve a Riot
+    store.sync_ttl = 600
+    before = calls["match_ids"]
+    await store.ensure(puuid, "americas", since, fetch_details)
+    assert calls["match_ids"] == before
+
+    # Una ventana cortada por match_limit queda cubierta: la segunda consulta no relista
+    other = synthetic.player_puuid(32)
+    listed[:] = synthetic.match_ids_for(other, 60)
+    matches.update({m: synthetic.make_match(m, other) for m in listed})
+    limited = RollupStore(sync_ttl=600, batch_size=50)
+    rollup = await limited.ensure(other, "americas", 0, fetch_details, match_limit=30)
+    assert rollup.truncated and rollup.covered_since == 0 and len(rollup.matches) == 30
+    before = dict(calls)
+    await limited.ensure(other, "americas", 0, fetch_details, match_limit=30)
+    assert calls == before
+
+
+@pytest.mark.asyncio
+async def test_patch_stats_partition_rollover_and_merge(monkeypatch):
+    from benchmarks import synthetic
+    from backend.services.patch_stats import PatchPartition, PatchStatsStore
+
+    store = PatchStatsStore(full_patches=1, max_patches=2)
+    store.rollover("15.1.1")
+
+    def patch_matches(patch, count):
+        rows = []
+        for match_id in synthetic.match_ids_for(f"{patch}-player", count):
+            match = synthetic.make_match(f"{match_id}-{patch}")
+            match["info"]["gameVersion"] = f"{patch}.640.1234"
+            rows.append(match)
+        return rows
+
+    old, current = patch_matches("15.1", 20), patch_matches("15.2", 30)
+    for match in old + current + current[:5]:  # las repetidas no cuentan dos veces
+        await store.ingest(match)
+    assert store.partitions["15.1"].games == 20 and store.partitions["15.2"].games == 30
+
+    # Otro worker (u otro proceso tras un reinicio) no vuelve a contar lo ya reclamado en Redis
+    fake_claims = FakeRedis()
+    monkeypatch.setattr(main.cache, "_client", fake_claims)
+    first, second = PatchStatsStore(), PatchStatsStore()
+    assert await first.ingest(current[0]) and not await second.ingest(current[0])
+    assert not second.partitions and not second._pending
+    # Un solo conjunto por parche (no una clave por partida) guarda los reclamos
+    assert await first.ingest(current[1])
+    assert fake_claims.sets == {"patch_stats:seen:15.2": {current[0]["metadata"]["matchId"], current[1]["metadata"]["matchId"]}}
+
+    champion_id = current[0]["info"]["participants"][0]["championId"]
+    role = current[0]["info"]["participants"][0]["teamPosition"]
+    expected = sum(
+        1 for m in current for p in m["info"]["participants"]
+        if p["championId"] == champion_id and p["teamPosition"] == role
+    )
+    stats = store.recent(1).champion(champion_id, role)
+    assert stats["patch"] == "15.2" and stats["games"] == expected and stats["items"]
+
+    # Rotación: 15.2 pasa a ser el parche actual y 15.1 se compacta
+    assert store.rollover("15.2.1")
+    assert store.partition().patch == "15.2"
+    assert store.partitions["15.1"].compacted
+    assert all(not name.startswith("item:") for row in store.partitions["15.1"].rows.values() for name in row)
+    merged = store.recent(2)
+    assert merged.games == 50
+    assert merged.champion(champion_id, role)["games"] == PatchPartition.merge(
+        [store.partitions["15.1"], store.partitions["15.2"]]
+    ).champion(champion_id, role)["games"]
+
+    # Al llegar un tercer parche se descarta el más antiguo
+    store.rollover("15.3.1")
+    assert store.patches() == ["15.2"] and store.partition().games == 0
+    assert not await store.ingest(patch_matches("15.1", 1)[0])
+
+
+@pytest.mark.asyncio
+async def test_matchup_matrix_lookup_top_k_and_live_tips():
+    from benchmarks import synthetic
+    from backend.services.matchups import MatchupStore
+    from backend.services.recommendations import RecommendationService
+
+    store = MatchupStore(initial_capacity=4)  # obliga a ampliar las matrices
+    store.rollover("15.1.1")
+    matches = [synthetic.make_match(m) for m in synthetic.match_ids_for("matchup-player", 200)]
+    for match in matches + matches[:10]:  # las repetidas no cuentan dos veces
+        await store.ingest(match)
+
+    # Los datos sintéticos pueden repetir campeón; una partida real no
+    game = next(m for m in matches if len({p["championId"] for p in m["info"]["participants"]}) == 10)
+    lane = [p for p in game["info"]["participants"] if p["teamPosition"] == "MIDDLE"]
+    own, rival = lane[0]["championId"], lane[1]["championId"]
+    expected = [
+        next(p["win"] for p in m["info"]["participants"] if p["championId"] == own)
+        for m in matches
+        if {own, rival} <= {p["championId"] for p in m["info"]["participants"] if p["teamPosition"] == "MIDDLE"}
+    ]
+    pair, reverse = store.lookup(own, rival, "mid"), store.lookup(rival, own, "MIDDLE")
+    assert pair["games"] == reverse["games"] == len(expected) and pair["wins"] == sum(expected)
+    assert pair["wins"] + reverse["wins"] == pair["games"]
+
+    best = store.top(own, "MIDDLE", k=3, min_games=1)
+    worst = store.top(own, "MIDDLE", k=3, min_games=1, worst=True)
+    assert [m["winrate"] for m in best] == sorted((m["winrate"] for m in best), reverse=True)
+    assert [m["winrate"] for m in worst] == sorted(m["winrate"] for m in worst)
+    assert best[0]["winrate"] >= worst[0]["winrate"]
+
+    # Partida en vivo: el rol del jugador se fija y el resto se infiere
+    live = {"participants": [
+        {"puuid": p["puuid"], "teamId": p["teamId"], "championId": p["championId"]}
+        for p in game["info"]["participants"]
+    ]}
+    service = RecommendationService()
+    import backend.services.recommendations as recommendations_module
+    original, recommendations_module.matchup_store = recommendations_module.matchup_store, store
+    try:
+        result = service.generate_recommendations({"preferred_role": "MIDDLE", "total_matches": 1}, live, lane[0]["puuid"])
+    finally:
+        recommendations_module.matchup_store = original
+    player_lane = next(m for m in result["matchups"] if m["player"])
+    assert (player_lane["championId"], player_lane["opponentId"], player_lane["role"]) == (own, rival, "MIDDLE")
+    assert len(result["matchups"]) == 5 and result["in_game_tips"][0] == "Tips para esta partida:"
+
+
+@pytest.mark.asyncio
+async def test_live_scouting_streams_cards_within_call_budget(monkeypatch):
+    import asyncio
+    import httpx
+    import orjson
+    from collections import Counter
+    from benchmarks import synthetic
+    from backend.services.ranked_cache import RankedCache
+    from backend.services.scouting import LiveScouting
+
+    players = [synthetic.player_puuid(60 + i) for i in range(10)]
+    game = {"gameId": 42, "participants": [
+        {"puuid": puuid, "teamId": 100 if i < 5 else 200, "championId": 103 + i} for i, puuid in enumerate(players)
+    ]}
+    calls = Counter()
+
+    async def summoner(puuid, region):
+        return {"success": True, "data": {"id": f"sid-{puuid}"}}
+
+    async def current_game(summoner_id, region):
+        calls["spectator"] += 1
+        return {"success": True, "data": game}
+
+    async def league(puuid, region):
+        calls["league"] += 1
+        return {"success": True, "data": [{"queueType": "RANKED_SOLO_5x5", "tier": "GOLD"}]}
+
+    async def ids(puuid, routing="americas", start=0, count=20, **kwargs):
+        calls["match_ids"] += 1
+        return {"success": True, "data": synthetic.match_ids_for(puuid, count)}
+
+    async def match(match_id, routing="americas"):
+        calls["match"] += 1
+        owner = next(p for p in players if match_id in synthetic.match_ids_for(p, 8))
+        return {"success": True, "data": synthetic.make_match(match_id, owner)}
+
+    ranks = RankedCache()
+    for puuid in players[:5]:  # la mitad ya tiene el ranked en caché
+        await ranks.set(puuid, "la1", [{"queueType": "RANKED_SOLO_5x5", "tier": "DIAMOND"}])
+    monkeypatch.setattr(main, "ranked_cache", ranks)
+    monkeypatch.setattr(main.identity_cache, "get_summoner", summoner)
+    monkeypatch.setattr(main.riot_client, "get_current_game", current_game)
+    monkeypatch.setattr(main.riot_client, "get_league_entries_by_puuid", league)
+    monkeypatch.setattr(main.riot_client, "get_match_ids_by_puuid", ids)
+    monkeypatch.setattr(main.riot_client, "get_match_by_id", match)
+    monkeypatch.setattr(main, "live_scouting", LiveScouting(call_budget=30))
+
+    async def view(client, puuid):
+        response = await client.get(f"/api/player/{puuid}/live/scout?region=la1")
+        assert response.headers["content-type"] == "application/x-ndjson"
+        return [orjson.loads(line) for line in response.text.splitlines()]
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        first, second = await asyncio.gather(view(client, players[0]), view(client, players[7]))
+
+    assert first[0]["type"] == "game" and first[-1]["type"] == "done"
+    cards = {line["card"]["puuid"]: line["card"] for line in first if line["type"] == "participant"}
+    assert set(cards) == set(players)
+    # Presupuesto de 30 = 3 llamadas por jugador: con el ranked en caché caben 2 partidas, sin él 1
+    assert calls["league"] == 5 and calls["match_ids"] == 10 and calls["match"] == 15
+    assert first[-1]["calls"] == 30 == calls["league"] + calls["match_ids"] + calls["match"]
+    assert cards[players[0]]["ranked"][0]["tier"] == "DIAMOND" and cards[players[0]]["recent"]["games"] == 2
+    assert cards[players[9]]["ranked"][0]["tier"] == "GOLD" and cards[players[9]]["recent"]["games"] == 1
+    assert all(card["partial"] for card in cards.values())
+    # El segundo espectador comparte la sesión de la misma partida
+    assert [line for line in second if line["type"] == "participant"] == [line for line in first if line["type"] == "participant"]
+
+    # Los reintentos ante 429 se descuentan del presupuesto
+    from backend.services.scouting import CallBudget
+
+    async def throttled(puuid, region):
+        calls["throttled"] += 1
+        return {"success": False, "status_code": 429}
+
+    monkeypatch.setattr(main.riot_client, "get_league_entries_by_puuid", throttled)
+    budget = CallBudget(2)
+    assert budget.take() and await main.fetch_ranked_entries("sin-ranked", "la1", budget) == []
+    assert calls["throttled"] == 2 and budget.remaining == 0
+
+    # Al purgar una sesión caducada se cancela su reparto pendiente
+    async def stuck(participant, budget):
+        await asyncio.sleep(3600)
+
+    scouting = LiveScouting(session_ttl=-1)
+    stale = scouting.session("la1", game, stuck)
+    await asyncio.sleep(0)
+    scouting.session("la1", {"gameId": 43, "participants": []}, stuck)
+    await asyncio.gather(stale.task, return_exceptions=True)
+    assert stale.task.cancelled() and ("la1", 42) not in scouting._sessions
+
+
+@pytest.mark.asyncio
+async def test_tierlist_materialized_views_by_bracket_with_etag(monkeypatch):
+    from benchmarks import synthetic
+    from backend.services import tierlist as tierlist_module
+    from backend.services.ranked_cache import RankedCache
+    from backend.services.tierlist import TierListStore
+
+    monkeypatch.setattr(main.cache, "_client", FakeRedis())
+    ranks = RankedCache()
+    monkeypatch.setattr(tierlist_module, "ranked_cache", ranks)
+    store = TierListStore(min_games=1)
+    store.rollover("15.1.1")
+    matches = [synthetic.make_match(m) for m in synthetic.match_ids_for("tier-player", 40)]
+    for match in matches:
+        await store.ingest(match)
+    # La mitad de las partidas son de jugadores de Diamante; sus rangos los guardó
+    # otro worker, así que solo están en Redis
+    other_worker = RankedCache()
+    for match in matches[:20]:
+        for participant in match["info"]["participants"]:
+            await other_worker.set(participant["puuid"], "la1", [{"queueType": "RANKED_SOLO_5x5", "tier": "DIAMOND"}])
+    assert store.refresh() == 6 and store.view("la1", bracket="diamond_plus") is None  # de momento solo "all"
+
+    assert await store.assign_brackets() == 20
+    assert store.refresh() == 2 * 6  # emerald_plus y diamond_plus; 5 roles + ALL
+    assert store.refresh() == 0  # sin partidas nuevas no se recalcula nada
+    assert store.view("la1", bracket="master_plus") is None
+    # Las partidas sin rangos conocidos se reintentan unas pocas pasadas y luego solo cuentan en "all"
+    assert await store.assign_brackets() == 0 and len(store._unassigned) == 20
+    for _ in range(tierlist_module.MAX_BRACKET_ATTEMPTS):
+        await store.assign_brackets()
+    assert not store._unassigned
+
+    monkeypatch.setattr(main, "tierlist_store", store)
+    client = TestClient(main.app)
+    response = client.get("/api/tierlist?region=LA1&role=mid&bracket=diamond_plus")
+    body = response.json()
+    assert response.status_code == 200 and body["patch"] == "15.1" and body["games"] == 20
+    assert body["rows"] and {row["role"] for row in body["rows"]} == {"MIDDLE"}
+    assert [row["score"] for row in body["rows"]] == sorted((row["score"] for row in body["rows"]), reverse=True)
+    assert body["rows"][0]["tier"] == "S+" and body["rows"][-1]["tier"] == "C"
+    assert client.get("/api/tierlist?region=la1").json()["games"] == 40
+
+    etag = response.headers["etag"]
+    cached = client.get("/api/tierlist?region=la1&role=MIDDLE&bracket=diamond_plus", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert client.get("/api/tierlist?bracket=bronze").status_code == 400